@@ -7,6 +7,7 @@
     1_Configure.py
     2_Generate.py
     3_Make.py
+    4_Pipeline.py
 
     into the root directory of a CMakeProjectFramework repository.
 
@@ -27,7 +28,7 @@ from python import buildautomat
 
 
 _SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
-_SCRIPTS = ['1_Configure.py.in', '2_Generate.py.in', '3_Make.py.in']
+_SCRIPTS = ['1_Configure.py.in', '2_Generate.py.in', '3_Make.py.in', '4_Pipeline.py.in']
 
 def replacePlaceHolder(filePath, placeHolderDict):
     """
@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+"""
+This module provides the ArtifactCache class which stores the build outputs
+of targets in a shared directory and restores them with hard links.
+"""
+
+import hashlib
+import json
+import os
+import re
+import uuid
+
+from . import testimpact
+
+
+_MANIFEST_FILE = 'manifest.json'
+_TEMP_ENDING = '.tmp'
+_OUTPUT_ENDINGS = ['.so', '.dll', '.dylib', '.a', '.lib', '.exe', '.pdb', '.exp']
+_PACKAGE_TARGET_SUFFIXES = ['_tests', '_fixtures']
+_BUILD_TYPE_CACHE_ENTRY_REGEX = re.compile(r'^CMAKE_BUILD_TYPE:\w+=(.*)$', re.MULTILINE)
+_DEFAULT_BUILD_TYPE_CACHE_ENTRY_REGEX = re.compile(r'^CMAKE_DEFAULT_BUILD_TYPE:\w+=(.*)$', re.MULTILINE)
+_CONFIGURATION_TYPES_CACHE_ENTRY_REGEX = re.compile(r'^CMAKE_CONFIGURATION_TYPES:\w+=(.*)$', re.MULTILINE)
+
+
+class ArtifactCache:
+    """
+    A directory with one sub-directory per target build. The name of the sub-directory is a hash
+    of the source files of the targets package, the global inputs like the config file and the
+    keys of all dependencies of the target. The keys are taken from the target dependency graph
+    of the generate step, so a change in a library also changes the keys of all its dependents.
+
+    The cache only uses plain files and an atomic rename for publishing new entries, so it can
+    be located on a network share that is used by multiple machines at the same time.
+    """
+    def __init__(self, fs_access, cache_dir, sources_dir, dependency_graph):
+        self.m_fs_access = fs_access
+        self.m_cache_dir = cache_dir
+        self.m_sources_dir = sources_dir
+        self.m_dependency_graph = dependency_graph
+        self.m_keys = {}
+        self.m_global_digest = hashlib.sha256()
+        self.hits = 0
+        self.misses = 0
+
+    def add_global_input(self, name, content):
+        """
+        Adds an input that influences all targets, like the content of the config file.
+        This must be called before the first call of get_key().
+        """
+        self.m_global_digest.update('{0}:{1}\n'.format(name, content).encode('utf-8'))
+
+    def get_key(self, target):
+        """
+        Returns the hash of all inputs of the target and its dependencies.
+        """
+        if target not in self.m_keys:
+            digest = self.m_global_digest.copy()
+            digest.update('target:{0}\n'.format(target).encode('utf-8'))
+            for source_file in self._get_package_source_files(target):
+                digest.update(str(source_file).encode('utf-8'))
+                digest.update(self.m_fs_access.get_file_hash(source_file).encode('utf-8'))
+            for dependency in sorted(self.m_dependency_graph.get(target, [])):
+                digest.update('dependency:{0}:{1}\n'.format(dependency, self.get_key(dependency)).encode('utf-8'))
+            self.m_keys[target] = digest.hexdigest()
+        return self.m_keys[target]
+
+    def get_targets(self, build_target):
+        """
+        Returns the targets whose outputs are created when building the given target or all
+        targets if no target is given. Returns None for targets that are not in the dependency
+        graph, like the custom targets runAllTests or documentation, because their outputs
+        can not be cached.
+        """
+        if build_target is None:
+            return sorted(self.m_dependency_graph)
+        if build_target in self.m_dependency_graph:
+            return sorted(testimpact.get_dependencies(build_target, self.m_dependency_graph))
+        return None
+
+    def contains(self, target, output_dir):
+        return self.m_fs_access.isfile(self._get_entry_dir(target, output_dir) / _MANIFEST_FILE)
+
+    def restore(self, target, output_dir):
+        """
+        Hard links the cached output files of the target into the output directory.
+        Returns false if the cache has no entry for the current key of the target.
+        """
+        entry_dir = self._get_entry_dir(target, output_dir)
+        if not self.m_fs_access.isfile(entry_dir / _MANIFEST_FILE):
+            self.misses += 1
+            return False
+
+        self.m_fs_access.mkdirs(output_dir)
+        for output_file in json.loads(self.m_fs_access.readfile(entry_dir / _MANIFEST_FILE))['files']:
+            destination = output_dir / output_file
+            if self.m_fs_access.exists(destination):
+                # Remove the file instead of overwriting it, because it may be a link to another entry.
+                self.m_fs_access.remove(destination)
+            self.m_fs_access.hardlink(entry_dir / output_file, destination)
+        self.hits += 1
+        return True
+
+    def store(self, target, output_dir):
+        """
+        Copies the output files of the target from the output directory into the cache.
+        The files are copied instead of linked, because tools like incremental linkers
+        change their outputs in place.
+        """
+        entry_dir = self._get_entry_dir(target, output_dir)
+        if self.m_fs_access.exists(entry_dir):
+            return
+
+        output_files = [entry for entry in sorted(self.m_fs_access.listdir(output_dir)) if self._is_output_file(entry, target, output_dir)]
+        temp_dir = self.m_cache_dir / '{0}.{1}{2}'.format(entry_dir.name, uuid.uuid4().hex, _TEMP_ENDING)
+        self.m_fs_access.mkdirs(temp_dir)
+        for output_file in output_files:
+            self.m_fs_access.copyfile_with_metadata(output_dir / output_file, temp_dir / output_file)
+        self.m_fs_access.writefile(temp_dir / _MANIFEST_FILE, json.dumps({'target': target, 'files': output_files}, indent=4))
+
+        try:
+            self.m_fs_access.rename(temp_dir, entry_dir)
+        except OSError:
+            # Another build published the same entry in the meantime.
+            self.m_fs_access.rmtree(temp_dir)
+
+    def _get_entry_dir(self, target, output_dir):
+        # The output directory name is the compiler config, so Debug and Release get different entries.
+        digest = hashlib.sha256('{0}:{1}'.format(output_dir.name, self.get_key(target)).encode('utf-8'))
+        return self.m_cache_dir / digest.hexdigest()
+
+    def _is_output_file(self, file_name, target, output_dir):
+        if not self.m_fs_access.isfile(output_dir / file_name):
+            return False
+        base_name = get_output_base_name(file_name)
+        return base_name in (target, 'lib' + target)
+
+    def _get_package_source_files(self, target):
+        package_dir = self.m_sources_dir / get_package_name(target)
+        if not self.m_fs_access.isdir(package_dir):
+            return [] # External targets only depend on the global inputs.
+        return self._get_files_recursively(package_dir)
+
+    def _get_files_recursively(self, directory):
+        files = []
+        for entry in sorted(self.m_fs_access.listdir(directory)):
+            if entry.startswith('.'):
+                continue # Skip .git and other hidden files.
+            path = directory / entry
+            if self.m_fs_access.isdir(path):
+                files.extend(self._get_files_recursively(path))
+            elif self.m_fs_access.isfile(path):
+                files.append(path)
+        return files
+
+
+########### free functions #########################################################################
+def get_package_name(target):
+    """
+    Returns the package of targets like MyLib, MyLib_tests or MyLib_fixtures.
+    """
+    for suffix in _PACKAGE_TARGET_SUFFIXES:
+        if target.endswith(suffix):
+            return target[:-len(suffix)]
+    return target
+
+
+def get_output_base_name(file_name):
+    """
+    Returns the file name without the endings of binaries like .so.1.2.3, .dll or .exe.
+    """
+    name = file_name
+    if '.so.' in name:
+        name = name[:name.index('.so.')]
+    base_name, ending = os.path.splitext(name)
+    while ending in _OUTPUT_ENDINGS:
+        name = base_name
+        base_name, ending = os.path.splitext(name)
+    return name
+
+
+def get_default_compiler_config(cmake_cache_content):
+    """
+    Returns the compiler config that the build tool builds when no config is given. This is the
+    CMAKE_BUILD_TYPE of single config generators and the CMAKE_DEFAULT_BUILD_TYPE or the first of
+    the CMAKE_CONFIGURATION_TYPES of multi config generators. Returns None if it is not known.
+    """
+    for regex in [_BUILD_TYPE_CACHE_ENTRY_REGEX, _DEFAULT_BUILD_TYPE_CACHE_ENTRY_REGEX]:
+        match = regex.search(cmake_cache_content)
+        if match and match.group(1).strip():
+            return match.group(1).strip()
+    match = _CONFIGURATION_TYPES_CACHE_ENTRY_REGEX.search(cmake_cache_content)
+    if match and match.group(1).strip():
+        return match.group(1).split(';')[0].strip()
+    return None
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the ArtifactCache class.
+"""
+
+import unittest
+from pathlib import PurePosixPath
+
+from . import artifactcache
+from . import testimpact
+from . import filesystemaccess
+
+
+_BINARY_DIR = PurePosixPath('/MyCPFProject/Generated/MyConfig/BuildStage/Debug')
+_SOURCES_DIR = PurePosixPath('/MyCPFProject/Sources')
+_CACHE_DIR = PurePosixPath('/mnt/share/CPFArtifactCache')
+
+
+class TestArtifactCache(unittest.TestCase):
+    """
+    The test fixture for the ArtifactCache tests.
+    """
+    def setUp(self):
+        self.fs_access = filesystemaccess.FakeFileSystemAccess()
+        self.fs_access.addfile(_BINARY_DIR / 'PackageA_tests', 'tests binary')
+        self.fs_access.addfile(_BINARY_DIR / 'libPackageA.so.1.0.0', 'library A')
+        self.fs_access.addfile(_BINARY_DIR / 'libPackageB.so', 'library B')
+        self.fs_access.addfile(_SOURCES_DIR / 'PackageA/a.cpp', 'source A')
+        self.fs_access.addfile(_SOURCES_DIR / 'PackageB/b.cpp', 'source B')
+        self.graph = testimpact.parse_dependency_graph(
+            '"node0" [ label = "PackageA_tests" ];\n"node1" [ label = "PackageA" ];\n"node2" [ label = "PackageB" ];\n'
+            '"node0" -> "node1"\n"node1" -> "node2"\n')
+
+    def _get_sut(self):
+        sut = artifactcache.ArtifactCache(self.fs_access, _CACHE_DIR, _SOURCES_DIR, self.graph)
+        sut.add_global_input('config', 'config content')
+        return sut
+
+    def test_key_depends_on_the_sources_of_the_target_and_its_dependencies(self):
+        keys = {target: self._get_sut().get_key(target) for target in self.graph}
+
+        self.fs_access.writefile(_SOURCES_DIR / 'PackageA/a.cpp', 'changed source A')
+        changed_keys = {target: self._get_sut().get_key(target) for target in self.graph}
+        self.assertEqual(changed_keys['PackageB'], keys['PackageB'])
+        self.assertNotEqual(changed_keys['PackageA'], keys['PackageA'])
+        self.assertNotEqual(changed_keys['PackageA_tests'], keys['PackageA_tests'], 'The tests package shares the sources of PackageA')
+
+        self.fs_access.writefile(_SOURCES_DIR / 'PackageB/b.cpp', 'changed source B')
+        self.assertNotEqual(self._get_sut().get_key('PackageA'), changed_keys['PackageA'], 'A changed dependency changes the key')
+
+    def test_stored_outputs_are_restored(self):
+        # setup
+        sut = self._get_sut()
+        for target in sut.get_targets('PackageA_tests'):
+            sut.store(target, _BINARY_DIR)
+        self.fs_access.rmtree(_BINARY_DIR)
+
+        # execute
+        sut = self._get_sut()
+        self.assertTrue(all(sut.restore(target, _BINARY_DIR) for target in sut.get_targets('PackageA_tests')))
+
+        # verify
+        self.assertTrue(self.fs_access.hasfile(_BINARY_DIR / 'PackageA_tests', 'tests binary'))
+        self.assertTrue(self.fs_access.hasfile(_BINARY_DIR / 'libPackageA.so.1.0.0', 'library A'))
+        self.assertTrue(self.fs_access.hasfile(_BINARY_DIR / 'libPackageB.so', 'library B'))
+        self.assertEqual(sut.hits, 3)
+
+        # a changed input leads to a miss
+        self.fs_access.writefile(_SOURCES_DIR / 'PackageB/b.cpp', 'changed source B')
+        sut = self._get_sut()
+        self.assertFalse(sut.contains('PackageA', _BINARY_DIR))
+        self.assertFalse(sut.restore('PackageA', _BINARY_DIR))
+        self.assertEqual(sut.misses, 1)
+
+    def test_targets_that_are_not_in_the_graph_can_not_be_cached(self):
+        sut = self._get_sut()
+
+        self.assertEqual(sut.get_targets(None), ['PackageA', 'PackageA_tests', 'PackageB'])
+        self.assertEqual(sut.get_targets('PackageA'), ['PackageA', 'PackageB'])
+        self.assertIsNone(sut.get_targets('runAllTests'))
+
+    def test_get_output_base_name(self):
+        self.assertEqual(artifactcache.get_output_base_name('libMyLib.so.1.2.3'), 'libMyLib')
+        self.assertEqual(artifactcache.get_output_base_name('MyLib.dll'), 'MyLib')
+        self.assertEqual(artifactcache.get_output_base_name('MyLib_tests.exe'), 'MyLib_tests')
+        self.assertEqual(artifactcache.get_output_base_name('MyLib_tests'), 'MyLib_tests')
+
+    def test_get_default_compiler_config(self):
+        self.assertEqual(artifactcache.get_default_compiler_config('CMAKE_BUILD_TYPE:STRING=Release\n'), 'Release')
+        self.assertEqual(artifactcache.get_default_compiler_config('CMAKE_BUILD_TYPE:STRING=\nCMAKE_CONFIGURATION_TYPES:STRING=Debug;Release\n'), 'Debug')
+        self.assertEqual(artifactcache.get_default_compiler_config(
+            'CMAKE_CONFIGURATION_TYPES:STRING=Debug;Release\nCMAKE_DEFAULT_BUILD_TYPE:STRING=Release\n'), 'Release')
+        self.assertIsNone(artifactcache.get_default_compiler_config('CMAKE_GENERATOR:INTERNAL=Ninja\n'))
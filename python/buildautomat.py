@@ -6,9 +6,12 @@ of the primary build scripts.
 
 import time
 import os
-import datetime
+import sys
+import threading
 from pathlib import PurePosixPath
 
+# The other modules are imported by the methods that use them, so importing this
+# module stays fast and each run only loads what its options need.
 from . import filelocations
 from . import miscosaccess
 from . import filesystemaccess
@@ -21,12 +24,50 @@ _TARGET_KEY = '--target'
 _CONFIG_KEY = '--config'
 _CLEAN_KEY = '--clean'
 _CPUS_KEY = '--cpus'
+_MANIFEST_KEY = '--manifest'
+_RUN_TESTS_KEY = '--run-tests'
+_GTEST_FILTER_KEY = '--gtest-filter'
+_JUNIT_KEY = '--junit'
+_AFFECTED_SINCE_KEY = '--affected-since'
+_TEST_TARGETS = ['runAllTests', 'runFastTests']
+_NO_TEST_CACHE_KEY = '--no-test-cache'
+_TEST_CACHE_SIZE_KEY = '--test-cache-size'
+_DEFAULT_TEST_CACHE_SIZE_MB = 256
+_WATCH_KEY = '--watch'
+# Changes that come in with smaller pauses than this are combined into one build.
+_WATCH_DEBOUNCE_SECONDS = 0.3
+_CMAKE_INPUT_ENDINGS = ['CMakeLists.txt', '.cmake', '.cmake.in']
+_FORCE_BUILD_KEY = '--force-build'
+_NO_COMPILER_LAUNCHER_KEY = '--no-compiler-launcher'
+_COMPILER_CACHE_SIZE_KEY = '--compiler-cache-size'
+_DEFAULT_COMPILER_CACHE_SIZE = '10G'
+_ARTIFACT_CACHE_KEY = '--artifact-cache'
+_ADAPTIVE_JOBS_KEY = '--adaptive-jobs'
+_PHYSICAL_CORES_KEY = '--physical-cores'
+_JOBSERVER_KEY = '--jobserver'
+_COMPILE_JOBS_KEY = '--compile-jobs'
+_LINK_JOBS_KEY = '--link-jobs'
+_PIN_CPUS_KEY = '--pin-cpus'
+_SAMPLE_RESOURCES_KEY = '--sample-resources'
+_QUIET_KEY = '--quiet'
+_BUILD_LOG_KEY = '--build-log'
+_INDEX_DIAGNOSTICS_KEY = '--index-diagnostics'
+_ERRORS_KEY = '--errors'
+_DEDUPLICATE_WARNINGS_KEY = '--deduplicate-warnings'
+_STALL_TIMEOUT_KEY = '--stall-timeout'
+_KILL_ON_STALL_KEY = '--kill-on-stall'
+_EVENTS_KEY = '--events'
+_METRICS_DIR_KEY = '--metrics-dir'
+# These options are not passed on to the 3_Make.py calls of the single configurations.
+# Each configuration writes its build log to its own default location.
+_NOT_FORWARDED_MAKE_OPTIONS = [_CPUS_KEY, _PIN_CPUS_KEY, _WATCH_KEY, _BUILD_LOG_KEY, '--help', '--version']
 
 class BuildAutomat:
     """
     The entry point for running the various steps of the make-pipeline.
     """
     def __init__(self, cpf_root_dir, cpf_cmake_dir, cibuildconfigurations_dir, filesystemaccess=filesystemaccess.FileSystemAccess()):
+        from . import buildevents
 
         # Object to operate on the file-system
         self.m_fs_access = filesystemaccess
@@ -41,6 +82,12 @@ class BuildAutomat:
         self.m_file_locations = filelocations.FileLocations(cpf_root_dir, cpf_cmake_dir, cibuildconfigurations_dir)
         # Object to access other os functionality
         self.m_os_access = miscosaccess.MiscOsAccess()
+        # Receives the events of the build steps
+        self.m_events = buildevents.EventSink()
+        # Collects the result of the running configure, generate or make call
+        self.m_result_recorder = None
+        self.m_step_lock = threading.RLock()
+        self.m_wrapper_profile = None
 
     def cpf_buildscripts_version_is_compatible_to_copied_script(self, copied_script_version):
         """
@@ -62,6 +109,27 @@ class BuildAutomat:
 
         return is_compatible
 
+    def start_wrapper_profile(self):
+        """
+        Replaces the file system and os access objects with proxies that count and time their
+        calls and starts sampling the python stack of the calling thread. This is used to measure
+        the overhead that the scripts add to small incremental builds.
+        """
+        from . import wrapperprofile
+        self.m_wrapper_profile = wrapperprofile.WrapperProfile()
+        self.m_fs_access = self.m_wrapper_profile.wrap_fs_access(self.m_fs_access)
+        self.m_os_access = self.m_wrapper_profile.wrap_os_access(self.m_os_access)
+        self.m_wrapper_profile.start()
+
+    def print_wrapper_profile(self):
+        """
+        Stops the profile of start_wrapper_profile() and prints the time in Python and in
+        subprocesses, the numbers of stat calls and spawned processes and the hottest functions.
+        """
+        self.m_wrapper_profile.stop()
+        for line in self.m_wrapper_profile.get_report():
+            self.m_os_access.print_console(line)
+
     def get_package_version(self, package_dir):
         package_dir = package_dir.replace('\\', '/')
         cmake_command = "cmake -D PACKAGE_DIR=\"{0}\" -P \"{1}\"".format(package_dir,self.m_file_locations.GET_PACKAGE_VERSION_SCRIPT)
@@ -70,45 +138,34 @@ class BuildAutomat:
     def configure(self, args):
         """
         Runs a cmake script in order to generate the developer cmake configuration file.
+        Multiple configurations can be given as <config_name>[:<parent>] specs or in
+        a manifest file. In that case all config files are created in parallel.
+        Returns a BuildResult.
         """
+        return self._run_build_step('configure', self._configure, args)
+
+    def _configure(self, args):
         try:
             args = self._add_quotes_to_d_options(args)
 
             # Assemble the cmake command for calling the cmake script that does the work.
-            cmake_command = ""
             if args[_LIST_KEY]:
                 cmake_command = "cmake -DLIST_CONFIGURATIONS=TRUE" \
                     + " -DCPF_ROOT_DIR=" + _quotes(str(self.m_file_locations.cpf_root_dir)) \
                     + " -DCPFCMake_DIR=" + _quotes(str(self.m_file_locations.cpf_cmake_dir)) \
                     + " -DCIBuildConfigurations_DIR=" + _quotes(str(self.m_file_locations.cibuildconfigurations_dir)) \
+                    + " -P " + _quotes(self.m_file_locations.GENERATE_CONFIG_FILE_SCRIPT)
+                return self.m_os_access.execute_command(cmake_command, print_command=True)
 
-            else:
-                if not args[_CONFIG_NAME_KEY]:
-                    return self._print_exception("Required argument {0} is missing.".format(_CONFIG_NAME_KEY))
-
-                inherited_config = args[_INHERITS_KEY]
-                if not inherited_config:
-                    inherited_config = args[_CONFIG_NAME_KEY]
-
-                # add basic options
-                cmake_command = "cmake" \
-                            + " -DDERIVED_CONFIG=" + args[_CONFIG_NAME_KEY] \
-                            + " -DPARENT_CONFIG=" + inherited_config \
-                            + " -DCPF_ROOT_DIR=" + _quotes(str(self.m_file_locations.cpf_root_dir)) \
-                            + " -DCPFCMake_DIR=" + _quotes(str(self.m_file_locations.cpf_cmake_dir)) \
-                            + " -DCIBuildConfigurations_DIR=" + _quotes(str(self.m_file_locations.cibuildconfigurations_dir)) \
+            config_specs = self._get_config_specs(args)
+            if not config_specs:
+                return self._print_exception("Required argument {0} is missing.".format(_CONFIG_NAME_KEY))
 
-                # Get the variable definitions
-                definitions = args["-D"]
-                if definitions:
-                    cmake_arg_definitions = []
-                    for definition in definitions:
-                        cmake_arg_definitions.append("-D" + definition)
-                    cmake_command += " " + " ".join(cmake_arg_definitions)
+            commands = [self._get_configure_command(spec) for spec in config_specs]
+            if len(commands) == 1:
+                return self.m_os_access.execute_command(commands[0], print_command=True) # Print the command which may be helpfull when the script is called from other tools.
 
-            cmake_command += " -P " + _quotes(self.m_file_locations.GENERATE_CONFIG_FILE_SCRIPT)
-
-            return self.m_os_access.execute_command(cmake_command, print_command=True) # Print the command which may be helpfull when the script is called from other tools.
+            return self._execute_configure_commands_in_parallel(config_specs, commands)
 
         except BaseException as exception:
             return self._print_exception(exception)
@@ -116,7 +173,13 @@ class BuildAutomat:
     def generate_make_files(self, args):
         """
         Runs the cmake to create the makefiles.
+        With the --metrics-dir option the duration and result are written as Prometheus metrics.
+        Returns a BuildResult.
         """
+        # The step has its own phase around the cmake call, which knows the configuration.
+        return self._run_build_step(None, self._generate_make_files, args, step_name='generate')
+
+    def _generate_make_files(self, args):
         try:
             start_time = time.perf_counter()
 
@@ -131,12 +194,15 @@ class BuildAutomat:
             if args[_CLEAN_KEY]:
                 self._clear_makefile_dir(config_name)
 
-            if self._has_existing_cache_file(config_name):
-                # Do the incremental generate if possible
-                self._call_cmake_for_existing_cache_file(config_name)
-            else:
-                # Do the full generate if no cache file is available.
-                self._call_cmake_with_full_arguments(config_name)
+            definitions = self._get_compiler_launcher_definitions(config_name, args) + self._get_job_pool_definitions(config_name)
+
+            with self.m_events.phase('generate', config=config_name):
+                if self._has_existing_cache_file(config_name):
+                    # Do the incremental generate if possible
+                    self._call_cmake_for_existing_cache_file(config_name, definitions)
+                else:
+                    # Do the full generate if no cache file is available.
+                    self._call_cmake_with_full_arguments(config_name, definitions)
 
             _print_elapsed_time(self.m_os_access, start_time, "Generating the make-files took")
             self.m_os_access.print_console('SUCCESS!')
@@ -150,11 +216,25 @@ class BuildAutomat:
     def make(self, args):
         """
         Uses CMake to make the code-base using the given make configuration.
+        With the --events option the phases, processes and cache results of the
+        build are written as json events to a file or socket. With the --metrics-dir
+        option they are summarized as Prometheus metrics. Returns a BuildResult.
         """
+        return self._run_build_step('make', self._make, args)
+
+    def _make(self, args):
         try:
             start_time = time.perf_counter()
 
+            if args.get(_ERRORS_KEY):
+                return self._print_diagnostics(args[_CONFIG_NAME_KEY])
+
             config_name = args[_CONFIG_NAME_KEY]
+            if isinstance(config_name, list):
+                if len(config_name) > 1:
+                    return self._make_multiple_configs(config_name, args, start_time)
+                config_name = config_name[0] if config_name else None
+
             if config_name:
                 # Try to generate a cache file if it does not yet exist.
                 if (not self._has_existing_cache_file(config_name)) or (not self._developer_config_file_exists(config_name)):
@@ -169,12 +249,245 @@ class BuildAutomat:
                 if not config_name:
                     return self._print_exception("No existing CMakeCache.txt file found. You need to run 2_Generate.py before running 3_Make.py")
 
-            # We not have a configuration with a cache file and can call cmake to build it.
-            cmake_build_command = self._get_cmake_build_command(config_name, args)
-            return_value = self.m_os_access.execute_command(cmake_build_command)
+            if args.get(_WATCH_KEY):
+                return self._watch(config_name, args)
+
+            return self._build(config_name, args, start_time)
+
+        except BaseException as exception:
+            return self._print_exception(exception)
+
+
+###############################################################################################################
+
+    def _run_build_step(self, phase_name, function, args, step_name=None):
+        """
+        Runs the function of a build step in the phase with the given name and returns a
+        BuildResult, which is collected from the events of the step. A step that is run by
+        another step, like the generate step of a make call, adds its events to the result
+        of the outer step and returns a boolean. The step name is the phase name, unless the
+        function starts the phase of the step itself.
+
+        The result and the event sinks belong to the running step, so a BuildAutomat runs
+        one step at a time. Calls from other threads wait until the running step is finished.
+        Builds that run at the same time need their own BuildAutomat objects.
+        """
+        from . import buildresult
+        with self.m_step_lock:
+            if self.m_result_recorder:
+                return self._run_phase(phase_name, function, args)
+
+            self.m_result_recorder = buildresult.ResultRecorder()
+            try:
+                self._open_event_sinks(args, step_name or phase_name)
+                self.m_result_recorder.result.success = self._run_phase(phase_name, function, args)
+            except BaseException as exception:
+                self._print_exception(exception)
+            finally:
+                self._close_event_sinks()
+                result = self.m_result_recorder.result
+                self.m_result_recorder = None
+            return result
+
+    def _run_phase(self, phase_name, function, args):
+        if not phase_name:
+            return function(args)
+        with self.m_events.phase(phase_name) as phase:
+            phase.success = function(args)
+        return phase.success
+
+    def _open_event_sinks(self, args, step_name):
+        """
+        Sends the events of the build and of the executed commands to the result recorder
+        and to the sinks of the --events and --metrics-dir options. The metrics use the
+        configuration of the command line, so a run that fails before the configuration
+        is known is still counted.
+        The events are appended to an existing file, so the 3_Make.py calls of multiple
+        configurations can write to the same file.
+        """
+        from . import buildevents
+        from . import buildmetrics
+        self._set_event_sink(self.m_result_recorder)
+        sinks = [self.m_result_recorder]
+        if args.get(_EVENTS_KEY):
+            address = buildevents.get_socket_address(args[_EVENTS_KEY])
+            if address:
+                stream = self.m_os_access.open_socket_stream(*address)
+            else:
+                stream = self.m_fs_access.open_text_file_for_appending(args[_EVENTS_KEY])
+            sinks.append(buildevents.JsonLinesEventSink(stream))
+        if args.get(_METRICS_DIR_KEY):
+            metrics_dir = PurePosixPath(args[_METRICS_DIR_KEY])
+            if not self.m_fs_access.isdir(metrics_dir):
+                raise Exception('Error: The metrics directory "{0}" does not exist.'.format(metrics_dir))
+            config_name = args.get(_CONFIG_NAME_KEY)
+            if isinstance(config_name, list):
+                config_name = config_name[0] if len(config_name) == 1 else None
+            sinks.append(buildmetrics.MetricsRecorder(
+                self.m_fs_access, metrics_dir, self.m_file_locations.cpf_root_dir, config_name, step_name))
+        if len(sinks) > 1:
+            self._set_event_sink(buildevents.MultiEventSink(sinks))
+
+    def _close_event_sinks(self):
+        from . import buildevents
+        self.m_events.close()
+        if self.m_events.error:
+            self.m_os_access.print_console('Warning: Not all build events and metrics could be written. {0}'.format(self.m_events.error))
+        self._set_event_sink(buildevents.EventSink())
+
+    def _set_event_sink(self, event_sink):
+        self.m_events = event_sink
+        self.m_os_access.set_event_sink(event_sink)
+
+    def _make_multiple_configs(self, config_names, args, start_time):
+        """
+        Builds the configurations at the same time by running one 3_Make.py process per
+        configuration. The --cpus are split between the processes. With the --pin-cpus option
+        each process tree is pinned to its own NUMA node or range of cpus. A group of cpus is
+        cut down to the share of an explicit --cpus option.
+        """
+        from . import buildresources
+        if args.get(_WATCH_KEY):
+            raise Exception('Error: The {0} option can only be used with one configuration.'.format(_WATCH_KEY))
+
+        cpu_groups = self._get_pinned_cpu_groups(len(config_names)) if args.get(_PIN_CPUS_KEY) else None
+        nr_cpus = self._get_nr_jobs(args)
+        commands = []
+        for index, config_name in enumerate(config_names):
+            prefix = ''
+            config_cpus = max(1, nr_cpus // len(config_names))
+            if cpu_groups:
+                node_ids, cpus = cpu_groups[index]
+                if args[_CPUS_KEY]:
+                    cpus = cpus[:config_cpus]
+                prefix = self._get_pinning_prefix(node_ids, cpus)
+                config_cpus = len(cpus)
+                self.m_os_access.print_console('Building {0} on the cpus {1}.'.format(config_name, buildresources.format_cpu_list(cpus)))
+            commands.append(prefix + self._get_make_script_command(config_name, config_cpus, args))
+
+        results = self.m_os_access.execute_commands_in_parallel(commands, cwd=str(self.m_file_locations.cpf_root_dir))
+        failed_configs = [config_name for config_name, result in zip(config_names, results) if result['returncode'] != 0]
+
+        _print_elapsed_time(self.m_os_access, start_time, "The builds took")
+        if failed_configs:
+            self.m_os_access.print_console('Error: Failed to build the configurations: {0}'.format(', '.join(failed_configs)))
+            return False
+
+        self._report_pinning_throughput(config_names, args, cpu_groups is not None, time.perf_counter() - start_time)
+        self.m_os_access.print_console('SUCCESS!')
+        return True
+
+    def _get_pinned_cpu_groups(self, nr_groups):
+        """
+        Returns the (node_ids, cpus) groups for pinning or None if pinning is not possible.
+        """
+        from . import buildresources
+        numa_nodes = self.m_os_access.numa_nodes()
+        if not numa_nodes or not (self.m_os_access.which('numactl') or self.m_os_access.which('taskset')):
+            self.m_os_access.print_console('Warning: The builds are not pinned to cpus, because the cpu topology or numactl and taskset are not available.')
+            return None
+        return buildresources.split_cpus(numa_nodes, nr_groups)
+
+    def _get_pinning_prefix(self, node_ids, cpus):
+        """
+        Returns the command that runs a command on the given cpus. numactl also keeps the memory
+        allocations on the nodes of the cpus.
+        """
+        from . import buildresources
+        if self.m_os_access.which('numactl'):
+            return 'numactl --physcpubind={0} --membind={1} '.format(
+                buildresources.format_cpu_list(cpus),
+                ','.join(str(node_id) for node_id in node_ids))
+        return 'taskset -c {0} '.format(buildresources.format_cpu_list(cpus))
+
+    def _get_make_script_command(self, config_name, nr_cpus, args):
+        """
+        Returns the 3_Make.py call that builds one configuration with the options of this call.
+        Each configuration writes its test results to its own --junit file.
+        """
+        command = '{0} {1} {2} {3} {4}'.format(
+            _quotes(sys.executable.replace('\\', '/')),
+            _quotes(self.m_file_locations.cpf_root_dir / '3_Make.py'),
+            config_name,
+            _CPUS_KEY,
+            nr_cpus)
+        for option in sorted(args):
+            value = args[option]
+            if not option.startswith('--') or option in _NOT_FORWARDED_MAKE_OPTIONS or value is None or value is False:
+                continue
+            if option == _JUNIT_KEY:
+                value = _get_config_junit_file(value, config_name)
+            command += ' ' + option
+            if value is not True:
+                command += ' ' + _quotes(value)
+        return command
+
+    def _report_pinning_throughput(self, config_names, args, pinned, duration):
+        """
+        Remembers the duration of the pinned or unpinned build of the configurations and
+        compares it with the last build of the other kind. Only builds of the same target
+        that are both clean or both incremental are compared.
+        """
+        import json
+        history_file = self.m_file_locations.get_full_path_generated_folder() / self.m_file_locations.PINNING_HISTORY_FILE_NAME
+        history = {}
+        if self.m_fs_access.isfile(history_file):
+            try:
+                history = json.loads(self.m_fs_access.readfile(history_file))
+            except ValueError:
+                pass
+
+        key = '{0} {1}={2} {3}'.format(
+            ' '.join(sorted(config_names)), _TARGET_KEY, args.get(_TARGET_KEY) or '', 'clean' if args.get(_CLEAN_KEY) else 'incremental')
+        durations = history.setdefault(key, {})
+        kind, other_kind = ('pinned', 'unpinned') if pinned else ('unpinned', 'pinned')
+        durations[kind] = duration
+        self.m_fs_access.mkdirs(history_file.parent)
+        self.m_fs_access.writefile(history_file, json.dumps(history, indent=4))
+
+        if durations.get(other_kind) and durations['pinned'] > 0:
+            pinned_duration = durations['pinned']
+            unpinned_duration = durations['unpinned']
+            self.m_os_access.print_console('The last pinned build took {0:.0f} s and the last unpinned build took {1:.0f} s. Pinning changed the throughput by {2:+.0f}%.'.format(
+                pinned_duration, unpinned_duration, 100.0 * (unpinned_duration / pinned_duration - 1.0)))
+
+    def _build(self, config_name, args, start_time):
+        """
+        Runs the build tool for a configuration that has a cache file.
+        """
+        try:
+            affected_packages = None
+            if args.get(_AFFECTED_SINCE_KEY):
+                affected_packages = self._get_affected_test_packages(config_name, args[_AFFECTED_SINCE_KEY])
+                if not affected_packages:
+                    self.m_os_access.print_console('No test package is affected by the changes. Nothing to do.')
+                    return True
+                args = self._get_args_for_affected_test_packages(args, affected_packages)
+
+            # Skip the build tool if nothing changed since the last successful build of the target.
+            nr_jobs = None
+            build_stamps, stamp_key, stamp = self._get_build_stamp(config_name, args)
+            if build_stamps and build_stamps.matches(stamp_key, stamp):
+                self.m_events.cache_used('build_stamp', 1, 0)
+                self.m_os_access.print_console('Nothing changed since the last successful build of this target. Use the {0} option to run the build tool anyway.'.format(_FORCE_BUILD_KEY))
+                return_value = True
+            else:
+                if build_stamps:
+                    self.m_events.cache_used('build_stamp', 0, 1)
+                # We not have a configuration with a cache file and can call cmake to build it.
+                return_value, nr_jobs = self._run_build_tool(config_name, args)
+                if return_value and build_stamps:
+                    build_stamps.store(stamp_key, stamp)
+
+            if return_value and args.get(_RUN_TESTS_KEY):
+                with self.m_events.phase('tests', config=config_name) as phase:
+                    return_value = self._run_tests(config_name, args, affected_packages)
+                    phase.success = return_value
 
             # Print some final output.
             _print_elapsed_time(self.m_os_access, start_time, "The build took")
+            if nr_jobs:
+                self.m_os_access.print_console('The build used {0} parallel jobs.'.format(nr_jobs))
             if return_value:
                 self.m_os_access.print_console('SUCCESS!')
 
@@ -183,8 +496,480 @@ class BuildAutomat:
         except BaseException as exception:
             return self._print_exception(exception)
 
+    def _run_build_tool(self, config_name, args):
+        """
+        Restores the outputs from the artifact cache or runs the build tool with the compiler cache.
+        Returns the result and the number of parallel jobs, which is None if the build tool did not run.
+        """
+        from . import compilercache
+        from . import jobpools
+        from . import resourcesampler
+        artifact_cache, cached_targets, output_dirs = self._get_artifact_cache(config_name, args)
+        if artifact_cache:
+            if self._restore_artifacts(artifact_cache, cached_targets, output_dirs):
+                self.m_events.cache_used('artifacts', len(cached_targets), 0)
+                self.m_os_access.print_console('Restored the outputs of {0} targets from the artifact cache.'.format(len(cached_targets)))
+                return True, None
+            self.m_events.cache_used('artifacts', 0, len(cached_targets))
+
+        launcher = self._get_compiler_launcher(config_name)
+        build_environment = None
+        if launcher:
+            build_environment = self._get_compiler_cache_environment(launcher, args)
+            server_cache_dir = compilercache.get_server_cache_dir(self.m_os_access, launcher, build_environment)
+            if server_cache_dir:
+                self.m_os_access.print_console('Warning: The sccache server on port {0} uses the cache directory {1} instead of {2}.'.format(
+                    build_environment.get('SCCACHE_SERVER_PORT'), server_cache_dir, build_environment['SCCACHE_DIR']))
+            statistics_before = compilercache.get_statistics(self.m_os_access, launcher, build_environment)
+
+        pool_sizes = self._update_job_pools(config_name, args)
+        nr_ninja_log_lines = len(self._read_ninja_log(config_name))
+
+        sampler = None
+        if args.get(_SAMPLE_RESOURCES_KEY):
+            if self.m_os_access.system() == 'Linux':
+                sampler = resourcesampler.ResourceSampler(self.m_os_access.running_process_ids)
+                sampler.start()
+            else:
+                self.m_os_access.print_console('Warning: The {0} option is only available on Linux.'.format(_SAMPLE_RESOURCES_KEY))
+        build_output = self._get_build_output(config_name, args)
+        return_value = False
+        try:
+            with self.m_events.phase('build', config=config_name) as phase:
+                return_value, nr_jobs = self._execute_build(config_name, args, build_environment, build_output)
+                phase.success = return_value
+        finally:
+            if sampler:
+                sampler.stop()
+            if build_output:
+                self._finish_build_output(config_name, args, build_output, return_value)
+
+        if sampler:
+            self._report_resource_usage(config_name, sampler.samples, nr_jobs)
+        if nr_jobs:
+            self.m_events.jobs_used(config_name, nr_jobs)
+
+        if pool_sizes:
+            ninja_log_entries = jobpools.parse_ninja_log(self._read_ninja_log(config_name)[nr_ninja_log_lines:])
+            for line in jobpools.get_utilization_report(ninja_log_entries, pool_sizes, self._read_ninja_build_rules(config_name)):
+                self.m_os_access.print_console(line)
+
+        if launcher:
+            statistics_after = compilercache.get_statistics(self.m_os_access, launcher, build_environment)
+            self.m_os_access.print_console(compilercache.get_statistics_summary(launcher, statistics_before, statistics_after))
+            if statistics_before is not None and statistics_after is not None:
+                self.m_events.cache_used(launcher, statistics_after[0] - statistics_before[0], statistics_after[1] - statistics_before[1])
+
+        if return_value and artifact_cache:
+            for output_dir in output_dirs:
+                if self.m_fs_access.isdir(output_dir):
+                    for target in cached_targets:
+                        artifact_cache.store(target, output_dir)
+        return return_value, nr_jobs
+
+    def _get_build_log_file(self, config_name, args):
+        if args.get(_BUILD_LOG_KEY):
+            return PurePosixPath(args[_BUILD_LOG_KEY])
+        return self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.BUILD_LOG_FILE_NAME
+
+    def _get_build_progress_file(self, config_name):
+        return self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.BUILD_PROGRESS_FILE_NAME
+
+    def _get_diagnostics_index_file(self, config_name):
+        return self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.DIAGNOSTICS_INDEX_FILE_NAME
+
+    def _get_build_output(self, config_name, args):
+        """
+        Returns the _BuildOutput with the streams that process the output of the build tool or None
+        if the output goes to the console unchanged.
+        With the --quiet option the console only shows the progress of the build and the output is
+        written to the build log. With the --index-diagnostics option the output is written to the
+        console and the log, and the diagnostics are indexed. The --deduplicate-warnings option
+        removes repeated warnings before the output reaches the console and the log. The
+        --stall-timeout option watches the output before it is changed by the other streams.
+        """
+        stall_seconds = self._get_stall_seconds(args)
+        if not stall_seconds and not any(args.get(key) for key in [_QUIET_KEY, _INDEX_DIAGNOSTICS_KEY, _DEDUPLICATE_WARNINGS_KEY]):
+            return None
+        from . import buildprogress
+        from . import diagnostics
+        from . import processtree
+        from . import stallwatchdog
+
+        build_output = _BuildOutput()
+        if args.get(_QUIET_KEY) or args.get(_INDEX_DIAGNOSTICS_KEY):
+            log_file = self._get_build_log_file(config_name, args)
+            self.m_os_access.print_console('The output of the build tool is written to {0}'.format(log_file))
+            build_output.log = self.m_fs_access.open_compressed_text_file(log_file)
+            build_output.stream = build_output.log
+        if args.get(_INDEX_DIAGNOSTICS_KEY):
+            build_output.indexer = diagnostics.DiagnosticsIndexer(build_output.log, echo=None if args.get(_QUIET_KEY) else self.m_os_access.console_stream())
+            build_output.stream = build_output.indexer
+        if args.get(_QUIET_KEY):
+            progress_file = self._get_build_progress_file(config_name)
+            history = buildprogress.get_history(self.m_fs_access.readfile(progress_file) if self.m_fs_access.isfile(progress_file) else '')
+            build_output.quiet_output = buildprogress.QuietBuildOutput(self.m_os_access.console_stream(), build_output.stream, history)
+            build_output.stream = build_output.quiet_output
+            build_output.line_handlers.append(build_output.quiet_output.handle_line)
+        if args.get(_DEDUPLICATE_WARNINGS_KEY):
+            build_output.deduplicator = diagnostics.WarningDeduplicator(build_output.stream or self.m_os_access.console_stream())
+            build_output.stream = build_output.deduplicator
+        if stall_seconds:
+            build_output.watchdog = stallwatchdog.StallWatchdog(
+                build_output.stream or self.m_os_access.console_stream(),
+                self.m_os_access.running_process_ids,
+                stall_seconds,
+                self._print_lines,
+                terminate=self.m_os_access.terminate_running_commands if args.get(_KILL_ON_STALL_KEY) else None,
+                read_process_stats=processtree.read_process_stats if self.m_os_access.system() == 'Linux' else None)
+            build_output.stream = build_output.watchdog
+            build_output.watchdog.start()
+        return build_output
+
+    def _get_stall_seconds(self, args):
+        """
+        Returns the seconds of the --stall-timeout option or None if the option is not used.
+        """
+        if not args.get(_STALL_TIMEOUT_KEY):
+            if args.get(_KILL_ON_STALL_KEY):
+                raise Exception('Error: The {0} option requires the {1} option.'.format(_KILL_ON_STALL_KEY, _STALL_TIMEOUT_KEY))
+            return None
+        try:
+            minutes = float(args[_STALL_TIMEOUT_KEY])
+        except ValueError:
+            minutes = 0.0
+        if minutes <= 0.0:
+            raise Exception('Error: The {0} option requires a positive number of minutes, but got "{1}".'.format(_STALL_TIMEOUT_KEY, args[_STALL_TIMEOUT_KEY]))
+        return minutes * 60
+
+    def _print_lines(self, lines):
+        for line in lines:
+            self.m_os_access.print_console(line)
+
+    def _finish_build_output(self, config_name, args, build_output, return_value):
+        """
+        Closes the build log and stores the build history and the diagnostics index.
+        """
+        if build_output.watchdog:
+            build_output.watchdog.stop()
+        if build_output.deduplicator:
+            build_output.deduplicator.close()
+        if build_output.quiet_output:
+            seconds_per_step = build_output.quiet_output.close(return_value)
+            if seconds_per_step:
+                from . import buildprogress
+                progress_file = self._get_build_progress_file(config_name)
+                history = self.m_fs_access.readfile(progress_file) if self.m_fs_access.isfile(progress_file) else ''
+                self.m_fs_access.writefile(progress_file, buildprogress.add_to_history(history, seconds_per_step))
+        elif build_output.indexer:
+            build_output.indexer.close()
+        elif build_output.log:
+            build_output.log.close()
+
+        if build_output.deduplicator:
+            for line in build_output.deduplicator.get_summary():
+                self.m_os_access.print_console(line)
+        log_file = self._get_build_log_file(config_name, args)
+        if build_output.log:
+            self.m_events.log_file_written('build_log', log_file)
+        if build_output.indexer:
+            from . import diagnostics
+            found_diagnostics = build_output.indexer.diagnostics
+            self.m_fs_access.writefile(self._get_diagnostics_index_file(config_name), diagnostics.get_index(log_file, found_diagnostics))
+            self.m_events.log_file_written('diagnostics_index', self._get_diagnostics_index_file(config_name))
+            nr_errors = sum(1 for diagnostic in found_diagnostics if diagnostic['severity'] == diagnostics.ERROR)
+            self.m_os_access.print_console('The build output contains {0} errors and {1} warnings. Use the {2} option to print them.'.format(
+                nr_errors, len(found_diagnostics) - nr_errors, _ERRORS_KEY))
+        if build_output.log and not return_value:
+            self.m_os_access.print_console('The full output of the build tool is in {0}'.format(log_file))
+        if build_output.watchdog and build_output.watchdog.killed:
+            self.m_os_access.print_console('Error: The build was killed, because it made no progress for {0} minutes.'.format(args[_STALL_TIMEOUT_KEY]))
+
+    def _print_diagnostics(self, config_names):
+        """
+        Prints the errors and then the warnings from the diagnostics index of the last build of the configurations.
+        """
+        from . import diagnostics
+        if not isinstance(config_names, list):
+            config_names = [config_names] if config_names else []
+        if not config_names:
+            config_names = [self._get_first_config_that_has_cache_file()]
+            if not config_names[0]:
+                raise Exception('Error: No existing CMakeCache.txt file found. You need to build a configuration before using the {0} option.'.format(_ERRORS_KEY))
+
+        for config_name in config_names:
+            index_file = self._get_diagnostics_index_file(config_name)
+            if not self.m_fs_access.isfile(index_file):
+                raise Exception('Error: There is no diagnostics index for configuration {0}. Run the build with the {1} option first.'.format(config_name, _INDEX_DIAGNOSTICS_KEY))
+            log_file, found_diagnostics = diagnostics.parse_index(self.m_fs_access.readfile(index_file))
+            errors = [diagnostic for diagnostic in found_diagnostics if diagnostic['severity'] == diagnostics.ERROR]
+            warnings = [diagnostic for diagnostic in found_diagnostics if diagnostic['severity'] != diagnostics.ERROR]
+            for diagnostic in errors + warnings:
+                self.m_os_access.print_console(diagnostics.format_diagnostic(diagnostic))
+            self.m_os_access.print_console('{0} errors and {1} warnings in the build log {2}'.format(len(errors), len(warnings), log_file))
+        return True
+
+    def _report_resource_usage(self, config_name, samples, nr_jobs):
+        """
+        Prints the utilization summary and writes the samples as a timeline in the Chrome trace format.
+        """
+        from . import resourcesampler
+        for line in resourcesampler.get_summary(samples, nr_jobs):
+            self.m_os_access.print_console(line)
+        timeline_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.RESOURCE_TIMELINE_FILE_NAME
+        self.m_fs_access.writefile(timeline_file, resourcesampler.get_timeline(samples))
+        self.m_events.log_file_written('resource_timeline', timeline_file)
+        self.m_os_access.print_console('The resource usage timeline was written to {0}'.format(timeline_file))
+
+    def _get_nr_jobs(self, args):
+        """
+        Returns the --cpus value or the number of cpus that the process may use.
+        """
+        if args[_CPUS_KEY]:
+            return int(args[_CPUS_KEY])
+        return self.m_os_access.cpu_count(physical_cores_only=bool(args.get(_PHYSICAL_CORES_KEY)))
+
+    def _execute_build_command(self, command, environment, build_output):
+        if build_output is None:
+            return self.m_os_access.execute_command(command, env=environment)
+        return self.m_os_access.execute_command(command, env=environment, output=build_output.stream, line_handlers=build_output.line_handlers)
+
+    def _execute_build(self, config_name, args, build_environment, build_output=None):
+        """
+        Runs the build tool and returns the result and the number of parallel jobs.
+        The jobs are handed out by a jobserver if a parent build provides one or if the
+        --jobserver or --adaptive-jobs options are given and the build tool supports it.
+        Otherwise they are limited with the --parallel option.
+        """
+        from . import buildresources
+        from . import jobserver
+        nr_jobs = self._get_nr_jobs(args)
+        job_memory = None
+        if args.get(_ADAPTIVE_JOBS_KEY):
+            history_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.BUILD_MEMORY_FILE_NAME
+            history = self.m_fs_access.readfile(history_file) if self.m_fs_access.isfile(history_file) else ''
+            job_memory = buildresources.get_job_memory(history)
+            available_memory = self.m_os_access.available_memory()
+            nr_jobs = buildresources.get_job_count(nr_jobs, available_memory, job_memory)
+            self.m_os_access.print_console('Adaptive parallelism: {0} jobs ({1} available, {2} per job).'.format(
+                nr_jobs,
+                buildresources.format_bytes(available_memory) if available_memory is not None else 'unknown memory',
+                buildresources.format_bytes(job_memory)))
+
+        environment = build_environment if build_environment is not None else self.m_os_access.environment()
+        inherited_nr_jobs = jobserver.get_inherited_jobserver(environment.get('MAKEFLAGS', ''))
+        wants_jobserver = inherited_nr_jobs is not None or args.get(_JOBSERVER_KEY) or args.get(_ADAPTIVE_JOBS_KEY)
+
+        if wants_jobserver and self._build_tool_supports_jobserver(config_name):
+            # This variable would make cmake pass a -j option, which disables the jobserver.
+            environment.pop('CMAKE_BUILD_PARALLEL_LEVEL', None)
+            cmake_build_command = self._get_cmake_build_command(config_name, args, use_jobserver=True)
+            if inherited_nr_jobs is not None:
+                self.m_os_access.print_console('Using the jobserver of the parent build.')
+                return_value = self._execute_build_command(cmake_build_command, environment, build_output)
+                nr_jobs = inherited_nr_jobs
+            else:
+                return_value, nr_jobs = self._execute_build_with_jobserver(cmake_build_command, environment, nr_jobs, job_memory, args.get(_JOBSERVER_KEY), build_output)
+        else:
+            build_args = dict(args)
+            build_args[_CPUS_KEY] = str(nr_jobs)
+            return_value = self._execute_build_command(self._get_cmake_build_command(config_name, build_args), build_environment, build_output)
+
+        peak_job_memory = self.m_os_access.peak_child_rss()
+        if job_memory and return_value and peak_job_memory:
+            self.m_fs_access.writefile(history_file, buildresources.add_to_history(history, peak_job_memory))
+        return return_value, nr_jobs
+
+    def _execute_build_with_jobserver(self, cmake_build_command, environment, nr_jobs, job_memory, shared, build_output=None):
+        """
+        Runs the build with a private jobserver or with the jobserver that is shared by all builds
+        on the machine. If the job memory is given, fewer jobs are run while the memory is low.
+        """
+        from . import jobserver
+        with jobserver.JobServer(nr_jobs, jobserver.get_shared_directory() if shared else None) as job_server:
+            if not job_server.acquire_slot(timeout=0):
+                self.m_os_access.print_console('Waiting for a free job slot of the shared jobserver ...')
+                job_server.acquire_slot()
+
+            throttle = None
+            if job_memory:
+                throttle = jobserver.MemoryThrottle(job_server, job_memory, self.m_os_access.available_memory)
+                throttle.start()
+            try:
+                return_value = self._execute_build_command(cmake_build_command, job_server.get_environment(environment), build_output)
+            finally:
+                if throttle:
+                    throttle.stop()
+
+        if throttle and throttle.min_nr_jobs < job_server.nr_jobs:
+            self.m_os_access.print_console('Low memory reduced the number of parallel jobs down to {0}.'.format(throttle.min_nr_jobs))
+        return return_value, job_server.nr_jobs
+
+    def _build_tool_supports_jobserver(self, config_name):
+        """
+        Returns true if the build tool of the configuration can take its jobs from a fifo jobserver.
+        """
+        from . import jobserver
+        cache_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / "CMakeCache.txt"
+        if self.m_os_access.system() != 'Linux' or not self.m_fs_access.isfile(cache_file):
+            return False
+
+        make_program = None
+        for line in self.m_fs_access.readfile(cache_file).splitlines():
+            if line.startswith('CMAKE_MAKE_PROGRAM:'):
+                make_program = line.split('=', 1)[1].strip()
+        if not make_program:
+            return False
+
+        try:
+            version_output = self.m_os_access.execute_command_output(
+                _quotes(make_program) + ' --version',
+                print_output=miscosaccess.OutputMode.NEVER)
+        except miscosaccess.CalledProcessError:
+            return False
+        return jobserver.is_supported_client(make_program, version_output)
+
+    def _get_artifact_cache(self, config_name, args):
+        """
+        Returns the artifact cache, the targets that are created by the build and the binary
+        output directories of the built compiler config. The cache is None if it is not enabled.
+        """
+        from . import artifactcache
+        from . import testimpact
+        dot_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.TARGET_DEPENDENCIES_DOT_FILE_NAME
+        if not args.get(_ARTIFACT_CACHE_KEY) or args[_CLEAN_KEY] or not self.m_fs_access.isfile(dot_file):
+            return None, [], []
+
+        sources_dir = self.m_file_locations.get_full_path_source_folder()
+        artifact_cache = artifactcache.ArtifactCache(
+            self.m_fs_access,
+            PurePosixPath(args[_ARTIFACT_CACHE_KEY].replace('\\', '/')),
+            sources_dir,
+            testimpact.parse_dependency_graph(self.m_fs_access.readfile(dot_file)))
+
+        # The paths are not part of the key, so machines with different checkout
+        # directories can share the cache.
+        artifact_cache.add_global_input('config', self.m_fs_access.readfile(self.m_file_locations.get_full_path_config_file(config_name)))
+        for entry in sorted(self.m_fs_access.listdir(sources_dir)):
+            if self.m_fs_access.isfile(sources_dir / entry):
+                artifact_cache.add_global_input(entry, self.m_fs_access.get_file_hash(sources_dir / entry))
+
+        cached_targets = set()
+        build_targets = args[_TARGET_KEY].split() if args[_TARGET_KEY] else [None]
+        for build_target in build_targets:
+            targets = artifact_cache.get_targets(build_target)
+            if targets is None:
+                # The build tool must run the commands of targets that are not in the graph.
+                return None, [], []
+            cached_targets |= set(targets)
+
+        return artifact_cache, sorted(cached_targets), self._get_artifact_output_folders(config_name, args[_CONFIG_KEY])
+
+    def _get_artifact_output_folders(self, config_name, compiler_config):
+        """
+        Returns the output folder of the given compiler config or of the config that the build tool
+        builds by default. The folder is taken from the CMakeCache.txt file instead of the existing
+        folders, so a new build machine can restore its first build from the cache.
+        """
+        from . import artifactcache
+        if not compiler_config:
+            compiler_config = artifactcache.get_default_compiler_config(self._read_cmake_cache(config_name))
+        if not compiler_config:
+            return []
+        return [self.m_file_locations.get_full_path_binary_output_folder(config_name, compiler_config)]
+
+    def _restore_artifacts(self, artifact_cache, targets, output_dirs):
+        """
+        Restores the outputs if all targets are in the cache. Outputs of single targets are
+        not restored, because the build tool would overwrite them anyway.
+        """
+        if not output_dirs:
+            return False
+        if not all(artifact_cache.contains(target, output_dir) for target in targets for output_dir in output_dirs):
+            return False
+        for output_dir in output_dirs:
+            for target in targets:
+                artifact_cache.restore(target, output_dir)
+        return True
+
+    def _get_compiler_cache_environment(self, launcher, args):
+        """
+        Returns the build environment that makes the launcher use the cache directory that is
+        shared by all configurations of the CPF root.
+        """
+        from . import compilercache
+        max_size = args.get(_COMPILER_CACHE_SIZE_KEY)
+        if not max_size:
+            max_size = _DEFAULT_COMPILER_CACHE_SIZE
+        return compilercache.get_environment(
+            launcher,
+            self.m_os_access.environment(),
+            self.m_file_locations.get_full_path_generated_folder() / self.m_file_locations.COMPILER_CACHE_DIR,
+            max_size)
+
+    def _get_build_stamp(self, config_name, args):
+        """
+        Returns the BuildStamps object, the key of the build and the stamp of the current source
+        tree state. The BuildStamps object is None if the null-build check is disabled.
+        """
+        from . import buildstamp
+        if args[_CLEAN_KEY] or args.get(_FORCE_BUILD_KEY):
+            return None, None, None
+
+        makefile_directory = self.m_file_locations.get_full_path_config_makefile_folder(config_name)
+        build_stamps = buildstamp.BuildStamps(
+            self.m_os_access,
+            self.m_fs_access,
+            makefile_directory / self.m_file_locations.BUILD_STAMPS_FILE_NAME)
+        stamp = build_stamps.get_current_stamp(
+            self.m_file_locations.get_full_path_cpf_root(),
+            [self.m_file_locations.get_full_path_config_file(config_name), makefile_directory / "CMakeCache.txt"],
+            [self.m_file_locations.GENERATED_FILES_DIR])
+        stamp_key = '{0}|{1}'.format(args[_TARGET_KEY], args[_CONFIG_KEY])
+        return build_stamps, stamp_key, stamp
+
+    def _watch(self, config_name, args):
+        """
+        Builds the configuration whenever files in the Sources or Configuration directory change.
+        A running build is cancelled when new changes arrive. The generate step is only
+        executed when CMake files or the configuration files changed.
+        """
+        from . import filewatcher
+        watched_dirs = [self.m_file_locations.get_full_path_source_folder(), self.m_file_locations.get_full_path_configuration_folder()]
+        watcher = filewatcher.FileWatcher(watched_dirs)
+        build = None
+        try:
+            build = _WatchBuild(self, config_name, args, False)
+            build.start()
+            while True:
+                self.m_os_access.print_console('-- Watching {0} for changes. Press Ctrl+C to stop.'.format(' and '.join(str(path) for path in watched_dirs)))
+                changed_paths = watcher.wait_for_changes()
+                # Coalesce bursts of saves into one build.
+                while True:
+                    more_changed_paths = watcher.wait_for_changes(_WATCH_DEBOUNCE_SECONDS)
+                    if not more_changed_paths:
+                        break
+                    changed_paths |= more_changed_paths
+
+                if build.is_alive():
+                    self.m_os_access.print_console('-- Files changed. Cancel the running build.')
+                    self.m_os_access.terminate_running_commands()
+                    build.join()
+
+                # A generate step that was cancelled or failed is repeated.
+                regenerate = any(_is_cmake_input(path) for path in changed_paths) or (build.regenerate and not build.generated)
+                build = _WatchBuild(self, config_name, args, regenerate)
+                build.start()
+
+        except KeyboardInterrupt:
+            self.m_os_access.terminate_running_commands()
+            # Ctrl+C may arrive before the first build thread was created or started.
+            if build is not None and build.is_alive():
+                build.join()
+            return True
+        finally:
+            watcher.close()
 
-###############################################################################################################
 
     def _add_quotes_to_d_options(self, args):
         """
@@ -192,16 +977,101 @@ class BuildAutomat:
         """
         d_options = args['-D']
         if d_options:
-            for index, option in enumerate(d_options):
-                if '=' not in option:
-                    raise Exception('-D option "' + option + '" does not seem to be a valid definition because of a missing "=" character.')
-                definition = option.split('=')[1]
-                if ' ' in definition:
-                    cmake_variable = option.split('=')[0]
-                    d_options[index] = cmake_variable + '=' + _quotes(definition)
+            d_options = _quote_definitions(d_options)
         args['-D'] = d_options
         return args
 
+    def _get_config_specs(self, args):
+        """
+        Returns a list of dictionaries with the keys 'name', 'parent' and 'definitions'
+        for all configurations that are given by the <config_name> argument and the
+        optional manifest file.
+        """
+        import json
+        shared_definitions = list(args['-D'] or [])
+        specs = []
+
+        config_names = args[_CONFIG_NAME_KEY]
+        if isinstance(config_names, str):
+            config_names = [config_names]
+        for config_name_spec in config_names or []:
+            specs.append(self._parse_config_spec(config_name_spec, args[_INHERITS_KEY], []))
+
+        manifest_file = args.get(_MANIFEST_KEY)
+        if manifest_file:
+            manifest = json.loads(self.m_fs_access.readfile(manifest_file))
+            # The shared definitions of the command line override the ones from the manifest.
+            shared_definitions = _quote_definitions(manifest.get('definitions', [])) + shared_definitions
+            for entry in manifest.get('configurations', []):
+                if isinstance(entry, str):
+                    specs.append(self._parse_config_spec(entry, args[_INHERITS_KEY], []))
+                else:
+                    name = entry['name']
+                    parent = entry.get('inherits', args[_INHERITS_KEY])
+                    specs.append(self._parse_config_spec(name, parent, _quote_definitions(entry.get('definitions', []))))
+
+        for spec in specs:
+            # Per-config definitions come last so they override the shared ones.
+            spec['definitions'] = shared_definitions + spec['definitions']
+
+        return specs
+
+    def _parse_config_spec(self, config_spec, default_parent, definitions):
+        """
+        Splits a <config_name>[:<parent>] spec into its parts.
+        """
+        name, separator, parent = config_spec.partition(':')
+        if not separator:
+            parent = default_parent
+        if not name:
+            raise Exception('Error: The configuration spec "{0}" has no <config_name>.'.format(config_spec))
+        if not parent:
+            parent = name
+        return {'name': name, 'parent': parent, 'definitions': definitions}
+
+    def _get_configure_command(self, config_spec):
+        """
+        Returns the cmake command that creates the config file for one configuration.
+        """
+        cmake_command = "cmake" \
+                    + " -DDERIVED_CONFIG=" + config_spec['name'] \
+                    + " -DPARENT_CONFIG=" + config_spec['parent'] \
+                    + " -DCPF_ROOT_DIR=" + _quotes(str(self.m_file_locations.cpf_root_dir)) \
+                    + " -DCPFCMake_DIR=" + _quotes(str(self.m_file_locations.cpf_cmake_dir)) \
+                    + " -DCIBuildConfigurations_DIR=" + _quotes(str(self.m_file_locations.cibuildconfigurations_dir)) \
+
+        # Get the variable definitions
+        definitions = config_spec['definitions']
+        if definitions:
+            cmake_arg_definitions = []
+            for definition in definitions:
+                cmake_arg_definitions.append("-D" + definition)
+            cmake_command += " " + " ".join(cmake_arg_definitions)
+
+        cmake_command += " -P " + _quotes(self.m_file_locations.GENERATE_CONFIG_FILE_SCRIPT)
+        return cmake_command
+
+    def _execute_configure_commands_in_parallel(self, config_specs, commands):
+        """
+        Runs the configure commands in batches of cpu_count() parallel processes.
+        Returns true if all commands succeeded.
+        """
+        batch_size = max(1, self.m_os_access.cpu_count())
+        failed_configs = []
+        for batch_start in range(0, len(commands), batch_size):
+            batch_commands = commands[batch_start:batch_start + batch_size]
+            results = self.m_os_access.execute_commands_in_parallel(batch_commands, cwd=str(self.m_file_locations.cpf_root_dir))
+            for index, result in enumerate(results):
+                if result['returncode'] != 0:
+                    failed_configs.append(config_specs[batch_start + index]['name'])
+
+        if failed_configs:
+            self.m_os_access.print_console('Error: Failed to create the configurations: {0}'.format(', '.join(failed_configs)))
+            return False
+
+        self.m_os_access.print_console('Created {0} configurations.'.format(len(commands)))
+        return True
+
     def _get_inherit_option(self, args):
         """
         Returns the argument or the default inheritance depending on the system.
@@ -214,6 +1084,7 @@ class BuildAutomat:
     def _print_exception(self, exception):
         #print('---------------- ' + str(exception))
         self.m_os_access.print_console(str(exception))
+        self.m_events.error_printed(str(exception))
         return False
 
     def _get_config_name_and_run_config_step_if_needed(self, args):
@@ -283,7 +1154,129 @@ class BuildAutomat:
         if self.m_fs_access.exists(full_config_path):
             self.m_fs_access.rmtree(full_config_path)
 
-    def _call_cmake_with_full_arguments(self, config_name):
+    def _get_compiler_launcher_definitions(self, config_name, args):
+        """
+        Returns the -D options that set ccache or sccache as compiler launcher if one of them
+        is available and the config file does not set a launcher itself. With the
+        --no-compiler-launcher option, -U options remove a launcher of an earlier generate.
+        """
+        from . import compilercache
+        config_file = self.m_file_locations.get_full_path_config_file(config_name)
+        if self.m_fs_access.isfile(config_file) and 'COMPILER_LAUNCHER' in self.m_fs_access.readfile(config_file):
+            return []
+
+        if args.get(_NO_COMPILER_LAUNCHER_KEY):
+            # The launcher of an earlier generate would otherwise stay in the cache.
+            if compilercache.has_launcher_in_cmake_cache(self._read_cmake_cache(config_name)):
+                return compilercache.get_remove_launcher_definitions()
+            return []
+
+        launcher_path = compilercache.find_compiler_launcher(self.m_os_access)
+        if not launcher_path:
+            return []
+        return compilercache.get_launcher_definitions(launcher_path)
+
+    def _get_job_pool_definitions(self, config_name):
+        """
+        Returns the -D options that create separate Ninja job pools for compiling and linking.
+        The pools are sized from the cpus and the total memory unless their sizes were set with
+        the --compile-jobs or --link-jobs options. Nothing is returned for other generators or
+        if the config file sets up job pools itself.
+        """
+        from . import jobpools
+        config_file = self.m_file_locations.get_full_path_config_file(config_name)
+        config_content = self.m_fs_access.readfile(config_file) if self.m_fs_access.isfile(config_file) else ''
+        if 'JOB_POOL' in config_content or not jobpools.is_ninja_generator(self._read_cmake_cache(config_name), config_content):
+            return []
+
+        pool_sizes = self._get_default_job_pool_sizes(config_name)
+        pool_sizes.update(self._read_job_pool_overrides(config_name))
+        return jobpools.get_definitions(pool_sizes)
+
+    def _get_default_job_pool_sizes(self, config_name):
+        from . import buildresources
+        from . import jobpools
+        history_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.BUILD_MEMORY_FILE_NAME
+        history = self.m_fs_access.readfile(history_file) if self.m_fs_access.isfile(history_file) else ''
+        return jobpools.get_pool_sizes(
+            self.m_os_access.cpu_count(),
+            self.m_os_access.total_memory(),
+            buildresources.DEFAULT_JOB_MEMORY_BYTES,
+            max(buildresources.get_job_memory(history), jobpools.DEFAULT_LINK_JOB_MEMORY_BYTES))
+
+    def _update_job_pools(self, config_name, args):
+        """
+        Changes the sizes of the job pools if the --compile-jobs or --link-jobs options require it
+        and returns the pool sizes of the configuration. The sizes of the options are stored, so
+        later generates keep them until the option is given with 0.
+        """
+        from . import jobpools
+        pool_sizes = jobpools.get_pools_from_cmake_cache(self._read_cmake_cache(config_name))
+        if not pool_sizes:
+            return pool_sizes
+
+        overrides = self._read_job_pool_overrides(config_name)
+        new_overrides = dict(overrides)
+        for pool, key in [(jobpools.COMPILE_POOL, _COMPILE_JOBS_KEY), (jobpools.LINK_POOL, _LINK_JOBS_KEY)]:
+            if args.get(key):
+                if int(args[key]) > 0:
+                    new_overrides[pool] = int(args[key])
+                else:
+                    new_overrides.pop(pool, None)
+        if new_overrides != overrides:
+            overrides_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.JOB_POOLS_FILE_NAME
+            self.m_fs_access.writefile(overrides_file, jobpools.format_pool_overrides(new_overrides))
+
+        new_pool_sizes = dict(pool_sizes)
+        removed_pools = [pool for pool in overrides if pool not in new_overrides]
+        if removed_pools:
+            default_pool_sizes = self._get_default_job_pool_sizes(config_name)
+            new_pool_sizes.update({pool: default_pool_sizes[pool] for pool in removed_pools})
+        new_pool_sizes.update(new_overrides)
+        if new_pool_sizes != pool_sizes:
+            self._call_cmake_for_existing_cache_file(config_name, jobpools.get_definitions(new_pool_sizes))
+        return new_pool_sizes
+
+    def _read_job_pool_overrides(self, config_name):
+        from . import jobpools
+        overrides_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.JOB_POOLS_FILE_NAME
+        return jobpools.parse_pool_overrides(self.m_fs_access.readfile(overrides_file) if self.m_fs_access.isfile(overrides_file) else '')
+
+    def _read_cmake_cache(self, config_name):
+        cache_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / "CMakeCache.txt"
+        return self.m_fs_access.readfile(cache_file) if self.m_fs_access.isfile(cache_file) else ''
+
+    def _read_ninja_log(self, config_name):
+        log_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / '.ninja_log'
+        return self.m_fs_access.readfile(log_file).splitlines() if self.m_fs_access.isfile(log_file) else []
+
+    def _read_ninja_build_rules(self, config_name):
+        """
+        Returns the rules of the outputs in the build.ninja file of the configuration and the files that it includes.
+        """
+        from . import jobpools
+        makefile_folder = self.m_file_locations.get_full_path_config_makefile_folder(config_name)
+        output_rules = {}
+        ninja_files = ['build.ninja']
+        while ninja_files:
+            ninja_file = makefile_folder / ninja_files.pop()
+            if self.m_fs_access.isfile(ninja_file):
+                content = self.m_fs_access.readfile(ninja_file)
+                output_rules.update(jobpools.parse_build_rules(content))
+                ninja_files.extend(jobpools.get_included_files(content))
+        return output_rules
+
+    def _get_compiler_launcher(self, config_name):
+        """
+        Returns the name of the compiler cache that is used by the configuration or None.
+        """
+        from . import compilercache
+        cache_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / "CMakeCache.txt"
+        if not self.m_fs_access.isfile(cache_file):
+            return None
+        return compilercache.get_launcher_from_cmake_cache(self.m_fs_access.readfile(cache_file))
+
+    def _call_cmake_with_full_arguments(self, config_name, definitions=()):
         """
         Assembles the correct arguments for cmake and executes the cmake generate step
         """
@@ -303,11 +1296,13 @@ class BuildAutomat:
             # Generate the .dot file that is used to document the target dependencies.
             " --graphviz="+ _quotes(makefile_directory  / self.m_file_locations.TARGET_DEPENDENCIES_DOT_FILE_NAME)
             )
+        for definition in definitions:
+            command += " " + definition
 
         if not self.m_os_access.execute_command(command):
             raise Exception("The python script failed because the call to cmake failed!")
 
-    def _call_cmake_for_existing_cache_file(self, config_name):
+    def _call_cmake_for_existing_cache_file(self, config_name, definitions=()):
         """
         runs CMake and uses the cached variables from the CMakeCache file.
         """
@@ -316,21 +1311,22 @@ class BuildAutomat:
             "cmake " + _quotes(makefile_directory) +
             " --graphviz="+ _quotes(makefile_directory / self.m_file_locations.TARGET_DEPENDENCIES_DOT_FILE_NAME)
             )
+        for definition in definitions:
+            full_command += " " + definition
 
         if not self.m_os_access.execute_command(full_command):
             raise Exception("The python script failed because the call to cmake failed!")
 
-    def _get_cmake_build_command(self, config_name, args):
+    def _get_cmake_build_command(self, config_name, args, use_jobserver=False):
         """
         Assembles a cmake command line call to build the given configuration.
+        The --parallel option is left out when the jobs are taken from a jobserver.
         """
         # get command argument values
         is_clean_build = args[_CLEAN_KEY]
         target = args[_TARGET_KEY]
         config = args[_CONFIG_KEY]
-        nr_cpus = args[_CPUS_KEY]
-        if not nr_cpus:
-            nr_cpus = str(self.m_os_access.cpu_count())
+        nr_cpus = str(self._get_nr_jobs(args))
 
         # now assemble the command
         makefile_directory = self.m_file_locations.get_full_path_config_makefile_folder(config_name)
@@ -345,14 +1341,166 @@ class BuildAutomat:
         if is_clean_build:
             command += ' --clean-first'
 
-        command +=' --parallel ' + nr_cpus
+        if not use_jobserver:
+            command +=' --parallel ' + nr_cpus
 
         return command
 
+    def _get_affected_test_packages(self, config_name, base_ref):
+        """
+        Returns the packages whose tests depend on the files that changed since base_ref
+        and prints the reasons for running or skipping each test package.
+        """
+        from . import testimpact
+        analysis = testimpact.TestImpactAnalysis(self.m_os_access, self.m_fs_access, self.m_file_locations)
+        affected_packages = analysis.get_affected_test_packages(config_name, base_ref)
+        self.m_os_access.print_console('\n'.join(analysis.report))
+        return affected_packages
+
+    def _get_args_for_affected_test_packages(self, args, affected_packages):
+        """
+        Replaces a runAllTests or runFastTests target with the test targets of the affected packages.
+        """
+        target = args[_TARGET_KEY]
+        if target in _TEST_TARGETS:
+            args = dict(args)
+            args[_TARGET_KEY] = ' '.join(target + '_' + package for package in affected_packages)
+        elif not args.get(_RUN_TESTS_KEY):
+            raise Exception('Error: The {0} option requires the {1} option or one of the targets {2}.'.format(_AFFECTED_SINCE_KEY, _RUN_TESTS_KEY, ', '.join(_TEST_TARGETS)))
+        return args
+
+    def _run_tests(self, config_name, args, affected_packages=None):
+        """
+        Runs the test executables of the configuration in parallel.
+        If affected_packages is given, only the tests of these packages are run.
+        """
+        from . import testrunner
+        nr_processes = self._get_nr_jobs(args)
+
+        makefile_directory = self.m_file_locations.get_full_path_config_makefile_folder(config_name)
+        runner = testrunner.TestRunner(
+            self.m_os_access,
+            self.m_fs_access,
+            makefile_directory / self.m_file_locations.TEST_DURATIONS_FILE_NAME,
+            int(nr_processes))
+
+        executables = runner.find_test_executables(self._get_binary_output_folders(config_name, args[_CONFIG_KEY]))
+        if affected_packages is not None:
+            executables = [executable for executable in executables if testrunner.get_package_name(executable) in affected_packages]
+
+        junit_file = args.get(_JUNIT_KEY)
+        if not junit_file:
+            junit_file = makefile_directory / self.m_file_locations.TEST_RESULTS_FILE_NAME
+
+        result_cache = None
+        if not args.get(_NO_TEST_CACHE_KEY):
+            result_cache = self._get_test_result_cache(config_name, args)
+
+        return_value = runner.run(executables, junit_file, args.get(_GTEST_FILTER_KEY), result_cache)
+        if executables:
+            self.m_events.log_file_written('test_results', junit_file)
+        if result_cache:
+            self.m_events.cache_used('test_results', result_cache.hits, result_cache.misses)
+        return return_value
+
+    def _get_test_result_cache(self, config_name, args):
+        from . import testcache
+        from . import testimpact
+        cache_size_mb = args.get(_TEST_CACHE_SIZE_KEY)
+        if not cache_size_mb:
+            cache_size_mb = _DEFAULT_TEST_CACHE_SIZE_MB
+
+        result_cache = testcache.TestResultCache(
+            self.m_fs_access,
+            self.m_file_locations.get_full_path_generated_folder() / self.m_file_locations.TEST_RESULT_CACHE_DIR,
+            int(cache_size_mb) * 1024 * 1024)
+
+        dependency_graph = None
+        dot_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.TARGET_DEPENDENCIES_DOT_FILE_NAME
+        if self.m_fs_access.isfile(dot_file):
+            dependency_graph = testimpact.parse_dependency_graph(self.m_fs_access.readfile(dot_file))
+        result_cache.set_dependency_information(dependency_graph, self.m_file_locations.get_full_path_source_folder())
+        return result_cache
+
+    def _get_binary_output_folders(self, config_name, compiler_config):
+        """
+        Returns the BuildStage/<compiler_config> folder or all BuildStage sub-folders if no
+        compiler config is given.
+        """
+        if compiler_config:
+            return [self.m_file_locations.get_full_path_binary_output_folder(config_name, compiler_config)]
+
+        base_folder = self.m_file_locations.get_full_path_binary_output_base_folder(config_name)
+        if not self.m_fs_access.isdir(base_folder):
+            return []
+        return [base_folder / entry for entry in sorted(self.m_fs_access.listdir(base_folder)) if self.m_fs_access.isdir(base_folder / entry)]
+
+class _BuildOutput:
+    """
+    The streams that process the output of the build tool. The output is written to
+    stream, which passes it on to the next streams in the order watchdog, deduplicator,
+    quiet_output, indexer and log. Streams of unused options are None.
+    """
+    def __init__(self):
+        self.stream = None
+        self.line_handlers = []
+        self.watchdog = None
+        self.deduplicator = None
+        self.quiet_output = None
+        self.indexer = None
+        self.log = None
+
+
+class _WatchBuild(threading.Thread):
+    """
+    Runs the generate step if needed and the build in a background thread,
+    so the watch loop can cancel it.
+    """
+    def __init__(self, automat, config_name, args, regenerate):
+        threading.Thread.__init__(self, daemon=True)
+        self.m_automat = automat
+        self.m_config_name = config_name
+        self.m_args = args
+        self.regenerate = regenerate
+        self.generated = False
+
+    def run(self):
+        try:
+            start_time = time.perf_counter()
+            if self.regenerate:
+                self.m_automat._call_cmake_for_existing_cache_file(self.m_config_name)
+                self.generated = True
+            self.m_automat._build(self.m_config_name, self.m_args, start_time)
+        except BaseException as exception:
+            self.m_automat._print_exception(exception)
+
+
 ########### free functions #########################################################################
+def _is_cmake_input(path):
+    """
+    Returns true for files that require a new generate step when they change.
+    """
+    path = str(path).replace('\\', '/')
+    return any(path.endswith(ending) for ending in _CMAKE_INPUT_ENDINGS) or '/Configuration/' in path
+
 def _quotes(string):
     return '"' + str(string) + '"'
 
+def _quote_definitions(definitions):
+    """
+    Adds quotes to the values of <variable>=<value> definitions that contain spaces.
+    """
+    quoted_definitions = []
+    for option in definitions:
+        if '=' not in option:
+            raise Exception('-D option "' + option + '" does not seem to be a valid definition because of a missing "=" character.')
+        definition = option.split('=')[1]
+        if ' ' in definition:
+            cmake_variable = option.split('=')[0]
+            option = cmake_variable + '=' + _quotes(definition)
+        quoted_definitions.append(option)
+    return quoted_definitions
+
 def _get_option_from_args(args, possible_options):
     for option in possible_options:
         option_arg = '--' + option
@@ -361,9 +1509,19 @@ def _get_option_from_args(args, possible_options):
     return None
 
 
+def _get_config_junit_file(junit_file, config_name):
+    """
+    Returns the --junit file of one configuration of a multiple configuration build,
+    like results.Debug.xml for results.xml.
+    """
+    root, extension = os.path.splitext(junit_file)
+    return '{0}.{1}{2}'.format(root, config_name, extension or '.xml')
+
+
 def _print_elapsed_time(os_access, start_time, prefix_string):
     """Prints the time that has elapsed between the given start time and the call of this function."""
     end_time = time.perf_counter()
+    import datetime
     time_rounded_seconds = round(end_time - start_time)
     time_string = str(datetime.timedelta(seconds=time_rounded_seconds))
     os_access.print_console("{0} {1} h:m:s or {2} s".format(prefix_string, time_string, time_rounded_seconds))
@@ -4,12 +4,17 @@ This module contains unit tests for the BuildAutomat class.
 #!/usr/bin/python3
 
 import unittest
+import json
+import sys
+import time
+import threading
 from unittest.mock import patch
 
 from . import buildautomat
 from . import miscosaccess
 from . import filesystemaccess
 from . import filelocations
+from . import compilercache
 
 
 _WINDOWS = "Windows"
@@ -172,6 +177,76 @@ class TestBuildAutomat(unittest.TestCase):
             expected_command)
 
 
+    def test_configure_creates_multiple_configs_in_parallel(self):
+        # setup
+        self.maxDiff = None
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.execute_commands_in_parallel_results = [[{'returncode': 0}, {'returncode': 0}]]
+        args = {
+            "<config_name>" : ["MyConfig1", "MyConfig2:MyParent"],
+            "--inherits" : None,
+            "-D" : ['BUILD_SHARED_LIBS=TRUE'],
+            "--list" : False
+            }
+
+        # execute
+        self.assertTrue(self.sut.configure(args))
+
+        # verify
+        expected_commands = [
+            (
+            'cmake '
+            '-DDERIVED_CONFIG=MyConfig1 '
+            '-DPARENT_CONFIG=MyConfig1 '
+            '-DCPF_ROOT_DIR="/MyCPFProject" '
+            '-DCPFCMake_DIR="/MyCPFProject/Sources/external/CPFCMake" '
+            '-DCIBuildConfigurations_DIR="/MyCPFProject/Sources/CIBuildConfigurations" '
+            '-DBUILD_SHARED_LIBS=TRUE '
+            '-P "/MyCPFProject/Sources/external/CPFCMake/Scripts/createConfigFile.cmake"'
+            ),
+            (
+            'cmake '
+            '-DDERIVED_CONFIG=MyConfig2 '
+            '-DPARENT_CONFIG=MyParent '
+            '-DCPF_ROOT_DIR="/MyCPFProject" '
+            '-DCPFCMake_DIR="/MyCPFProject/Sources/external/CPFCMake" '
+            '-DCIBuildConfigurations_DIR="/MyCPFProject/Sources/CIBuildConfigurations" '
+            '-DBUILD_SHARED_LIBS=TRUE '
+            '-P "/MyCPFProject/Sources/external/CPFCMake/Scripts/createConfigFile.cmake"'
+            )]
+        self.assertEqual(
+            self.sut.m_os_access.execute_commands_in_parallel_args[0][1],
+            expected_commands)
+        self.assertFalse(self.sut.m_os_access.execute_command_arg)
+
+    def test_configure_reads_configs_and_overrides_from_manifest(self):
+        # setup
+        self.maxDiff = None
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.execute_commands_in_parallel_results = [[{'returncode': 0}, {'returncode': 1}]]
+        self.sut.m_fs_access.addfile(
+            "/MyCPFProject/manifest.json",
+            '{ "definitions": ["A=1"], "configurations": ["MyConfig1:MyParent", { "name": "MyConfig2", "definitions": ["A=2 3"] }] }')
+        args = {
+            "<config_name>" : [],
+            "--inherits" : None,
+            "--manifest" : "/MyCPFProject/manifest.json",
+            "-D" : ['B=1'],
+            "--list" : False
+            }
+
+        # execute
+        self.assertFalse(self.sut.configure(args))
+
+        # verify
+        commands = self.sut.m_os_access.execute_commands_in_parallel_args[0][1]
+        self.assertIn('-DDERIVED_CONFIG=MyConfig1 -DPARENT_CONFIG=MyParent ', commands[0])
+        self.assertIn('-DA=1 -DB=1 -P', commands[0])
+        self.assertIn('-DDERIVED_CONFIG=MyConfig2 -DPARENT_CONFIG=MyConfig2 ', commands[1])
+        self.assertIn('-DA=1 -DB=1 -DA="2 3" -P', commands[1])
+        self.assertIn('Error: Failed to create the configurations: MyConfig2', self.sut.m_os_access.console_output)
+
+
 ####################################################################################################
 
     def test_generate_make_files_test_clean_generate(self):
@@ -258,6 +333,89 @@ class TestBuildAutomat(unittest.TestCase):
         self.assertEqual(self.sut.m_os_access.execute_command_arg[0][1], expected_command)
 
 
+    def test_generate_make_files_writes_prometheus_metrics_with_the_metrics_dir_option(self):
+
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_generated_folder() / "MyConfig/CMakeCache.txt", "content")
+        self.sut.m_fs_access.mkdirs('/var/lib/node_exporter')
+        argv = {"<config_name>" : "MyConfig", "--clean" : False, "--metrics-dir" : "/var/lib/node_exporter"}
+
+        # execute
+        self.assertTrue(self.sut.generate_make_files(argv))
+        self.assertTrue(self.sut.generate_make_files(argv))
+
+        # verify
+        metrics_dir = self.sut.m_fs_access.listdir('/var/lib/node_exporter')
+        self.assertEqual(len(metrics_dir), 1)
+        self.assertTrue(metrics_dir[0].startswith('cpfbuild_MyConfig_') and metrics_dir[0].endswith('.prom'))
+        metrics = self.sut.m_fs_access.readfile('/var/lib/node_exporter/' + metrics_dir[0])
+        self.assertIn('cpfbuild_phase_runs_total{config="MyConfig",phase="generate",result="success",root="/MyCPFProject"} 2\n', metrics)
+        self.assertIn('cpfbuild_phase_duration_seconds_count{config="MyConfig",phase="generate",root="/MyCPFProject"} 2\n', metrics)
+
+    def test_generate_make_files_writes_the_failure_metrics_if_the_configure_step_fails(self):
+
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.execute_command = lambda *args, **kwargs: False
+        self.sut.m_fs_access.mkdirs('/var/lib/node_exporter')
+        argv = {"<config_name>" : "MyConfig", "--clean" : False, "--metrics-dir" : "/var/lib/node_exporter"}
+
+        # execute
+        self.assertFalse(self.sut.generate_make_files(argv))
+
+        # verify
+        metrics_dir = self.sut.m_fs_access.listdir('/var/lib/node_exporter')
+        self.assertEqual(len(metrics_dir), 1)
+        metrics = self.sut.m_fs_access.readfile('/var/lib/node_exporter/' + metrics_dir[0])
+        self.assertIn('cpfbuild_phase_runs_total{config="MyConfig",phase="configure",result="failure",root="/MyCPFProject"} 1\n', metrics)
+        self.assertIn('cpfbuild_phase_runs_total{config="MyConfig",phase="generate",result="failure",root="/MyCPFProject"} 1\n', metrics)
+
+
+    def test_generate_make_files_sets_an_available_compiler_cache_as_compiler_launcher(self):
+
+        # Setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.executables = {'sccache' : '/usr/bin/sccache', 'ccache' : '/usr/bin/ccache'}
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        argv = {"<config_name>" : "MyConfig", "--clean" : False}
+
+        # execute
+        self.assertTrue(self.sut.generate_make_files(argv))
+
+        # verify
+        expected_command = (
+            'cmake '
+            '-H"/MyCPFProject/Sources" '
+            '-B"/MyCPFProject/Generated/MyConfig" '
+            '-C"/MyCPFProject/Configuration/MyConfig.config.cmake" '
+            '--graphviz="/MyCPFProject/Generated/MyConfig/CPFDependencies.dot" '
+            '-DCMAKE_C_COMPILER_LAUNCHER="/usr/bin/ccache" '
+            '-DCMAKE_CXX_COMPILER_LAUNCHER="/usr/bin/ccache"'
+            )
+        self.assertEqual(self.sut.m_os_access.execute_command_arg[0][1], expected_command)
+
+        # the launcher is not set with the option or when the config file sets one
+        argv["--no-compiler-launcher"] = True
+        self.assertTrue(self.sut.generate_make_files(argv))
+        self.assertNotIn('COMPILER_LAUNCHER', self.sut.m_os_access.execute_command_arg[1][1])
+
+        # the option removes the launcher of an earlier generate from the cache
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_C_COMPILER_LAUNCHER:STRING=/usr/bin/ccache\nCMAKE_CXX_COMPILER_LAUNCHER:STRING=/usr/bin/ccache\n')
+        self.assertTrue(self.sut.generate_make_files(argv))
+        self.assertTrue(self.sut.m_os_access.execute_command_arg[2][1].endswith(
+            ' -UCMAKE_C_COMPILER_LAUNCHER -UCMAKE_CXX_COMPILER_LAUNCHER'))
+        self.sut.m_fs_access.remove(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt')
+
+        argv["--no-compiler-launcher"] = False
+        self.sut.m_fs_access.writefile(self.locations.get_full_path_config_file('MyConfig'), 'set(CMAKE_CXX_COMPILER_LAUNCHER "distcc" CACHE STRING "")')
+        self.assertTrue(self.sut.generate_make_files(argv))
+        self.assertNotIn('COMPILER_LAUNCHER', self.sut.m_os_access.execute_command_arg[3][1])
+
+
     def test_generate_make_files_picks_the_first_available_config_if_none_is_given_and_executes_an_incremental_generate_if_cache_exists(self):
 
         # Setup
@@ -392,6 +550,22 @@ class TestBuildAutomat(unittest.TestCase):
             ' --parallel ' + str(self.cpu_count)
             )
         self.assertEqual(self.sut.m_os_access.execute_command_arg[0][1], expected_cmake_call)
+        self.assertIn('The build used {0} parallel jobs.'.format(self.cpu_count), self.sut.m_os_access.console_output)
+
+
+    def test_make_uses_the_number_of_physical_cores_with_the_physical_cores_option(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        self.sut.m_os_access.m_physical_cpu_count = 2
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None, "--physical-cores" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertTrue(self.sut.m_os_access.execute_command_arg[0][1].endswith(' --parallel 2'))
+        self.assertIn('The build used 2 parallel jobs.', self.sut.m_os_access.console_output)
 
 
     def mock_configure_impl(self, argv):
@@ -459,3 +633,618 @@ class TestBuildAutomat(unittest.TestCase):
         self.assertTrue(self.mock_configure_called)
         self.sut.m_fs_access.exists(self.locations.get_full_path_config_file('MyConfig'))
 
+
+    def test_make_runs_the_test_executables_when_the_run_tests_option_is_given(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_binary_output_folder('MyConfig', 'Debug') / 'MyPackage_tests', "content")
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None, "--run-tests" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(
+            self.sut.m_os_access.execute_command_output_args[-1][1],
+            '"/MyCPFProject/Generated/MyConfig/BuildStage/Debug/MyPackage_tests" --gtest_output=xml:"/MyCPFProject/Generated/MyConfig/CPFTestResults.xml.0.MyPackage_tests.0.xml"')
+        self.assertTrue(self.sut.m_fs_access.isfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFTestResults.xml'))
+
+    def test_make_builds_only_the_test_targets_of_affected_packages(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFDependencies.dot',
+            '"node0" [ label = "A_tests" ];\n"node1" [ label = "B_tests" ];\n"node2" [ label = "A" ];\n"node0" -> "node2"\n')
+        self.sut.m_os_access.execute_command_output_function = lambda command, cwd, env: ['Sources/A/a.cpp'] if command.startswith('git diff') else []
+        argv = {"<config_name>" : "MyConfig", "--target" : "runFastTests", "--config" : None, "--clean" : False, "--cpus" : "2", "--affected-since" : "HEAD"}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(
+            self.sut.m_os_access.execute_command_arg[0][1],
+            'cmake --build "/MyCPFProject/Generated/MyConfig" --target runFastTests_A --parallel 2')
+        self.assertIn('skip  B', self.sut.m_os_access.console_output)
+
+    def test_is_cmake_input_detects_files_that_require_a_generate_step(self):
+        self.assertTrue(buildautomat._is_cmake_input('/MyCPFProject/Sources/MyPackage/CMakeLists.txt'))
+        self.assertTrue(buildautomat._is_cmake_input('/MyCPFProject/Sources/MyPackage/cmake/myFunctions.cmake'))
+        self.assertTrue(buildautomat._is_cmake_input('/MyCPFProject/Configuration/MyConfig.config.cmake'))
+        self.assertFalse(buildautomat._is_cmake_input('/MyCPFProject/Sources/MyPackage/file.cpp'))
+
+    def _fake_git_status(self, command, cwd, env):
+        if command == 'git rev-parse HEAD':
+            return ['0123456789abcdef']
+        if command.startswith('git status'):
+            return self.git_status
+        return []
+
+    def test_make_skips_the_build_tool_if_the_source_tree_did_not_change(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        self.sut.m_os_access.execute_command_output_function = self._fake_git_status
+        self.git_status = [' M Sources/Module1/bla.cpp', '?? Generated/MyConfig/build.ninja']
+        argv = {"<config_name>" : "MyConfig", "--target" : "myTarget", "--config" : None, "--clean" : False, "--cpus" : None}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+        self.sut.m_fs_access.writefile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'build.ninja', "changed")
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 1)
+        self.assertIn('Nothing changed since the last successful build', self.sut.m_os_access.console_output)
+
+        # a changed source file or the --force-build option lead to a new build
+        self.sut.m_fs_access.writefile(self.locations.get_full_path_source_folder() / 'Module1/bla.cpp', "changed content")
+        self.assertTrue(self.sut.make(argv))
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 2)
+
+        argv["--force-build"] = True
+        self.assertTrue(self.sut.make(argv))
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 3)
+
+
+    def _fake_ccache_statistics(self, command, cwd, env):
+        if command == 'ccache --print-stats':
+            self.ccache_calls += 1
+            if self.ccache_calls == 1:
+                return ['direct_cache_hit\t10', 'preprocessed_cache_hit\t2', 'cache_miss\t5']
+            return ['direct_cache_hit\t16', 'preprocessed_cache_hit\t5', 'cache_miss\t8']
+        return []
+
+    def test_make_reports_the_hit_rate_of_the_compiler_cache(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_CXX_COMPILER_LAUNCHER:STRING=/usr/bin/ccache\n')
+        self.sut.m_os_access.execute_command_output_function = self._fake_ccache_statistics
+        self.ccache_calls = 0
+        argv = {"<config_name>" : "MyConfig", "--target" : "myTarget", "--config" : None, "--clean" : False, "--cpus" : None, "--compiler-cache-size" : "2G"}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        build_environment = self.sut.m_os_access.execute_command_envs[-1]
+        self.assertEqual(build_environment['CCACHE_DIR'], '/MyCPFProject/Generated/CPFCompilerCache')
+        self.assertEqual(build_environment['CCACHE_MAXSIZE'], '2G')
+        self.assertIn('Compiler cache (ccache): 9 hits, 3 misses, 75% hit rate.', self.sut.m_os_access.console_output)
+
+    def test_make_uses_an_sccache_server_per_cache_directory_and_keeps_other_servers(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_CXX_COMPILER_LAUNCHER:STRING=/usr/bin/sccache\n')
+        commands = []
+
+        def sccache(command, cwd, env):
+            commands.append(command)
+            if command.startswith('sccache --show-stats'):
+                return ['{"cache_location": "Local disk: \\"/home/user/.cache/sccache\\""}']
+            return []
+        self.sut.m_os_access.execute_command_output_function = sccache
+        argv = {"<config_name>" : "MyConfig", "--target" : "myTarget", "--config" : None, "--clean" : False, "--cpus" : None}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        port = str(compilercache.get_server_port('/MyCPFProject/Generated/CPFCompilerCache'))
+        self.assertEqual(self.sut.m_os_access.execute_command_envs[-1]['SCCACHE_SERVER_PORT'], port)
+        self.assertNotIn('sccache --stop-server', commands)
+        self.assertIn(
+            'Warning: The sccache server on port {0} uses the cache directory /home/user/.cache/sccache instead of '
+            '/MyCPFProject/Generated/CPFCompilerCache.'.format(port),
+            self.sut.m_os_access.console_output)
+
+    def test_make_restores_the_outputs_from_the_artifact_cache_instead_of_building(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFDependencies.dot',
+            '"node0" [ label = "PackageA" ];\n"node1" [ label = "PackageB" ];\n"node0" -> "node1"\n')
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_source_folder() / 'PackageA/a.cpp', "source A")
+        binary_dir = self.locations.get_full_path_binary_output_folder('MyConfig', 'Debug')
+        self.sut.m_fs_access.addfile(binary_dir / 'libPackageA.so', "library A")
+        self.sut.m_fs_access.addfile(binary_dir / 'libPackageB.so', "library B")
+        argv = {"<config_name>" : "MyConfig", "--target" : "PackageA", "--config" : "Debug", "--clean" : False, "--cpus" : None,
+                "--force-build" : True, "--artifact-cache" : "/mnt/share/CPFArtifactCache"}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+        self.sut.m_fs_access.rmtree(binary_dir)
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 1)
+        self.assertIn('Restored the outputs of 2 targets from the artifact cache.', self.sut.m_os_access.console_output)
+        self.assertTrue(self.sut.m_fs_access.hasfile(binary_dir / 'libPackageA.so', "library A"))
+
+        # a changed source file leads to a new build
+        self.sut.m_fs_access.writefile(self.locations.get_full_path_source_folder() / 'PackageA/a.cpp', "changed source A")
+        self.assertTrue(self.sut.make(argv))
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 2)
+
+        # custom targets like runAllTests are not in the dependency graph and are always built
+        argv["--target"] = "PackageA runAllTests"
+        self.assertTrue(self.sut.make(argv))
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 3)
+
+    def test_make_restores_the_artifacts_of_the_default_compiler_config_on_a_new_machine(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "CMAKE_BUILD_TYPE:STRING=Release\n")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFDependencies.dot',
+            '"node0" [ label = "PackageA" ];\n')
+        binary_dir = self.locations.get_full_path_binary_output_folder('MyConfig', 'Release')
+        self.sut.m_fs_access.addfile(binary_dir / 'libPackageA.so', "library A")
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None,
+                "--force-build" : True, "--artifact-cache" : "/mnt/share/CPFArtifactCache"}
+        self.assertTrue(self.sut.make(argv))
+
+        # execute
+        # The new machine has no output folders yet.
+        self.sut.m_fs_access.rmtree(self.locations.get_full_path_binary_output_base_folder('MyConfig'))
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(len(self.sut.m_os_access.execute_command_arg), 1)
+        self.assertTrue(self.sut.m_fs_access.hasfile(binary_dir / 'libPackageA.so', "library A"))
+
+    def test_make_limits_the_parallel_jobs_by_the_memory_of_earlier_builds(self):
+        # setup
+        gib = 1024 * 1024 * 1024
+        self.sut.m_os_access = self._get_fake_os_access(_WINDOWS)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        self.sut.m_os_access.m_available_memory = 30 * gib
+        self.sut.m_os_access.m_peak_child_rss = 4 * gib
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "64",
+                "--force-build" : True, "--adaptive-jobs" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertTrue(self.sut.m_os_access.execute_command_arg[0][1].endswith('--parallel 30'), 'The first build assumes 1 GiB per job')
+        self.assertTrue(self.sut.m_os_access.execute_command_arg[1][1].endswith('--parallel 7'))
+        self.assertIn('Adaptive parallelism: 7 jobs (30.0 GiB available, 4.0 GiB per job).', self.sut.m_os_access.console_output)
+
+    def _fake_ninja_version(self, command, cwd, env):
+        if command.endswith('--version'):
+            return ['1.13.1']
+        return []
+
+    def test_make_uses_the_jobserver_of_a_parent_build(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.env_vars = {'MAKEFLAGS' : '-j6 --jobserver-auth=fifo:/tmp/GMfifo1234'}
+        self.sut.m_os_access.execute_command_output_function = self._fake_ninja_version
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_MAKE_PROGRAM:FILEPATH=/usr/bin/ninja\n')
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None, "--force-build" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(self.sut.m_os_access.execute_command_arg[0][1], 'cmake --build "/MyCPFProject/Generated/MyConfig"')
+        self.assertEqual(self.sut.m_os_access.execute_command_envs[0]['MAKEFLAGS'], '-j6 --jobserver-auth=fifo:/tmp/GMfifo1234')
+        self.assertIn('Using the jobserver of the parent build.', self.sut.m_os_access.console_output)
+        self.assertIn('The build used 6 parallel jobs.', self.sut.m_os_access.console_output)
+
+    def test_generate_make_files_creates_job_pools_for_ninja_configurations(self):
+        # setup
+        gib = 1024 * 1024 * 1024
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.m_total_memory = 8 * gib
+        self.sut.m_os_access.m_available_memory = 1 * gib
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), 'set( CMAKE_GENERATOR "Ninja" CACHE STRING "" FORCE)')
+        argv = {"<config_name>" : "MyConfig", "--clean" : False}
+
+        # execute
+        self.assertTrue(self.sut.generate_make_files(argv))
+
+        # verify
+        self.assertTrue(self.sut.m_os_access.execute_command_arg[0][1].endswith(
+            ' -DCMAKE_JOB_POOLS="compile=4;link=1" -DCMAKE_JOB_POOL_COMPILE=compile -DCMAKE_JOB_POOL_LINK=link'))
+
+    def test_make_changes_the_job_pool_sizes_and_reports_their_utilization(self):
+        # setup
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_GENERATOR:INTERNAL=Ninja\nCMAKE_JOB_POOLS:UNINITIALIZED=compile=4;link=2\n')
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / '.ninja_log',
+            '# ninja log v5\n0\t5000\t0\told.cpp.o\t1\n')
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'build.ninja',
+            'include rules.ninja\n'
+            'build a.cpp.o: CXX_COMPILER__A_Debug ../a.cpp\n'
+            'build libA.so: CXX_SHARED_LIBRARY_LINKER__A_Debug a.cpp.o\n')
+        ninja_log = self.locations.get_full_path_config_makefile_folder('MyConfig') / '.ninja_log'
+        commands = []
+
+        def build(command, cwd=None, print_command=True, env=None):
+            commands.append(command)
+            if command.startswith('cmake --build'):
+                self.sut.m_fs_access.writefile(ninja_log, self.sut.m_fs_access.readfile(ninja_log) + '0\t1000\t0\ta.cpp.o\t2\n1000\t2000\t0\tlibA.so\t3\n')
+            return True
+        self.sut.m_os_access.execute_command = build
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None,
+                "--force-build" : True, "--link-jobs" : "1"}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(len(commands), 2)
+        self.assertIn('-DCMAKE_JOB_POOLS="compile=4;link=1"', commands[0])
+        self.assertIn('Job pool compile: 4 slots, 1 jobs, at most 1 in parallel, 12% utilization.', self.sut.m_os_access.console_output)
+        self.assertIn('Job pool link: 1 slots, 1 jobs, at most 1 in parallel, 50% utilization.', self.sut.m_os_access.console_output)
+
+    def test_job_pool_sizes_of_the_options_are_kept_by_later_generates(self):
+        # setup
+        gib = 1024 * 1024 * 1024
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.m_total_memory = 8 * gib
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), 'set( CMAKE_GENERATOR "Ninja" CACHE STRING "" FORCE)')
+        self.sut.m_fs_access.addfile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_GENERATOR:INTERNAL=Ninja\nCMAKE_JOB_POOLS:UNINITIALIZED=compile=4;link=1\n')
+        make_argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None,
+                     "--force-build" : True, "--compile-jobs" : "3"}
+        generate_argv = {"<config_name>" : "MyConfig", "--clean" : False}
+
+        # execute
+        self.assertTrue(self.sut.make(make_argv))
+        self.assertTrue(self.sut.generate_make_files(generate_argv))
+
+        # verify
+        commands = [command for _, command in self.sut.m_os_access.execute_command_arg]
+        self.assertIn('-DCMAKE_JOB_POOLS="compile=3;link=1"', commands[0])
+        self.assertIn('-DCMAKE_JOB_POOLS="compile=3;link=1"', commands[-1])
+
+        # execute
+        self.sut.m_fs_access.writefile(
+            self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt',
+            'CMAKE_GENERATOR:INTERNAL=Ninja\nCMAKE_JOB_POOLS:UNINITIALIZED=compile=3;link=1\n')
+        make_argv["--compile-jobs"] = "0"
+        self.assertTrue(self.sut.make(make_argv))
+        self.assertTrue(self.sut.generate_make_files(generate_argv))
+
+        # verify
+        commands = [command for _, command in self.sut.m_os_access.execute_command_arg]
+        self.assertIn('-DCMAKE_JOB_POOLS="compile=4;link=1"', commands[-1])
+        self.assertEqual(len([command for command in commands if '"compile=4;link=1"' in command]), 2)
+
+    @patch('python.buildautomat._WatchBuild', side_effect=KeyboardInterrupt)
+    @patch('python.filewatcher.FileWatcher')
+    def test_watch_stops_when_ctrl_c_arrives_before_the_first_build_started(self, file_watcher, watch_build):
+        # setup
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : None,
+                "--watch" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        file_watcher.return_value.close.assert_called_once_with()
+
+    def test_make_pins_the_builds_of_multiple_configs_to_numa_nodes(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.m_numa_nodes = {0 : [0, 1, 2, 3], 1 : [4, 5, 6, 7]}
+        self.sut.m_os_access.executables = {'numactl' : '/usr/bin/numactl'}
+        self.sut.m_os_access.execute_commands_in_parallel_results = [[{'returncode' : 0}, {'returncode' : 0}]] * 2
+        argv = {"<config_name>" : ["Debug", "Release"], "--target" : "myTarget", "--config" : None, "--clean" : False, "--cpus" : None,
+                "--pin-cpus" : False, "--run-tests" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+        argv["--pin-cpus"] = True
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        python = '"' + sys.executable.replace('\\', '/') + '"'
+        unpinned_commands = self.sut.m_os_access.execute_commands_in_parallel_args[0][1]
+        self.assertEqual(unpinned_commands[0], python + ' "/MyCPFProject/3_Make.py" Debug --cpus 2 --run-tests --target "myTarget"')
+        pinned_commands = self.sut.m_os_access.execute_commands_in_parallel_args[1][1]
+        self.assertEqual(pinned_commands, [
+            'numactl --physcpubind=0-3 --membind=0 ' + python + ' "/MyCPFProject/3_Make.py" Debug --cpus 4 --run-tests --target "myTarget"',
+            'numactl --physcpubind=4-7 --membind=1 ' + python + ' "/MyCPFProject/3_Make.py" Release --cpus 4 --run-tests --target "myTarget"',
+            ])
+        self.assertIn('Pinning changed the throughput by', self.sut.m_os_access.console_output)
+
+    def test_make_records_the_commands_of_the_builds_of_multiple_configs_in_the_result(self):
+        # setup
+        self.sut.m_os_access.execute_commands_in_parallel_results = [[{'returncode' : 0}, {'returncode' : 2}]]
+        argv = {"<config_name>" : ["Debug", "Release"], "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4"}
+
+        # execute
+        result = self.sut.make(argv)
+
+        # verify
+        self.assertFalse(result)
+        python = '"' + sys.executable.replace('\\', '/') + '"'
+        self.assertEqual([(command['command'], command['return_code']) for command in result.commands], [
+            (python + ' "/MyCPFProject/3_Make.py" Debug --cpus 2', 0),
+            (python + ' "/MyCPFProject/3_Make.py" Release --cpus 2', 2),
+            ])
+
+    def test_make_keeps_the_cpus_option_and_gives_each_config_its_own_junit_file_when_pinning(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_os_access.m_numa_nodes = {0 : [0, 1, 2, 3], 1 : [4, 5, 6, 7]}
+        self.sut.m_os_access.executables = {'numactl' : '/usr/bin/numactl'}
+        self.sut.m_os_access.execute_commands_in_parallel_results = [[{'returncode' : 0}, {'returncode' : 0}]] * 2
+        argv = {"<config_name>" : ["Debug", "Release"], "--target" : "myTarget", "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--pin-cpus" : True, "--run-tests" : True, "--junit" : "results.xml"}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+        argv["--pin-cpus"] = False
+        argv["--target"] = "myOtherTarget"
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        python = '"' + sys.executable.replace('\\', '/') + '"'
+        pinned_commands = self.sut.m_os_access.execute_commands_in_parallel_args[0][1]
+        self.assertEqual(pinned_commands, [
+            'numactl --physcpubind=0-1 --membind=0 ' + python + ' "/MyCPFProject/3_Make.py" Debug --cpus 2 --junit "results.Debug.xml" --run-tests --target "myTarget"',
+            'numactl --physcpubind=4-5 --membind=1 ' + python + ' "/MyCPFProject/3_Make.py" Release --cpus 2 --junit "results.Release.xml" --run-tests --target "myTarget"',
+            ])
+        # Builds of different targets are not compared.
+        self.assertNotIn('Pinning changed the throughput by', self.sut.m_os_access.console_output)
+
+    def test_make_writes_a_resource_timeline_with_the_sample_resources_option(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--sample-resources" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        timeline_file = self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFResourceTimeline.json'
+        self.assertIn('traceEvents', json.loads(self.sut.m_fs_access.readfile(timeline_file)))
+        self.assertIn('The resource usage timeline was written to ' + str(timeline_file), self.sut.m_os_access.console_output)
+
+    def test_make_prints_only_the_progress_and_the_errors_with_the_quiet_option(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        build_output = ['[1/2] Building CXX object a.cpp.o', 'FAILED: a.cpp.o', 'a.cpp:1:1: error: expected expression', 'ninja: build stopped: subcommand failed.']
+
+        def build(command, cwd=None, print_command=True, env=None, output=None, line_handlers=None):
+            for line in build_output:
+                output.write(line + '\n')
+                for handler in line_handlers:
+                    handler(line)
+            return False
+        self.sut.m_os_access.execute_command = build
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--quiet" : True}
+
+        # execute
+        self.assertFalse(self.sut.make(argv))
+
+        # verify
+        log_file = self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFBuildLog.txt.gz'
+        self.assertTrue(self.sut.m_fs_access.hasfile(log_file, '\n'.join(build_output) + '\n'))
+        self.assertIn('FAILED: a.cpp.o\na.cpp:1:1: error: expected expression\nninja: build stopped: subcommand failed.\n', self.sut.m_os_access.console_output)
+        self.assertNotIn('[1/2] Building CXX object', self.sut.m_os_access.console_output)
+        self.assertIn('The full output of the build tool is in ' + str(log_file), self.sut.m_os_access.console_output)
+
+    def test_make_prints_the_indexed_diagnostics_of_the_last_build_with_the_errors_option(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+
+        def build(command, cwd=None, print_command=True, env=None, output=None, line_handlers=None):
+            output.write('[1/2] Building CXX object a.cpp.o\na.cpp:1:1: warning: unused variable\n')
+            output.write('[2/2] Building CXX object b.cpp.o\nb.cpp:7:3: error: expected expression\n')
+            return False
+        self.sut.m_os_access.execute_command = build
+        argv = {"<config_name>" : ["MyConfig"], "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--index-diagnostics" : True}
+
+        # execute
+        self.assertFalse(self.sut.make(argv))
+        self.sut.m_os_access.console_output = ''
+        argv["--errors"] = True
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        log_file = self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFBuildLog.txt.gz'
+        self.assertEqual(self.sut.m_os_access.console_output,
+            'b.cpp:7:3: error: expected expression [log offset 104]\n'
+            'a.cpp:1:1: warning: unused variable [log offset 34]\n'
+            '1 errors and 1 warnings in the build log ' + str(log_file) + '\n')
+
+    def test_make_prints_repeated_warnings_once_with_the_deduplicate_warnings_option(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+
+        def build(command, cwd=None, print_command=True, env=None, output=None, line_handlers=None):
+            for source in ['a.cpp', 'b.cpp']:
+                output.write('Building {0}\n/src/h.h:3:5: warning: unused variable\n'.format(source))
+            return True
+        self.sut.m_os_access.execute_command = build
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--deduplicate-warnings" : True}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        self.assertIn('Building a.cpp\n/src/h.h:3:5: warning: unused variable\nBuilding b.cpp\nThe build printed 2 warnings', self.sut.m_os_access.console_output)
+
+    def test_make_kills_a_stalled_build_with_the_kill_on_stall_option(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+
+        def build(command, cwd=None, print_command=True, env=None, output=None, line_handlers=None):
+            output.write('[1/2] Running custom command\n')
+            # Hang until the watchdog terminates the build.
+            end_time = time.monotonic() + 5.0
+            while not self.sut.m_os_access.terminate_running_commands_calls and time.monotonic() < end_time:
+                time.sleep(0.01)
+            return False
+        self.sut.m_os_access.execute_command = build
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--stall-timeout" : "0.001", "--kill-on-stall" : True}
+
+        # execute
+        self.assertFalse(self.sut.make(argv))
+
+        # verify
+        self.assertEqual(self.sut.m_os_access.terminate_running_commands_calls, 1)
+        self.assertIn('[1/2] Running custom command\nWarning: The build produced no output and used no cpu time for 0.001 minutes.\n', self.sut.m_os_access.console_output)
+        self.assertIn('Error: The build was killed, because it made no progress for 0.001 minutes.', self.sut.m_os_access.console_output)
+
+    def test_wrapper_profile_counts_the_calls_of_the_build(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        fake_os_access = self.sut.m_os_access
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--profile-wrapper" : True}
+
+        # execute
+        self.sut.start_wrapper_profile()
+        self.assertTrue(self.sut.make(argv))
+        self.sut.print_wrapper_profile()
+
+        # verify
+        self.assertIn('in 1 subprocess calls.\nFile system access:', fake_os_access.console_output)
+        self.assertIn('1 of them spawned processes (execute_command 1).', fake_os_access.console_output)
+
+    def test_make_writes_the_build_events_with_the_events_option(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        events_file = '/tmp/events.jsonl'
+        self.sut.m_fs_access.addfile(events_file, '{"type":"earlier_event"}\n')
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True, "--events" : events_file}
+
+        # execute
+        self.assertTrue(self.sut.make(argv))
+        argv["--events"] = "tcp://dashboard:9000"
+        self.assertTrue(self.sut.make(argv))
+
+        # verify
+        events = [json.loads(line) for line in self.sut.m_fs_access.readfile(events_file).splitlines()]
+        self.assertEqual([(event['type'], event.get('phase')) for event in events], [
+            ('earlier_event', None),
+            ('phase_start', 'make'),
+            ('phase_start', 'build'),
+            ('phase_end', 'build'),
+            ('jobs', None),
+            ('phase_end', 'make'),
+            ])
+        self.assertTrue(events[3]['success'])
+        self.assertEqual(events[3]['config'], 'MyConfig')
+        self.assertEqual(len(self.sut.m_os_access.socket_streams[('dashboard', 9000)].text.splitlines()), 5)
+
+    def test_make_returns_a_result_with_the_phases_of_the_build(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_file('MyConfig'), "content")
+        self.sut.m_fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CMakeCache.txt', "content")
+        argv = {"<config_name>" : "MyConfig", "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4",
+                "--force-build" : True}
+
+        # execute
+        result = self.sut.make(argv)
+
+        # verify
+        self.assertTrue(result)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual([(phase['phase'], phase['success']) for phase in result.phases], [('build', True), ('make', True)])
+        self.assertEqual(sorted(result.get_phase_seconds()), ['build', 'make'])
+        self.assertEqual(result.errors, [])
+
+    def test_make_returns_a_failed_result_with_the_printed_errors(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        argv = {"<config_name>" : None, "--target" : None, "--config" : None, "--clean" : False, "--cpus" : "4"}
+
+        # execute
+        result = self.sut.make(argv)
+
+        # verify
+        self.assertFalse(result)
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual([(phase['phase'], phase['success']) for phase in result.phases], [('make', False)])
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('No existing CMakeCache.txt file found.', result.errors[0])
+
+    def test_steps_that_are_called_from_different_threads_return_their_own_results(self):
+        # setup
+        self.sut.m_os_access = self._get_fake_os_access(_LINUX)
+        fake_execute_command = self.sut.m_os_access.execute_command
+        def slow_execute_command(*args, **kwargs):
+            time.sleep(0.05) # Gives the other thread time to start its step.
+            return fake_execute_command(*args, **kwargs)
+        self.sut.m_os_access.execute_command = slow_execute_command
+        results = {}
+        def configure(config_name):
+            results[config_name] = self.sut.configure({"<config_name>" : config_name, "--inherits" : None, "-D" : [], "--list" : False})
+
+        # execute
+        threads = [threading.Thread(target=configure, args=(config_name,)) for config_name in ['MyConfig', 'MyOtherConfig']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # verify
+        for config_name in ['MyConfig', 'MyOtherConfig']:
+            self.assertTrue(results[config_name])
+            self.assertEqual([phase['phase'] for phase in results[config_name].phases], ['configure'])
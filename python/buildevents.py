@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+"""
+This module provides the EventSink interface for structured events of the build steps and
+the JsonLinesEventSink which writes the events as one json object per line to a text stream,
+which can be a file or a socket.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+# The types of the events.
+PHASE_START = 'phase_start'
+PHASE_END = 'phase_end'
+PROCESS_START = 'process_start'
+PROCESS_EXIT = 'process_exit'
+CACHE = 'cache'
+JOBS = 'jobs'
+LOG_FILE = 'log_file'
+ERROR = 'error'
+
+_SOCKET_PREFIX = 'tcp://'
+# Buffered events are written when the buffer is full or the last write is longer ago.
+_BUFFER_SIZE = 64 * 1024
+_FLUSH_SECONDS = 1.0
+# The few phase events are written immediately, so a dashboard sees a running phase.
+_UNBUFFERED_EVENT_TYPES = [PHASE_START, PHASE_END]
+
+
+class EventSink:
+    """
+    The interface for receiving the events of a build. Each event has a type and type specific
+    fields. The helper functions create the events of the known types. This implementation drops
+    all events and is used when no events are wanted.
+    """
+    # The error of a sink that could not write its events.
+    error = None
+
+    def emit(self, event_type, **fields):
+        pass
+
+    def close(self):
+        pass
+
+    def phase(self, name, **fields):
+        """
+        Returns a context manager that emits the start and end events of a phase. The end event
+        has the duration in seconds and the success, which is false when an exception leaves the
+        phase or when the success attribute of the returned object is set to false.
+        """
+        return _Phase(self, name, fields)
+
+    def process_started(self, pid, command):
+        self.emit(PROCESS_START, pid=pid, command=command)
+
+    def process_exited(self, pid, return_code, seconds, nr_output_lines):
+        self.emit(PROCESS_EXIT, pid=pid, return_code=return_code, seconds=round(seconds, 3), output_lines=nr_output_lines)
+
+    def cache_used(self, cache, hits, misses):
+        self.emit(CACHE, cache=cache, hits=hits, misses=misses)
+
+    def jobs_used(self, config, nr_jobs):
+        self.emit(JOBS, config=config, jobs=nr_jobs)
+
+    def log_file_written(self, kind, path):
+        self.emit(LOG_FILE, kind=kind, path=path)
+
+    def error_printed(self, message):
+        self.emit(ERROR, message=message)
+
+
+class MultiEventSink(EventSink):
+    """
+    Passes each event on to all of the given sinks.
+    """
+    def __init__(self, sinks):
+        self.m_sinks = sinks
+
+    def emit(self, event_type, **fields):
+        for sink in self.m_sinks:
+            sink.emit(event_type, **fields)
+
+    def close(self):
+        for sink in self.m_sinks:
+            sink.close()
+
+    @property
+    def error(self):
+        return next((sink.error for sink in self.m_sinks if sink.error), None)
+
+
+class JsonLinesEventSink(EventSink):
+    """
+    Writes each event as a json object with the time, the type, the id of the emitting process
+    and the fields of the event. The lines are collected in a buffer and written with one call,
+    so emitting an event costs little more than encoding it.
+
+    Writing errors do not stop the build. The sink drops all further events and the error
+    can be read from the error attribute.
+    """
+    def __init__(self, stream, clock=time.time):
+        self.m_stream = stream
+        self.m_clock = clock
+        self.m_pid = os.getpid()
+        self.m_lock = threading.Lock()
+        self.m_lines = []
+        self.m_buffered_size = 0
+        self.m_last_write_time = clock()
+        self.error = None
+
+    def emit(self, event_type, **fields):
+        now = self.m_clock()
+        event = {'time': round(now, 3), 'type': event_type, 'process': self.m_pid}
+        event.update(fields)
+        # Paths and other objects are written as strings.
+        line = json.dumps(event, separators=(',', ':'), default=str) + '\n'
+        with self.m_lock:
+            self.m_lines.append(line)
+            self.m_buffered_size += len(line)
+            if event_type in _UNBUFFERED_EVENT_TYPES or self.m_buffered_size >= _BUFFER_SIZE or now - self.m_last_write_time >= _FLUSH_SECONDS:
+                self._write(now)
+
+    def close(self):
+        with self.m_lock:
+            self._write(self.m_clock())
+            if self.m_stream:
+                try:
+                    self.m_stream.close()
+                except OSError as error:
+                    self.error = error
+                self.m_stream = None
+
+    def _write(self, now):
+        if self.m_stream and self.m_lines:
+            try:
+                self.m_stream.write(''.join(self.m_lines))
+                self.m_stream.flush()
+            except OSError as error:
+                self.error = error
+                self.m_stream = None
+        self.m_lines = []
+        self.m_buffered_size = 0
+        self.m_last_write_time = now
+
+
+class _Phase:
+    def __init__(self, event_sink, name, fields):
+        self.m_event_sink = event_sink
+        self.m_name = name
+        self.m_fields = fields
+        self.m_start_time = None
+        self.success = True
+
+    def __enter__(self):
+        self.m_start_time = time.perf_counter()
+        self.m_event_sink.emit(PHASE_START, phase=self.m_name, **self.m_fields)
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.m_event_sink.emit(
+            PHASE_END,
+            phase=self.m_name,
+            success=bool(self.success) and exception_type is None,
+            seconds=round(time.perf_counter() - self.m_start_time, 3),
+            **self.m_fields)
+        return False
+
+
+########### free functions #########################################################################
+def get_socket_address(target):
+    """
+    Returns the host and port of a tcp://<host>:<port> target or None if the target is a file.
+    """
+    if not target.startswith(_SOCKET_PREFIX):
+        return None
+    host, _, port = target[len(_SOCKET_PREFIX):].rpartition(':')
+    if not host or not port.isdigit():
+        raise Exception('Error: The event target "{0}" must have the form {1}<host>:<port>.'.format(target, _SOCKET_PREFIX))
+    return host, int(port)
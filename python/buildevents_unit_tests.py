@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the JsonLinesEventSink class and the functions of the buildevents module.
+"""
+
+import io
+import json
+import unittest
+
+from . import buildevents
+
+
+class _Clock:
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self):
+        return self.time
+
+
+class _BrokenStream(io.StringIO):
+    def write(self, text):
+        raise BrokenPipeError('The connection was closed.')
+
+
+class TestBuildEvents(unittest.TestCase):
+    """
+    The test fixture for the buildevents tests.
+    """
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.stream.close = lambda: None # Keep the content readable.
+        self.clock = _Clock()
+        self.sut = buildevents.JsonLinesEventSink(self.stream, clock=self.clock)
+
+    def _get_events(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_events_are_buffered_until_the_flush_interval_passed(self):
+        self.sut.process_started(42, 'ninja')
+        self.sut.cache_used('ccache', 3, 1)
+        self.assertEqual(self.stream.getvalue(), '')
+
+        self.clock.time += 1.0
+        self.sut.process_exited(42, 0, 1.23456, 17)
+
+        events = self._get_events()
+        self.assertEqual([event['type'] for event in events], ['process_start', 'cache', 'process_exit'])
+        self.assertEqual(events[1]['hits'], 3)
+        self.assertEqual((events[2]['seconds'], events[2]['output_lines'], events[2]['time']), (1.235, 17, 101.0))
+
+    def test_phase_events_are_written_immediately(self):
+        with self.assertRaises(ValueError):
+            with self.sut.phase('build', config='MyConfig'):
+                self.assertEqual(self._get_events()[0]['phase'], 'build')
+                raise ValueError()
+        with self.sut.phase('tests') as phase:
+            phase.success = False
+
+        events = self._get_events()
+        self.assertEqual([(event['type'], event['phase'], event.get('success')) for event in events], [
+            ('phase_start', 'build', None),
+            ('phase_end', 'build', False),
+            ('phase_start', 'tests', None),
+            ('phase_end', 'tests', False),
+            ])
+        self.assertEqual(events[1]['config'], 'MyConfig')
+
+    def test_write_errors_drop_the_events(self):
+        sut = buildevents.JsonLinesEventSink(_BrokenStream(), clock=self.clock)
+
+        with sut.phase('build'):
+            pass
+        sut.close()
+
+        self.assertIsInstance(sut.error, BrokenPipeError)
+
+    def test_socket_address(self):
+        self.assertEqual(buildevents.get_socket_address('tcp://localhost:9000'), ('localhost', 9000))
+        self.assertIsNone(buildevents.get_socket_address('/tmp/events.jsonl'))
+        self.assertRaises(Exception, buildevents.get_socket_address, 'tcp://localhost')
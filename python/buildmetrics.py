@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+"""
+This module provides the MetricsRecorder class which collects the durations, results, cpus and
+cache hits of a generate or make run from its events and writes them as metrics for the textfile
+collector of the Prometheus node_exporter.
+"""
+
+import hashlib
+import re
+import time
+
+from . import buildevents
+
+
+# The upper bounds in seconds of the buckets of the duration histograms.
+DURATION_BUCKETS = [1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200]
+_PREFIX = 'cpfbuild_'
+# The name, type and help text of the metric families in the order in which they are written.
+_FAMILIES = [
+    ('phase_duration_seconds', 'histogram', 'The durations of the phases of the CPF build scripts.'),
+    ('phase_runs_total', 'counter', 'The number of successful and failed runs of the phases.'),
+    ('cpus', 'gauge', 'The number of parallel jobs of the last build.'),
+    ('cache_hits_total', 'counter', 'The number of hits of the build caches.'),
+    ('cache_misses_total', 'counter', 'The number of misses of the build caches.'),
+    ('cache_hit_ratio', 'gauge', 'The ratio of hits of the build caches in the last run that used them.'),
+    ('last_run_timestamp_seconds', 'gauge', 'The unix time of the end of the last run.'),
+    ]
+_HISTOGRAM_SUFFIXES = ['_bucket', '_sum', '_count']
+_SAMPLE_REGEX = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+_LABEL_REGEX = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class MetricsRecorder(buildevents.EventSink):
+    """
+    An event sink that collects the ends of phases, the cache results and the used jobs of a run.
+    When it is closed, the metrics of the run are added to the metrics of the earlier runs in the
+    file of the configuration in the metrics directory. The file is replaced atomically, so the
+    node_exporter never reads a partly written file, and a lock file keeps concurrent builds of
+    the same configuration from losing each others counters.
+
+    The metrics are labeled with the configuration and the CPF root directory. The configuration
+    is the given one or, if none is given, the first one that is seen in an event. No file is
+    written for runs that did not handle a configuration, like the parent of multiple configuration
+    builds, which pass the option on to the builds of the single configurations.
+
+    A run that fails before the phase of its step ended, like a generate run whose configure
+    step fails, is counted as a failed run of the step phase, so it shows up in the failure counters.
+    """
+    def __init__(self, fs_access, metrics_dir, cpf_root_dir, config_name=None, step_phase=None, clock=time.time):
+        self.m_fs_access = fs_access
+        self.m_metrics_dir = metrics_dir
+        self.m_cpf_root_dir = str(cpf_root_dir)
+        self.m_clock = clock
+        self.m_start_time = clock()
+        self.m_config_name = config_name
+        self.m_step_phase = step_phase
+        self.m_phases = []
+        self.m_caches = {}
+        self.m_nr_jobs = None
+        self.error = None
+
+    def emit(self, event_type, **fields):
+        if fields.get('config') and not self.m_config_name:
+            self.m_config_name = fields['config']
+        if event_type == buildevents.PHASE_END:
+            self.m_phases.append((fields['phase'], fields['seconds'], fields['success']))
+        elif event_type == buildevents.CACHE:
+            hits, misses = self.m_caches.get(fields['cache'], (0, 0))
+            self.m_caches[fields['cache']] = (hits + fields['hits'], misses + fields['misses'])
+        elif event_type == buildevents.JOBS:
+            self.m_nr_jobs = fields['jobs']
+
+    def close(self):
+        if self.m_step_phase and self.m_step_phase not in [phase for phase, _, _ in self.m_phases]:
+            self.m_phases.append((self.m_step_phase, max(0.0, self.m_clock() - self.m_start_time), False))
+        if not self.m_config_name or not self.m_phases:
+            return
+        labels = {'config': self.m_config_name, 'root': self.m_cpf_root_dir}
+        metrics_file = self.m_metrics_dir / get_file_name(self.m_config_name, self.m_cpf_root_dir)
+        try:
+            # The lock file does not end with .prom, so the node_exporter ignores it.
+            with self.m_fs_access.lock_file(str(metrics_file) + '.lock'):
+                previous_content = self.m_fs_access.readfile(metrics_file) if self.m_fs_access.isfile(metrics_file) else ''
+                samples = parse_samples(previous_content)
+                add_run(samples, labels, self.m_phases, self.m_caches, self.m_nr_jobs, self.m_clock())
+                self.m_fs_access.writefile_atomically(metrics_file, format_samples(samples))
+        except OSError as error:
+            self.error = error
+
+
+########### free functions #########################################################################
+def get_file_name(config_name, cpf_root_dir):
+    """
+    Returns the name of the metrics file of a configuration. The hash of the root directory
+    keeps the files of different checkouts with the same configuration apart.
+    """
+    root_hash = hashlib.sha1(str(cpf_root_dir).encode('utf-8')).hexdigest()[:8]
+    return '{0}{1}_{2}.prom'.format(_PREFIX, re.sub(r'[^A-Za-z0-9_-]', '_', config_name), root_hash)
+
+
+def add_run(samples, labels, phases, caches, nr_jobs, timestamp):
+    """
+    Adds the phase durations and results, the cache hits and misses, the jobs and the time of a
+    run to the samples, which map the metric name and the label tuple to the value.
+    """
+    for phase, seconds, success in phases:
+        phase_labels = dict(labels, phase=phase)
+        for bound in DURATION_BUCKETS + ['+Inf']:
+            key = _get_key('phase_duration_seconds_bucket', dict(phase_labels, le=str(bound)))
+            samples[key] = samples.get(key, 0) + (1 if bound == '+Inf' or seconds <= bound else 0)
+        _add(samples, 'phase_duration_seconds_sum', phase_labels, seconds)
+        _add(samples, 'phase_duration_seconds_count', phase_labels, 1)
+        _add(samples, 'phase_runs_total', dict(phase_labels, result='success' if success else 'failure'), 1)
+
+    for cache, (hits, misses) in caches.items():
+        cache_labels = dict(labels, cache=cache)
+        _add(samples, 'cache_hits_total', cache_labels, hits)
+        _add(samples, 'cache_misses_total', cache_labels, misses)
+        if hits + misses:
+            samples[_get_key('cache_hit_ratio', cache_labels)] = hits / (hits + misses)
+
+    if nr_jobs:
+        samples[_get_key('cpus', labels)] = nr_jobs
+    samples[_get_key('last_run_timestamp_seconds', labels)] = round(timestamp, 3)
+
+
+def _add(samples, name, labels, value):
+    key = _get_key(name, labels)
+    samples[key] = samples.get(key, 0) + value
+
+
+def _get_key(name, labels):
+    # The le label of the histogram buckets comes last, like in the output of the client libraries.
+    return _PREFIX + name, tuple(sorted(labels.items(), key=lambda item: (item[0] == 'le', item[0])))
+
+
+def parse_samples(content):
+    """
+    Returns the samples of a metrics file in the text format. Comments and invalid lines are ignored.
+    """
+    samples = {}
+    for line in content.splitlines():
+        match = _SAMPLE_REGEX.match(line)
+        if not match or not match.group(1).startswith(_PREFIX):
+            continue
+        try:
+            value = float(match.group(3))
+        except ValueError:
+            continue
+        labels = {name: _unescape(value) for name, value in _LABEL_REGEX.findall(match.group(2) or '')}
+        samples[_get_key(match.group(1)[len(_PREFIX):], labels)] = value
+    return samples
+
+
+def format_samples(samples):
+    """
+    Returns the samples in the text format of Prometheus with the help and type lines of the families.
+    The samples of a family are sorted by their labels and the histogram buckets by their bounds.
+    """
+    lines = []
+    for family, metric_type, help_text in _FAMILIES:
+        suffixes = _HISTOGRAM_SUFFIXES if metric_type == 'histogram' else ['']
+        names = [_PREFIX + family + suffix for suffix in suffixes]
+        keys = [key for key in samples if key[0] in names]
+        if not keys:
+            continue
+        lines.append('# HELP {0}{1} {2}'.format(_PREFIX, family, help_text))
+        lines.append('# TYPE {0}{1} {2}'.format(_PREFIX, family, metric_type))
+        for name, labels in sorted(keys, key=_get_sort_key):
+            lines.append('{0}{{{1}}} {2}'.format(name, ','.join('{0}="{1}"'.format(label, _escape(value)) for label, value in labels), _format_value(samples[(name, labels)])))
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def _get_sort_key(key):
+    name, labels = key
+    series = tuple(item for item in labels if item[0] != 'le')
+    bounds = [float(value) for label, value in labels if label == 'le']
+    suffix_index = next((index for index, suffix in enumerate(_HISTOGRAM_SUFFIXES) if name.endswith(suffix)), 0)
+    return series, suffix_index, bounds[0] if bounds else 0.0
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _unescape(value):
+    return re.sub(r'\\(.)', lambda match: '\n' if match.group(1) == 'n' else match.group(1), value)
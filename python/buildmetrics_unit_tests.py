@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the MetricsRecorder class and the functions of the buildmetrics module.
+"""
+
+import tempfile
+import threading
+import unittest
+from pathlib import PurePosixPath, Path
+
+from . import buildevents
+from . import buildmetrics
+from . import filesystemaccess
+
+
+class TestBuildMetrics(unittest.TestCase):
+    """
+    The test fixture for the buildmetrics tests.
+    """
+    def _record_run(self, fs_access, build_seconds, success, cache_hits):
+        sut = buildmetrics.MetricsRecorder(fs_access, PurePosixPath('/metrics'), '/Project', clock=lambda: 1700000000.0)
+        sut.emit(buildevents.PHASE_END, phase='build', config='Debug', success=success, seconds=build_seconds)
+        sut.cache_used('ccache', cache_hits, 4 - cache_hits)
+        sut.jobs_used('Debug', 8)
+        sut.close()
+        return fs_access.readfile(PurePosixPath('/metrics') / buildmetrics.get_file_name('Debug', '/Project'))
+
+    def test_metrics_of_the_runs_are_accumulated(self):
+        fs_access = filesystemaccess.FakeFileSystemAccess()
+        fs_access.mkdirs('/metrics')
+
+        self._record_run(fs_access, 12.5, True, 1)
+        metrics = self._record_run(fs_access, 100.0, False, 3)
+
+        labels = 'config="Debug",phase="build",root="/Project"'
+        self.assertIn('# TYPE cpfbuild_phase_duration_seconds histogram\n', metrics)
+        self.assertIn(
+            'cpfbuild_phase_duration_seconds_bucket{' + labels + ',le="5"} 0\n'
+            'cpfbuild_phase_duration_seconds_bucket{' + labels + ',le="15"} 1\n'
+            'cpfbuild_phase_duration_seconds_bucket{' + labels + ',le="30"} 1\n'
+            'cpfbuild_phase_duration_seconds_bucket{' + labels + ',le="60"} 1\n'
+            'cpfbuild_phase_duration_seconds_bucket{' + labels + ',le="120"} 2\n', metrics)
+        self.assertIn(
+            'cpfbuild_phase_duration_seconds_bucket{' + labels + ',le="+Inf"} 2\n'
+            'cpfbuild_phase_duration_seconds_sum{' + labels + '} 112.5\n'
+            'cpfbuild_phase_duration_seconds_count{' + labels + '} 2\n', metrics)
+        self.assertIn('cpfbuild_phase_runs_total{config="Debug",phase="build",result="failure",root="/Project"} 1\n', metrics)
+        self.assertIn('cpfbuild_phase_runs_total{config="Debug",phase="build",result="success",root="/Project"} 1\n', metrics)
+        self.assertIn('cpfbuild_cpus{config="Debug",root="/Project"} 8\n', metrics)
+        self.assertIn('cpfbuild_cache_hits_total{cache="ccache",config="Debug",root="/Project"} 4\n', metrics)
+        self.assertIn('cpfbuild_cache_misses_total{cache="ccache",config="Debug",root="/Project"} 4\n', metrics)
+        self.assertIn('cpfbuild_cache_hit_ratio{cache="ccache",config="Debug",root="/Project"} 0.75\n', metrics)
+        self.assertIn('cpfbuild_last_run_timestamp_seconds{config="Debug",root="/Project"} 1700000000\n', metrics)
+
+    def test_concurrent_runs_do_not_lose_counters(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            fs_access = filesystemaccess.FileSystemAccess()
+
+            def record_run():
+                sut = buildmetrics.MetricsRecorder(fs_access, Path(metrics_dir), '/Project')
+                sut.emit(buildevents.PHASE_END, phase='build', config='Debug', success=True, seconds=1.0)
+                sut.close()
+            threads = [threading.Thread(target=record_run) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            metrics = fs_access.readfile(Path(metrics_dir) / buildmetrics.get_file_name('Debug', '/Project'))
+            self.assertIn('cpfbuild_phase_runs_total{config="Debug",phase="build",result="success",root="/Project"} 8\n', metrics)
+
+    def test_runs_without_configuration_write_no_metrics(self):
+        fs_access = filesystemaccess.FakeFileSystemAccess()
+        fs_access.mkdirs('/metrics')
+        sut = buildmetrics.MetricsRecorder(fs_access, PurePosixPath('/metrics'), '/Project')
+
+        with sut.phase('make'):
+            pass
+        sut.close()
+
+        self.assertEqual(fs_access.listdir('/metrics'), [])
+
+    def test_runs_that_fail_before_the_step_phase_ended_are_counted_as_failures(self):
+        fs_access = filesystemaccess.FakeFileSystemAccess()
+        fs_access.mkdirs('/metrics')
+        times = iter([100.0, 103.0])
+        sut = buildmetrics.MetricsRecorder(fs_access, PurePosixPath('/metrics'), '/Project', 'Debug', 'generate', clock=lambda: next(times, 103.0))
+
+        sut.emit(buildevents.PHASE_END, phase='configure', success=False, seconds=2.0)
+        sut.close()
+
+        metrics = fs_access.readfile(PurePosixPath('/metrics') / buildmetrics.get_file_name('Debug', '/Project'))
+        self.assertIn('cpfbuild_phase_runs_total{config="Debug",phase="configure",result="failure",root="/Project"} 1\n', metrics)
+        self.assertIn('cpfbuild_phase_runs_total{config="Debug",phase="generate",result="failure",root="/Project"} 1\n', metrics)
+        self.assertIn('cpfbuild_phase_duration_seconds_sum{config="Debug",phase="generate",root="/Project"} 3\n', metrics)
+
+    def test_label_values_are_escaped(self):
+        samples = {}
+        buildmetrics.add_run(samples, {'config': 'a"b', 'root': 'C:\\Project'}, [], {}, None, 1.5)
+
+        content = buildmetrics.format_samples(samples)
+
+        self.assertIn('cpfbuild_last_run_timestamp_seconds{config="a\\"b",root="C:\\\\Project"} 1.5\n', content)
+        self.assertEqual(buildmetrics.parse_samples(content), samples)
+        self.assertIsNone(buildevents.EventSink().error)
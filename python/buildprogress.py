@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+"""
+This module provides the QuietBuildOutput class which replaces the console output of
+the build tool with one progress line and keeps the full output in a compressed log.
+"""
+
+import json
+import re
+import statistics
+import time
+
+
+_NINJA_PROGRESS_REGEX = re.compile(r'^\[(\d+)/(\d+)\]')
+_MAKE_PROGRESS_REGEX = re.compile(r'^\[\s*(\d+)%\]')
+# The first lines of error messages of ninja, make, gcc, clang and msvc.
+_ERROR_LINE_REGEX = re.compile(r'^FAILED: |\b(fatal )?error\b\s*(C\d+\s*)?:|\*\*\* .*Error \d+', re.IGNORECASE)
+_MAX_ERROR_LINES = 500
+_NR_TAIL_LINES = 50
+_NR_REMEMBERED_BUILDS = 10
+# The intervals for updating the progress line in a terminal and for printing a new line in a log.
+_TERMINAL_UPDATE_SECONDS = 0.2
+_LOG_UPDATE_SECONDS = 30.0
+
+
+class QuietBuildOutput:
+    """
+    A text stream for the output of the build tool. All output goes to the log file. The lines
+    are parsed for the [n/m] progress of Ninja and the [ n%] progress of Makefiles. In a terminal
+    the progress line is overwritten in place, otherwise a new line is printed every few seconds.
+
+    The blocks of lines that start with an error message are kept, so they can be printed when
+    the build fails. The remaining time is estimated from the seconds per build step of the last
+    builds, which is blended with the speed of the current build while it makes progress.
+    """
+    def __init__(self, console, log_file, seconds_per_step_history=None, clock=time.monotonic):
+        self.m_console = console
+        self.m_log_file = log_file
+        self.m_history = seconds_per_step_history or []
+        self.m_clock = clock
+        self.m_start_time = clock()
+        self.m_last_update_time = None
+        self.m_is_terminal = console.isatty()
+        self.m_printed_length = 0
+        self.m_in_error_block = False
+        self.m_nr_error_lines = 0
+        self.m_tail = []
+        self.error_blocks = []
+        self.done = 0
+        self.total = 0
+        self.is_percentage = False
+
+    def write(self, text):
+        self.m_log_file.write(text)
+
+    def flush(self):
+        pass # The log file is flushed when it is closed.
+
+    def handle_line(self, line):
+        self.m_tail = (self.m_tail + [line])[-_NR_TAIL_LINES:]
+        if self._parse_progress(line):
+            self.m_in_error_block = False
+            self._update_progress_line()
+        elif _ERROR_LINE_REGEX.search(line) and not self.m_in_error_block:
+            self.m_in_error_block = True
+            self.error_blocks.append([])
+        if self.m_in_error_block and self.m_nr_error_lines < _MAX_ERROR_LINES:
+            self.error_blocks[-1].append(line)
+            self.m_nr_error_lines += 1
+
+    def _parse_progress(self, line):
+        match = _NINJA_PROGRESS_REGEX.match(line)
+        if match:
+            self.done, self.total = int(match.group(1)), int(match.group(2))
+            return True
+        match = _MAKE_PROGRESS_REGEX.match(line)
+        if match:
+            self.done, self.total, self.is_percentage = int(match.group(1)), 100, True
+            return True
+        return False
+
+    def _update_progress_line(self, force=False):
+        now = self.m_clock()
+        interval = _TERMINAL_UPDATE_SECONDS if self.m_is_terminal else _LOG_UPDATE_SECONDS
+        if not force and self.m_last_update_time is not None and now - self.m_last_update_time < interval:
+            return
+        self.m_last_update_time = now
+
+        text = get_progress_text(self.done, self.total, self.is_percentage, now - self.m_start_time, self.m_history)
+        if self.m_is_terminal:
+            # Overwrite the rest of a longer previous line with spaces.
+            self.m_console.write('\r' + text.ljust(self.m_printed_length))
+            self.m_printed_length = len(text)
+        else:
+            self.m_console.write(text + '\n')
+        self.m_console.flush()
+
+    def close(self, success):
+        """
+        Ends the progress line, closes the log and prints the error blocks if the build failed.
+        Returns the seconds per step of this build or None if it can not be used as history.
+        """
+        if self.m_last_update_time is not None:
+            self._update_progress_line(force=True)
+            if self.m_is_terminal:
+                self.m_console.write('\n')
+        self.m_log_file.close()
+
+        if not success:
+            if self.error_blocks:
+                for block in self.error_blocks:
+                    self.m_console.write('\n'.join(block) + '\n')
+                if self.m_nr_error_lines >= _MAX_ERROR_LINES:
+                    self.m_console.write('... more errors are in the log file.\n')
+            else:
+                self.m_console.write('\n'.join(self.m_tail) + '\n')
+        self.m_console.flush()
+
+        duration = self.m_clock() - self.m_start_time
+        if success and self.total and not self.is_percentage:
+            return duration / self.total
+        return None
+
+
+########### free functions #########################################################################
+def get_progress_text(done, total, is_percentage, elapsed_seconds, seconds_per_step_history):
+    """
+    Returns the progress line with the remaining time if it can be estimated.
+    """
+    if is_percentage:
+        text = '[{0:3d}%]'.format(done)
+    else:
+        text = '[{0}/{1}] {2:.0f}%'.format(done, total, 100.0 * done / total if total else 0.0)
+    text += ' elapsed {0}'.format(format_duration(elapsed_seconds))
+    remaining_seconds = get_remaining_seconds(done, total, is_percentage, elapsed_seconds, seconds_per_step_history)
+    if remaining_seconds is not None:
+        text += ', ETA {0}'.format(format_duration(remaining_seconds))
+    return text
+
+
+def get_remaining_seconds(done, total, is_percentage, elapsed_seconds, seconds_per_step_history):
+    """
+    Returns the estimated remaining seconds of the build or None if there is no estimate.
+    The history is in seconds per Ninja step, so it is not used for the percentages of Makefiles.
+    """
+    if not total or done > total:
+        return None
+    current_seconds_per_step = elapsed_seconds / done if done else None
+    history_seconds_per_step = statistics.median(seconds_per_step_history) if seconds_per_step_history and not is_percentage else None
+    if current_seconds_per_step is None and history_seconds_per_step is None:
+        return None
+    if history_seconds_per_step is None:
+        seconds_per_step = current_seconds_per_step
+    elif current_seconds_per_step is None:
+        seconds_per_step = history_seconds_per_step
+    else:
+        # The further the build gets, the more the current speed is trusted.
+        weight = done / total
+        seconds_per_step = weight * current_seconds_per_step + (1 - weight) * history_seconds_per_step
+    return (total - done) * seconds_per_step
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return '{0}:{1:02d}:{2:02d}'.format(hours, minutes, seconds)
+    return '{0}:{1:02d}'.format(minutes, seconds)
+
+
+def get_history(history_content):
+    """
+    Returns the seconds per build step of the last builds from the content of the history file.
+    """
+    if not history_content:
+        return []
+    try:
+        return [float(value) for value in json.loads(history_content)['seconds_per_step']]
+    except (ValueError, KeyError, TypeError):
+        return []
+
+
+def add_to_history(history_content, seconds_per_step):
+    """
+    Returns the content of the history file with the seconds per step of the latest build added.
+    """
+    history = get_history(history_content) + [seconds_per_step]
+    return json.dumps({'seconds_per_step': history[-_NR_REMEMBERED_BUILDS:]}, indent=4)
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the QuietBuildOutput class and the functions of the buildprogress module.
+"""
+
+import io
+import unittest
+
+from . import buildprogress
+
+
+class _Console(io.StringIO):
+    def __init__(self, is_terminal):
+        io.StringIO.__init__(self)
+        self.m_is_terminal = is_terminal
+
+    def isatty(self):
+        return self.m_is_terminal
+
+
+class _Clock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestBuildProgress(unittest.TestCase):
+    """
+    The test fixture for the buildprogress tests.
+    """
+    def _get_sut(self, is_terminal, history=None):
+        self.console = _Console(is_terminal)
+        self.log_file = io.StringIO()
+        self.log_file.close = lambda: None # Keep the content readable.
+        self.clock = _Clock()
+        return buildprogress.QuietBuildOutput(self.console, self.log_file, history, clock=self.clock)
+
+    def _write_lines(self, sut, lines):
+        for line in lines:
+            self.clock.time += 1.0
+            sut.write(line + '\n')
+            sut.handle_line(line)
+
+    def test_progress_line_is_overwritten_in_a_terminal(self):
+        sut = self._get_sut(is_terminal=True)
+
+        self._write_lines(sut, ['[1/4] Building CXX object a.cpp.o', 'a.cpp: warning: unused variable', '[2/4] Building CXX object b.cpp.o'])
+        self.assertEqual(sut.close(True), 3.0 / 4)
+
+        self.assertEqual(self.console.getvalue(), '\r[1/4] 25% elapsed 0:01, ETA 0:03\r[2/4] 50% elapsed 0:03, ETA 0:03\r[2/4] 50% elapsed 0:03, ETA 0:03\n')
+        self.assertEqual(self.log_file.getvalue(), '[1/4] Building CXX object a.cpp.o\na.cpp: warning: unused variable\n[2/4] Building CXX object b.cpp.o\n')
+
+    def test_error_blocks_are_printed_when_the_build_fails(self):
+        sut = self._get_sut(is_terminal=False)
+
+        self._write_lines(sut, [
+            '[ 10%] Building CXX object a.cpp.o',
+            '/src/a.cpp:3:5: error: unknown type name "Foo"',
+            '    Foo foo;',
+            '[ 20%] Building CXX object b.cpp.o',
+            '[ 30%] Building CXX object c.cpp.o',
+            'make[2]: *** [CMakeFiles/c.dir/build.make:63: c.cpp.o] Error 1',
+            ])
+        self.assertIsNone(sut.close(False), 'Failed builds and percentages are no history')
+
+        self.assertEqual(sut.error_blocks, [
+            ['/src/a.cpp:3:5: error: unknown type name "Foo"', '    Foo foo;'],
+            ['make[2]: *** [CMakeFiles/c.dir/build.make:63: c.cpp.o] Error 1'],
+            ])
+        self.assertTrue(self.console.getvalue().startswith('[ 10%] elapsed 0:01, ETA 0:09\n[ 30%] elapsed 0:06, ETA 0:14\n/src/a.cpp:3:5: error'))
+
+    def test_remaining_time_blends_the_history_with_the_current_speed(self):
+        self.assertEqual(buildprogress.get_remaining_seconds(0, 100, False, 0.0, [2.0, 4.0, 3.0]), 300.0)
+        self.assertEqual(buildprogress.get_remaining_seconds(50, 100, False, 50.0, [3.0]), 100.0)
+        self.assertEqual(buildprogress.get_remaining_seconds(25, 100, True, 50.0, [3.0]), 150.0)
+        self.assertIsNone(buildprogress.get_remaining_seconds(0, 100, False, 5.0, []))
+
+    def test_history_remembers_the_last_builds(self):
+        history = ''
+        for seconds_per_step in range(12):
+            history = buildprogress.add_to_history(history, float(seconds_per_step))
+        self.assertEqual(buildprogress.get_history(history), [float(value) for value in range(2, 12)])
+        self.assertEqual(buildprogress.get_history('invalid'), [])
+
+    def test_format_duration(self):
+        self.assertEqual(buildprogress.format_duration(59.9), '0:59')
+        self.assertEqual(buildprogress.format_duration(3725), '1:02:05')
@@ -0,0 +1,318 @@
+#!/usr/bin/python3
+"""
+This module contains functions for finding the cpus and the memory that are available
+for a build and for choosing the number of parallel build jobs from them.
+"""
+
+import json
+import math
+import os
+import platform
+import re
+
+
+# The assumed peak memory of one build job when no earlier build was measured.
+DEFAULT_JOB_MEMORY_BYTES = 1024 * 1024 * 1024
+_NR_REMEMBERED_PEAKS = 10
+_MEMINFO_LINE_REGEX = re.compile(r'^(\w+):\s+(\d+)\s*kB', re.MULTILINE)
+_CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+def get_cpu_count(physical_cores_only=False):
+    """
+    Returns the number of cpus that the process may run on, which is limited by the cpu affinity
+    of the process and the cpu quota of its cgroup. With physical_cores_only, hyper-threading
+    siblings are counted as one cpu.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+
+    count = len(cpus)
+    if physical_cores_only:
+        count = _get_physical_core_count(cpus) or count
+
+    if platform.system() == 'Linux':
+        quota = _get_cgroup_cpu_quota(_read_file('/proc/self/cgroup') or '')
+        if quota is not None:
+            count = min(count, math.ceil(quota))
+    return max(1, count)
+
+
+def get_numa_nodes():
+    """
+    Returns a dictionary that maps the ids of the NUMA nodes to the cpus of the node that
+    the process may run on. The dictionary is empty if the topology is unknown.
+    """
+    allowed_cpus = set(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None
+    nodes_dir = '/sys/devices/system/node'
+    if allowed_cpus is None or not os.path.isdir(nodes_dir):
+        return {}
+
+    nodes = {}
+    for entry in os.listdir(nodes_dir):
+        if entry.startswith('node') and entry[len('node'):].isdigit():
+            cpus = parse_cpu_list(_read_file(os.path.join(nodes_dir, entry, 'cpulist')) or '')
+            cpus = [cpu for cpu in cpus if cpu in allowed_cpus]
+            if cpus:
+                nodes[int(entry[len('node'):])] = cpus
+    return nodes
+
+
+def split_cpus(numa_nodes, nr_groups):
+    """
+    Splits the cpus of the NUMA nodes into groups. Returns a list of (node_ids, cpus) tuples.
+    If there are at least as many nodes as groups, each group gets whole nodes. Otherwise the
+    cpus are split into contiguous ranges, so most groups stay on one node.
+    """
+    node_ids = sorted(numa_nodes)
+    if len(node_ids) >= nr_groups:
+        groups = []
+        for group_index in range(nr_groups):
+            group_nodes = node_ids[group_index::nr_groups]
+            groups.append((group_nodes, sorted(cpu for node in group_nodes for cpu in numa_nodes[node])))
+        return groups
+
+    cpu_nodes = [(cpu, node) for node in node_ids for cpu in numa_nodes[node]]
+    groups = []
+    for group_index in range(nr_groups):
+        chunk = cpu_nodes[group_index * len(cpu_nodes) // nr_groups:(group_index + 1) * len(cpu_nodes) // nr_groups]
+        if not chunk:
+            chunk = cpu_nodes[group_index % len(cpu_nodes):][:1] # More groups than cpus.
+        groups.append((sorted(set(node for _, node in chunk)), [cpu for cpu, _ in chunk]))
+    return groups
+
+
+def parse_cpu_list(cpu_list):
+    """
+    Returns the cpus of a list like "0-3,8-11" as it is used by the kernel and taskset.
+    """
+    cpus = []
+    for part in cpu_list.strip().split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part.strip().isdigit():
+            cpus.append(int(part))
+    return cpus
+
+
+def format_cpu_list(cpus):
+    """
+    Returns a list like "0-3,8-11" for the given cpus.
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(first) if first == last else '{0}-{1}'.format(first, last) for first, last in ranges)
+
+
+def get_available_memory():
+    """
+    Returns the number of bytes that can be used without swapping or hitting the memory limit
+    of the cgroup of the current process. Returns None if the value can not be determined.
+    """
+    if platform.system() != 'Linux':
+        return None
+
+    values = []
+    meminfo = _read_file('/proc/meminfo')
+    if meminfo:
+        available = parse_meminfo(meminfo).get('MemAvailable')
+        if available is not None:
+            values.append(available)
+
+    cgroup_files = _read_cgroup_memory_files(_read_file('/proc/self/cgroup') or '')
+    if cgroup_files:
+        cgroup_available = parse_cgroup_memory(*cgroup_files)
+        if cgroup_available is not None:
+            values.append(cgroup_available)
+
+    return min(values) if values else None
+
+
+def get_total_memory():
+    """
+    Returns the number of bytes of the physical memory or of the memory limit of the cgroup of
+    the current process if it is smaller. Other than the available memory, the value does not
+    change with the load of the machine. Returns None if the value can not be determined.
+    """
+    if platform.system() != 'Linux':
+        return None
+
+    values = []
+    meminfo = _read_file('/proc/meminfo')
+    if meminfo:
+        total = parse_meminfo(meminfo).get('MemTotal')
+        if total is not None:
+            values.append(total)
+
+    cgroup_files = _read_cgroup_memory_files(_read_file('/proc/self/cgroup') or '')
+    if cgroup_files:
+        cgroup_limit = parse_cgroup_memory(cgroup_files[0], '')
+        if cgroup_limit is not None:
+            values.append(cgroup_limit)
+
+    return min(values) if values else None
+
+
+def get_peak_rss(rusage):
+    """
+    Returns the peak resident set size in bytes of the resource usage that os.wait4() returns
+    for a child process. It is the size of the biggest process of the child and its descendants.
+    """
+    if platform.system() == 'Darwin':
+        return rusage.ru_maxrss # macOS reports bytes
+    return rusage.ru_maxrss * 1024
+
+
+def get_job_count(max_jobs, available_memory, job_memory):
+    """
+    Returns the number of jobs that can run in parallel without exceeding the available memory.
+    """
+    if available_memory is None or not job_memory:
+        return max_jobs
+    return max(1, min(max_jobs, available_memory // job_memory))
+
+
+def get_job_memory(history_content):
+    """
+    Returns the biggest peak job memory of the earlier builds in the content of the history file
+    or the default job memory.
+    """
+    peaks = _parse_history(history_content)
+    return max(peaks) if peaks else DEFAULT_JOB_MEMORY_BYTES
+
+
+def add_to_history(history_content, peak_memory):
+    """
+    Returns the content of the history file with the peak memory of the latest build added.
+    Only the last few builds are remembered, so the estimate adapts to changes of the code.
+    """
+    peaks = _parse_history(history_content) + [peak_memory]
+    return json.dumps({'peak_job_memory_bytes': peaks[-_NR_REMEMBERED_PEAKS:]}, indent=4)
+
+
+def format_bytes(nr_bytes):
+    return '{0:.1f} GiB'.format(nr_bytes / (1024 * 1024 * 1024))
+
+
+def parse_meminfo(content):
+    """
+    Returns a dictionary with the values of /proc/meminfo in bytes.
+    """
+    return {match.group(1): int(match.group(2)) * 1024 for match in _MEMINFO_LINE_REGEX.finditer(content)}
+
+
+def parse_cgroup_memory(limit_content, usage_content):
+    """
+    Returns the number of bytes that are left until the memory limit of a cgroup is reached
+    or None if the cgroup has no limit.
+    """
+    limit = limit_content.strip()
+    if not limit.isdigit():
+        return None # cgroup v2 uses the value "max" for no limit.
+    limit = int(limit)
+    if limit >= 2**60:
+        return None # cgroup v1 uses a huge number for no limit.
+    usage = usage_content.strip()
+    return max(0, limit - (int(usage) if usage.isdigit() else 0))
+
+
+def parse_cgroup_cpu_quota(quota_content, period_content=None):
+    """
+    Returns the number of cpus that the cgroup quota allows or None if there is no quota.
+    cgroup v2 has both values in the cpu.max file, cgroup v1 has them in cpu.cfs_quota_us
+    and cpu.cfs_period_us.
+    """
+    fields = quota_content.split()
+    if period_content is not None:
+        fields = fields[:1] + period_content.split()[:1]
+    if len(fields) != 2 or not fields[0].isdigit() or not fields[1].isdigit():
+        return None # "max" in cgroup v2 or -1 in cgroup v1 mean that there is no quota.
+    if int(fields[1]) == 0:
+        return None
+    return int(fields[0]) / int(fields[1])
+
+
+def _get_cgroup_cpu_quota(proc_self_cgroup):
+    for line in proc_self_cgroup.splitlines():
+        fields = line.split(':', 2)
+        if len(fields) != 3:
+            continue
+        hierarchy_id, controllers, path = fields
+        if hierarchy_id == '0' and controllers == '':
+            for directory in _get_cgroup_directories(_CGROUP_ROOT, path):
+                content = _read_file(directory + '/cpu.max')
+                if content is not None:
+                    return parse_cgroup_cpu_quota(content)
+        elif 'cpu' in controllers.split(','):
+            for directory in _get_cgroup_directories(_CGROUP_ROOT + '/' + controllers, path) + _get_cgroup_directories(_CGROUP_ROOT + '/cpu', path):
+                quota = _read_file(directory + '/cpu.cfs_quota_us')
+                if quota is not None:
+                    return parse_cgroup_cpu_quota(quota, _read_file(directory + '/cpu.cfs_period_us') or '')
+    return None
+
+
+def _get_cgroup_directories(root, path):
+    # Inside of containers the cgroup of the process is mounted as the root directory.
+    return [(root + path).rstrip('/'), root]
+
+
+def _get_physical_core_count(cpus):
+    """
+    Returns the number of cores of the given cpus or None if the topology is unknown.
+    """
+    cores = set()
+    for cpu in cpus:
+        siblings = _read_file('/sys/devices/system/cpu/cpu{0}/topology/thread_siblings_list'.format(cpu))
+        if siblings is None:
+            return None
+        cores.add(siblings.strip())
+    return len(cores)
+
+
+def _read_cgroup_memory_files(proc_self_cgroup):
+    """
+    Returns the content of the memory limit and the memory usage file of the cgroup or None.
+    """
+    for line in proc_self_cgroup.splitlines():
+        fields = line.split(':', 2)
+        if len(fields) != 3:
+            continue
+        hierarchy_id, controllers, path = fields
+        if hierarchy_id == '0' and controllers == '':
+            directories = _get_cgroup_directories(_CGROUP_ROOT, path)
+            files = ('memory.max', 'memory.current')
+        elif 'memory' in controllers.split(','):
+            directories = _get_cgroup_directories(_CGROUP_ROOT + '/memory', path)
+            files = ('memory.limit_in_bytes', 'memory.usage_in_bytes')
+        else:
+            continue
+
+        for directory in directories:
+            limit = _read_file(directory + '/' + files[0])
+            if limit is not None:
+                return limit, _read_file(directory + '/' + files[1]) or ''
+    return None
+
+
+def _parse_history(history_content):
+    if not history_content:
+        return []
+    try:
+        return [int(peak) for peak in json.loads(history_content)['peak_job_memory_bytes']]
+    except (ValueError, KeyError, TypeError):
+        return []
+
+
+def _read_file(path):
+    try:
+        with open(path, 'r') as file:
+            return file.read()
+    except OSError:
+        return None
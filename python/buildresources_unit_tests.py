@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the functions of the buildresources module.
+"""
+
+import unittest
+
+from . import buildresources
+
+
+_GIB = 1024 * 1024 * 1024
+
+
+class TestBuildResources(unittest.TestCase):
+    """
+    The test fixture for the buildresources tests.
+    """
+    def test_parse_meminfo(self):
+        meminfo = buildresources.parse_meminfo('MemTotal:       32768000 kB\nMemAvailable:   16384000 kB\nHugePages_Total:       0\n')
+        self.assertEqual(meminfo['MemAvailable'], 16384000 * 1024)
+        self.assertNotIn('HugePages_Total', meminfo)
+
+    def test_parse_cgroup_memory(self):
+        self.assertEqual(buildresources.parse_cgroup_memory('8589934592\n', '2147483648\n'), 6 * _GIB)
+        self.assertIsNone(buildresources.parse_cgroup_memory('max\n', '2147483648\n'))
+        self.assertIsNone(buildresources.parse_cgroup_memory('9223372036854771712\n', '2147483648\n'))
+
+    def test_parse_cgroup_cpu_quota(self):
+        self.assertEqual(buildresources.parse_cgroup_cpu_quota('800000 100000\n'), 8)
+        self.assertIsNone(buildresources.parse_cgroup_cpu_quota('max 100000\n'))
+        self.assertEqual(buildresources.parse_cgroup_cpu_quota('150000\n', '100000\n'), 1.5)
+        self.assertIsNone(buildresources.parse_cgroup_cpu_quota('-1\n', '100000\n'))
+
+    def test_get_cpu_count_returns_at_least_one_cpu(self):
+        self.assertGreaterEqual(buildresources.get_cpu_count(), 1)
+        self.assertLessEqual(buildresources.get_cpu_count(physical_cores_only=True), buildresources.get_cpu_count())
+
+    def test_get_job_count_is_limited_by_the_memory(self):
+        self.assertEqual(buildresources.get_job_count(64, 30 * _GIB, 4 * _GIB), 7)
+        self.assertEqual(buildresources.get_job_count(4, 30 * _GIB, 4 * _GIB), 4)
+        self.assertEqual(buildresources.get_job_count(64, 1 * _GIB, 4 * _GIB), 1)
+        self.assertEqual(buildresources.get_job_count(64, None, 4 * _GIB), 64)
+
+    def test_history_remembers_the_latest_peaks(self):
+        self.assertEqual(buildresources.get_job_memory(''), buildresources.DEFAULT_JOB_MEMORY_BYTES)
+
+        history = ''
+        for peak in range(1, 13):
+            history = buildresources.add_to_history(history, peak * _GIB)
+
+        self.assertEqual(buildresources.get_job_memory(history), 12 * _GIB)
+        history = buildresources.add_to_history(history, 1 * _GIB)
+        self.assertEqual(len(buildresources._parse_history(history)), 10)
+
+    def test_split_cpus_gives_each_group_its_own_node(self):
+        numa_nodes = {0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}
+        self.assertEqual(buildresources.split_cpus(numa_nodes, 2), [([0], [0, 1, 2, 3]), ([1], [4, 5, 6, 7])])
+        self.assertEqual(buildresources.split_cpus(numa_nodes, 1), [([0, 1], [0, 1, 2, 3, 4, 5, 6, 7])])
+        self.assertEqual(buildresources.split_cpus(numa_nodes, 4), [([0], [0, 1]), ([0], [2, 3]), ([1], [4, 5]), ([1], [6, 7])])
+
+    def test_cpu_lists(self):
+        self.assertEqual(buildresources.parse_cpu_list('0-3,8,10-11\n'), [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(buildresources.format_cpu_list([11, 0, 1, 2, 3, 8, 10]), '0-3,8,10-11')
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+This module provides the BuildResult class which is returned by the configure, generate and
+make steps of the BuildAutomat and the ResultRecorder which collects it from the events of a step.
+"""
+
+import threading
+
+from . import buildevents
+
+
+class BuildResult:
+    """
+    Describes the run of a build step for programs that call the BuildAutomat directly instead
+    of running the scripts. The object is true if the step succeeded, so it can still be used
+    like the boolean that the steps returned before.
+
+    phases:     The phase_end events with the phase name, the seconds, the success and the
+                fields of the phase, like the configuration.
+    commands:   The command, the return code, the seconds and the number of output lines of
+                each process that was started by the step.
+    caches:     Maps the name of each used cache to its hits and misses.
+    log_files:  Maps the kind of each written log file to its path.
+    errors:     The error messages that were printed by the step.
+    """
+    def __init__(self):
+        self.success = False
+        self.phases = []
+        self.commands = []
+        self.caches = {}
+        self.log_files = {}
+        self.errors = []
+
+    def __bool__(self):
+        return bool(self.success)
+
+    @property
+    def exit_code(self):
+        """
+        Returns 0 if the step succeeded. Otherwise the return code of the last command that
+        failed or 1 if the step failed without a failing command.
+        """
+        if self.success:
+            return 0
+        return next((command['return_code'] for command in reversed(self.commands) if command['return_code']), 1)
+
+    def get_phase_seconds(self):
+        """
+        Returns the summed up seconds of each phase name.
+        """
+        seconds = {}
+        for phase in self.phases:
+            seconds[phase['phase']] = seconds.get(phase['phase'], 0.0) + phase['seconds']
+        return seconds
+
+
+class ResultRecorder(buildevents.EventSink):
+    """
+    An event sink that collects the events of a build step in a BuildResult.
+    The process events can come from the threads of commands that run in parallel.
+    """
+    def __init__(self):
+        self.result = BuildResult()
+        self.m_lock = threading.Lock()
+        self.m_running_commands = {}
+
+    def emit(self, event_type, **fields):
+        with self.m_lock:
+            if event_type == buildevents.PHASE_END:
+                self.result.phases.append(fields)
+            elif event_type == buildevents.PROCESS_START:
+                self.m_running_commands[fields['pid']] = fields['command']
+            elif event_type == buildevents.PROCESS_EXIT:
+                self.result.commands.append({
+                    'command': self.m_running_commands.pop(fields['pid'], None),
+                    'return_code': fields['return_code'],
+                    'seconds': fields['seconds'],
+                    'output_lines': fields['output_lines'],
+                    })
+            elif event_type == buildevents.CACHE:
+                cache = self.result.caches.setdefault(fields['cache'], {'hits': 0, 'misses': 0})
+                cache['hits'] += fields['hits']
+                cache['misses'] += fields['misses']
+            elif event_type == buildevents.LOG_FILE:
+                self.result.log_files[fields['kind']] = fields['path']
+            elif event_type == buildevents.ERROR:
+                self.result.errors.append(fields['message'])
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the BuildResult and ResultRecorder classes.
+"""
+
+import unittest
+
+from . import buildresult
+
+
+class TestBuildResult(unittest.TestCase):
+    """
+    The test fixture for the buildresult tests.
+    """
+    def setUp(self):
+        self.sut = buildresult.ResultRecorder()
+
+    def test_recorder_collects_the_commands_caches_and_log_files(self):
+        self.sut.process_started(42, 'ninja')
+        self.sut.process_started(43, 'ctest')
+        self.sut.process_exited(43, 0, 0.5, 3)
+        self.sut.process_exited(42, 2, 1.23456, 17)
+        self.sut.cache_used('ccache', 3, 1)
+        self.sut.cache_used('ccache', 2, 0)
+        self.sut.log_file_written('build_log', '/build/CPFBuildLog.txt.gz')
+
+        result = self.sut.result
+        self.assertEqual(result.commands, [
+            {'command': 'ctest', 'return_code': 0, 'seconds': 0.5, 'output_lines': 3},
+            {'command': 'ninja', 'return_code': 2, 'seconds': 1.235, 'output_lines': 17},
+            ])
+        self.assertEqual(result.caches, {'ccache': {'hits': 5, 'misses': 1}})
+        self.assertEqual(result.log_files, {'build_log': '/build/CPFBuildLog.txt.gz'})
+
+    def test_result_sums_up_the_seconds_of_the_phases(self):
+        self.sut.emit('phase_end', phase='build', seconds=2.0, success=True, config='MyConfig')
+        self.sut.emit('phase_end', phase='build', seconds=3.0, success=True, config='MyOtherConfig')
+        self.sut.emit('phase_end', phase='make', seconds=6.0, success=True)
+
+        self.assertEqual(self.sut.result.get_phase_seconds(), {'build': 5.0, 'make': 6.0})
+
+    def test_result_is_true_if_the_step_succeeded(self):
+        result = self.sut.result
+        self.assertFalse(result)
+
+        result.success = True
+
+        self.assertTrue(result)
+        self.assertEqual(result.exit_code, 0)
+
+    def test_exit_code_of_a_failed_step_is_the_return_code_of_the_last_failed_command(self):
+        self.assertEqual(self.sut.result.exit_code, 1)
+
+        self.sut.process_started(42, 'ninja')
+        self.sut.process_exited(42, 2, 1.0, 17)
+        self.sut.process_started(43, 'cmake')
+        self.sut.process_exited(43, 0, 1.0, 1)
+        self.sut.error_printed('Error: The build failed.')
+
+        self.assertEqual(self.sut.result.exit_code, 2)
+        self.assertEqual(self.sut.result.errors, ['Error: The build failed.'])
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+This module provides the BuildStamps class which detects builds that
+have nothing to do without asking the build tool.
+"""
+
+import hashlib
+import json
+
+from . import miscosaccess
+
+
+class BuildStamps:
+    """
+    Remembers a cheap stamp of the source tree state for the last successful build of each
+    target. The stamp consists of the git HEAD commits, the list of modified and untracked
+    files with their modification times and the modification times of additional input files
+    like the config file and the CMakeCache.txt file.
+    """
+    def __init__(self, os_access, fs_access, stamps_file):
+        self.m_os_access = os_access
+        self.m_fs_access = fs_access
+        self.m_stamps_file = stamps_file
+
+    def get_current_stamp(self, repository_dir, input_files, excluded_dirs):
+        """
+        Returns the stamp of the current state or None if the state can not be determined.
+        Changes in the excluded directories of the repository, like the build-tree, are ignored.
+        """
+        digest = hashlib.sha256()
+        try:
+            self._add_repository_state(digest, repository_dir, [directory.rstrip('/') + '/' for directory in excluded_dirs])
+        except miscosaccess.CalledProcessError:
+            return None # Not a git repository or git is not available.
+
+        for input_file in input_files:
+            self._add_file_state(digest, input_file)
+        return digest.hexdigest()
+
+    def matches(self, key, stamp):
+        """
+        Returns true if the stamp is the one of the last successful build with the given key.
+        """
+        return stamp is not None and self._read_stamps().get(key) == stamp
+
+    def store(self, key, stamp):
+        if stamp is None:
+            return
+        stamps = self._read_stamps()
+        stamps[key] = stamp
+        self.m_fs_access.writefile(self.m_stamps_file, json.dumps(stamps, indent=4))
+
+    def _read_stamps(self):
+        if self.m_fs_access.isfile(self.m_stamps_file):
+            try:
+                return json.loads(self.m_fs_access.readfile(self.m_stamps_file))
+            except ValueError:
+                pass
+        return {}
+
+    def _add_repository_state(self, digest, repository_dir, excluded_dirs=()):
+        """
+        Adds the HEAD commit and the changed files of the repository. Modified git submodules
+        are added recursively, because git only reports the submodule directory for them.
+        """
+        head = self._git(repository_dir, 'git rev-parse HEAD')
+        digest.update('{0}:{1}\n'.format(repository_dir, ''.join(head)).encode('utf-8'))
+
+        status_lines = self._git(repository_dir, 'git status --porcelain --untracked-files=all')
+        for line in status_lines:
+            path = _get_status_path(line)
+            if not path or any((path + '/').startswith(directory) for directory in excluded_dirs):
+                continue
+            full_path = repository_dir / path
+            digest.update(line.encode('utf-8'))
+            if self.m_fs_access.isdir(full_path):
+                self._add_repository_state(digest, full_path)
+            else:
+                self._add_file_state(digest, full_path)
+
+    def _add_file_state(self, digest, path):
+        if self.m_fs_access.exists(path):
+            file_stat = self.m_fs_access.stat(path)
+            digest.update('{0}:{1}:{2}\n'.format(path, file_stat.st_mtime, file_stat.st_size).encode('utf-8'))
+        else:
+            digest.update('{0}:missing\n'.format(path).encode('utf-8'))
+
+    def _git(self, repository_dir, command):
+        return self.m_os_access.execute_command_output(
+            command,
+            cwd=repository_dir,
+            print_output=miscosaccess.OutputMode.NEVER)
+
+
+########### free functions #########################################################################
+def _get_status_path(status_line):
+    """
+    Returns the path from a line of git status --porcelain like " M dir/file.cpp"
+    or "R  old.cpp -> new.cpp".
+    """
+    path = status_line[3:]
+    if ' -> ' in path:
+        path = path.split(' -> ')[1]
+    return path.strip().strip('"').rstrip('/')
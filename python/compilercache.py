@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+"""
+This module contains functions for using ccache or sccache as compiler launcher.
+"""
+
+import json
+import re
+import zlib
+
+from . import miscosaccess
+
+
+# The supported launchers in the order of preference.
+LAUNCHERS = ['ccache', 'sccache']
+LANGUAGES = ['C', 'CXX']
+_LAUNCHER_CACHE_ENTRY_REGEX = re.compile(r'^CMAKE_(?:C|CXX)_COMPILER_LAUNCHER:\w+=(.+)$', re.MULTILINE)
+# The cache location in the statistics of sccache, like: Local disk: "/home/user/.cache/sccache"
+_LOCAL_CACHE_LOCATION_REGEX = re.compile(r'Local disk: "(.*)"')
+# The ports of the per cache directory sccache servers lie below the ephemeral ports.
+_SERVER_PORT_BASE = 20000
+_NR_SERVER_PORTS = 10000
+
+
+def find_compiler_launcher(os_access):
+    """
+    Returns the path to the first available compiler launcher or None.
+    """
+    for launcher in LAUNCHERS:
+        path = os_access.which(launcher)
+        if path:
+            return path.replace('\\', '/')
+    return None
+
+
+def get_launcher_definitions(launcher_path):
+    """
+    Returns the cmake -D options that make cmake use the launcher.
+    """
+    return ['-DCMAKE_{0}_COMPILER_LAUNCHER="{1}"'.format(language, launcher_path) for language in LANGUAGES]
+
+
+def get_remove_launcher_definitions():
+    """
+    Returns the cmake -U options that remove the launcher entries from an existing cache.
+    """
+    return ['-UCMAKE_{0}_COMPILER_LAUNCHER'.format(language) for language in LANGUAGES]
+
+
+def has_launcher_in_cmake_cache(cmake_cache_content):
+    """
+    Returns true if a CMakeCache.txt file sets any compiler launcher.
+    """
+    return bool(_LAUNCHER_CACHE_ENTRY_REGEX.search(cmake_cache_content))
+
+
+def get_launcher_from_cmake_cache(cmake_cache_content):
+    """
+    Returns the name of the ccache or sccache launcher that is set in a CMakeCache.txt file or None.
+    """
+    for match in _LAUNCHER_CACHE_ENTRY_REGEX.finditer(cmake_cache_content):
+        name = _get_launcher_name(match.group(1))
+        if name in LAUNCHERS:
+            return name
+    return None
+
+
+def get_environment(launcher, environment, cache_dir, max_size):
+    """
+    Adds the variables that set the cache directory and size limit of the launcher to the environment.
+    sccache gets the port of the server for the cache directory unless SCCACHE_SERVER_PORT is already set.
+    """
+    environment = dict(environment)
+    if launcher == 'ccache':
+        environment['CCACHE_DIR'] = str(cache_dir)
+        environment['CCACHE_MAXSIZE'] = max_size
+    elif launcher == 'sccache':
+        environment['SCCACHE_DIR'] = str(cache_dir)
+        environment['SCCACHE_CACHE_SIZE'] = max_size
+        environment.setdefault('SCCACHE_SERVER_PORT', str(get_server_port(cache_dir)))
+    return environment
+
+
+def get_server_cache_dir(os_access, launcher, environment):
+    """
+    Returns the local cache directory of the sccache server that the environment connects to
+    if it differs from the SCCACHE_DIR of the environment, or None. Such a server was started
+    by another build with the same SCCACHE_SERVER_PORT and keeps its own cache, because sccache
+    reads SCCACHE_DIR only when its server starts. The server is not stopped, because other
+    builds may still use it.
+    """
+    if launcher != 'sccache':
+        return None
+    try:
+        output = os_access.execute_command_output('sccache --show-stats --stats-format=json', print_output=miscosaccess.OutputMode.NEVER, env=environment)
+        cache_location = json.loads('\n'.join(output))['cache_location']
+        match = _LOCAL_CACHE_LOCATION_REGEX.match(cache_location)
+        if not match or _normalize_path(match.group(1)) == _normalize_path(environment['SCCACHE_DIR']):
+            return None
+        return match.group(1)
+    except (miscosaccess.CalledProcessError, ValueError, KeyError, TypeError):
+        return None
+
+
+def get_server_port(cache_dir):
+    """
+    Returns the port of the sccache server that serves the cache directory. Each directory gets
+    its own server, so builds of other projects keep their servers and caches.
+    """
+    return _SERVER_PORT_BASE + zlib.crc32(_normalize_path(cache_dir).encode('utf-8')) % _NR_SERVER_PORTS
+
+
+def get_statistics(os_access, launcher, environment):
+    """
+    Returns the total number of cache hits and misses of the launcher or None
+    if the statistics are not available.
+    """
+    try:
+        if launcher == 'ccache':
+            output = os_access.execute_command_output('ccache --print-stats', print_output=miscosaccess.OutputMode.NEVER, env=environment)
+            return _parse_ccache_statistics(output)
+        if launcher == 'sccache':
+            output = os_access.execute_command_output('sccache --show-stats --stats-format=json', print_output=miscosaccess.OutputMode.NEVER, env=environment)
+            return _parse_sccache_statistics(output)
+    except (miscosaccess.CalledProcessError, ValueError, KeyError):
+        pass
+    return None
+
+
+def get_statistics_summary(launcher, statistics_before, statistics_after):
+    """
+    Returns a line that describes the cache hits and misses between the two statistics.
+    """
+    if statistics_before is None or statistics_after is None:
+        return 'Compiler cache ({0}): no statistics available.'.format(launcher)
+    hits = statistics_after[0] - statistics_before[0]
+    misses = statistics_after[1] - statistics_before[1]
+    total = hits + misses
+    hit_rate = 100.0 * hits / total if total else 0.0
+    return 'Compiler cache ({0}): {1} hits, {2} misses, {3:.0f}% hit rate.'.format(launcher, hits, misses, hit_rate)
+
+
+def _get_launcher_name(path):
+    name = path.strip().strip('"').replace('\\', '/').split('/')[-1]
+    if name.endswith('.exe'):
+        name = name[:-len('.exe')]
+    return name
+
+
+def _normalize_path(path):
+    # sccache prints Windows paths with escaped backslashes.
+    return re.sub(r'[\\/]+', '/', str(path)).rstrip('/')
+
+
+def _parse_ccache_statistics(output_lines):
+    """
+    Parses the tab separated output of ccache --print-stats.
+    """
+    values = {}
+    for line in output_lines:
+        fields = line.split('\t')
+        if len(fields) == 2 and fields[1].strip().isdigit():
+            values[fields[0].strip()] = int(fields[1])
+    hits = values.get('direct_cache_hit', 0) + values.get('preprocessed_cache_hit', 0)
+    misses = values.get('cache_miss', 0)
+    return (hits, misses)
+
+
+def _parse_sccache_statistics(output_lines):
+    stats = json.loads('\n'.join(output_lines))['stats']
+    hits = sum(stats['cache_hits']['counts'].values())
+    misses = sum(stats['cache_misses']['counts'].values())
+    return (hits, misses)
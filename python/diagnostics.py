@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+"""
+This module provides the DiagnosticsIndexer class which finds the compiler and linker
+diagnostics in the output of a build while it is written to the build log, the
+WarningDeduplicator which removes repeated warnings from the output, and functions
+for storing and printing the found diagnostics.
+"""
+
+import collections
+import json
+import os
+import re
+
+
+ERROR = 'error'
+WARNING = 'warning'
+# Builds with many warnings would create huge index files.
+_MAX_DIAGNOSTICS_PER_SEVERITY = 5000
+_MAX_MESSAGE_LENGTH = 500
+# The cheap keyword search finds the few lines that are matched with the full patterns.
+_KEYWORD_REGEX = re.compile(r'error|warning|undefined reference|multiple definition')
+# The patterns are matched from the start to the end of one line.
+# gcc and clang: file:line:column: severity: message
+# msvc: file(line,column): severity C1234: message
+# linkers: ld: error: message, LINK : fatal error LNK1104: message, file.obj : error LNK2019: message
+_DIAGNOSTIC_REGEX = re.compile(
+    r'(?:'
+    r'(?P<gcc_file>(?:[A-Za-z]:)?[^:\n]+):(?P<gcc_line>\d+):(?:(?P<gcc_column>\d+):)?\s*(?P<gcc_severity>fatal error|error|warning):\s*(?P<gcc_message>.*)'
+    r'|(?P<msvc_file>[^(\n]+)\((?P<msvc_line>\d+)(?:,(?P<msvc_column>\d+))?\)\s*:\s*(?P<msvc_severity>fatal error|error|warning)\s+(?P<msvc_message>[A-Z]+\d+\s*:.*)'
+    r'|(?P<tool_file>[^:\n]*?(?:\bld|\blld|collect2|LINK|\.obj|\.o|\.lib|\.a))\s*:\s*(?P<tool_severity>fatal error|error|warning)\s*:?\s*(?P<tool_message>.*)'
+    r'|(?P<ld_file>(?:[A-Za-z]:)?[^:\n]+):\(.*\):\s*(?P<ld_message>undefined reference to .*|multiple definition of .*)'
+    r')$')
+
+# The lines that gcc prints before a diagnostic to show where it comes from.
+_CONTEXT_LINE_REGEX = re.compile(r'In file included from |\s+from |\S[^:]*: In |\S.*:\d+:\d+:\s+(required|in) ')
+# Finds the context lines in a chunk of lines.
+_CONTEXT_LINES_REGEX = re.compile(r'^(?:' + _CONTEXT_LINE_REGEX.pattern + ')', re.MULTILINE)
+_NOTE_LINE_REGEX = re.compile(r'\S.*:\s*note:')
+_NR_TOP_WARNINGS = 10
+
+
+class DiagnosticsIndexer:
+    """
+    A text stream that writes the output of the build tool to the log file and searches each
+    chunk for diagnostics. The position of each diagnostic is the byte offset of its line in the
+    uncompressed log. The optional echo stream also gets the output, so it can still be shown
+    on the console.
+    """
+    def __init__(self, log_file, echo=None):
+        self.m_log_file = log_file
+        self.m_echo = echo
+        self.m_incomplete_line = ''
+        self.m_offset = 0 # The byte offset of the incomplete line in the log.
+        self.m_counts = {ERROR: 0, WARNING: 0}
+        self.diagnostics = []
+
+    def write(self, text):
+        self.m_log_file.write(text)
+        if self.m_echo:
+            self.m_echo.write(text)
+        text = self.m_incomplete_line + text
+        end = text.rfind('\n') + 1
+        self._index(text[:end])
+        self.m_incomplete_line = text[end:]
+
+    def flush(self):
+        if self.m_echo:
+            self.m_echo.flush()
+
+    def close(self):
+        self._index(self.m_incomplete_line)
+        self.m_incomplete_line = ''
+        self.m_log_file.close()
+
+    def _index(self, text):
+        # Build output is mostly ascii, where the character and byte offsets are the same.
+        is_ascii = text.isascii()
+        for match in _find_diagnostic_lines(text):
+            diagnostic = get_diagnostic(match)
+            if self.m_counts[diagnostic['severity']] < _MAX_DIAGNOSTICS_PER_SEVERITY:
+                self.m_counts[diagnostic['severity']] += 1
+                start = match.start()
+                diagnostic['offset'] = self.m_offset + (start if is_ascii else len(text[:start].encode('utf-8')))
+                self.diagnostics.append(diagnostic)
+        self.m_offset += len(text) if is_ascii else len(text.encode('utf-8'))
+
+
+class WarningDeduplicator:
+    """
+    A text stream that passes the output of the build tool on to the next stream, but drops
+    warnings that were already passed on. A warning in a header is printed by each translation
+    unit that includes it. The include context lines before a repeated warning and its source
+    snippet and note lines after it are dropped as well.
+
+    Chunks that contain no warnings and no context lines are passed on without splitting
+    them into lines.
+    """
+    def __init__(self, output):
+        self.m_output = output
+        self.m_incomplete_line = ''
+        self.m_context_lines = []
+        self.m_is_dropping = False
+        self.m_counts = collections.Counter()
+        self.m_warning_lines = {}
+        self.nr_dropped_lines = 0
+
+    def write(self, text):
+        text = self.m_incomplete_line + text
+        end = text.rfind('\n') + 1
+        self.m_incomplete_line = text[end:]
+        complete_lines = text[:end]
+        if (not self.m_is_dropping and not self.m_context_lines and 'warning' not in complete_lines
+                and not _CONTEXT_LINES_REGEX.search(complete_lines)):
+            self.m_output.write(complete_lines)
+        else:
+            self.m_output.write(''.join(self._filter(complete_lines.splitlines(keepends=True))))
+
+    def flush(self):
+        self.m_output.flush()
+
+    def close(self):
+        """
+        Passes on the remaining output. The next stream is not closed.
+        """
+        lines = self._filter([self.m_incomplete_line] if self.m_incomplete_line else [])
+        self.m_output.write(''.join(lines + self.m_context_lines))
+        self.m_incomplete_line = ''
+        self.m_context_lines = []
+
+    def _filter(self, lines):
+        kept_lines = []
+        for line in lines:
+            stripped_line = line.rstrip()
+            if _CONTEXT_LINE_REGEX.match(stripped_line):
+                self.m_context_lines.append(line)
+                continue
+
+            diagnostic = match_diagnostic(stripped_line)
+            if diagnostic and diagnostic['severity'] == WARNING:
+                key = (os.path.normpath(diagnostic['file']), diagnostic['line'], diagnostic['column'], diagnostic['message'])
+                self.m_counts[key] += 1
+                self.m_is_dropping = self.m_counts[key] > 1
+                if not self.m_is_dropping:
+                    self.m_warning_lines[key] = stripped_line
+            elif self.m_is_dropping and (line[:1].isspace() or _NOTE_LINE_REGEX.match(stripped_line)):
+                pass # The source snippet or a note of the repeated warning.
+            else:
+                self.m_is_dropping = False
+
+            if self.m_is_dropping:
+                self.nr_dropped_lines += 1 + len(self.m_context_lines)
+            else:
+                kept_lines.extend(self.m_context_lines)
+                kept_lines.append(line)
+            self.m_context_lines = []
+        return kept_lines
+
+    def get_summary(self, nr_top_warnings=_NR_TOP_WARNINGS):
+        """
+        Returns lines with the numbers of unique and repeated warnings and the most repeated warnings.
+        """
+        nr_warnings = sum(self.m_counts.values())
+        if not nr_warnings:
+            return []
+        summary = ['The build printed {0} warnings, {1} of them are unique. {2} lines of repeated warnings were dropped.'.format(
+            nr_warnings, len(self.m_counts), self.nr_dropped_lines)]
+        top_warnings = [(key, count) for key, count in self.m_counts.most_common(nr_top_warnings) if count > 1]
+        if top_warnings:
+            summary.append('The most repeated warnings:')
+            summary.extend('{0:6d}x {1}'.format(count, self.m_warning_lines[key]) for key, count in top_warnings)
+        return summary
+
+
+########### free functions #########################################################################
+def _find_diagnostic_lines(text):
+    position = 0
+    while True:
+        keyword = _KEYWORD_REGEX.search(text, position)
+        if not keyword:
+            return
+        line_start = text.rfind('\n', 0, keyword.start()) + 1
+        line_end = text.find('\n', keyword.end())
+        if line_end == -1:
+            line_end = len(text)
+        match = _DIAGNOSTIC_REGEX.match(text, line_start, line_end)
+        if match:
+            yield match
+        position = line_end + 1
+
+
+def get_diagnostic(match):
+    """
+    Returns the file, line, column, severity and message of a match of the diagnostics pattern.
+    """
+    for kind in ['gcc', 'msvc', 'tool', 'ld']:
+        if match.group(kind + '_file') is not None:
+            groups = match.groupdict()
+            severity = groups.get(kind + '_severity') or ERROR
+            line = groups.get(kind + '_line')
+            column = groups.get(kind + '_column')
+            return {
+                'file': match.group(kind + '_file').strip(),
+                'line': int(line) if line else None,
+                'column': int(column) if column else None,
+                'severity': WARNING if severity == WARNING else ERROR,
+                'message': match.group(kind + '_message').strip()[:_MAX_MESSAGE_LENGTH],
+                }
+    return None
+
+
+def match_diagnostic(line):
+    """
+    Returns the diagnostic of an output line or None if the line is no diagnostic.
+    """
+    if not _KEYWORD_REGEX.search(line):
+        return None
+    match = _DIAGNOSTIC_REGEX.match(line)
+    return get_diagnostic(match) if match else None
+
+
+def find_diagnostics(text):
+    """
+    Returns the diagnostics of the given output without the offsets.
+    """
+    return [get_diagnostic(match) for match in _find_diagnostic_lines(text)]
+
+
+def get_index(log_file, diagnostics):
+    """
+    Returns the content of the index file. Each diagnostic is stored as a list of
+    severity, file, line, column, byte offset in the log and message.
+    """
+    entries = [[diagnostic['severity'], diagnostic['file'], diagnostic['line'], diagnostic['column'], diagnostic['offset'], diagnostic['message']] for diagnostic in diagnostics]
+    return json.dumps({'log': str(log_file), 'diagnostics': entries}, separators=(',', ':'))
+
+
+def parse_index(index_content):
+    """
+    Returns the log file and the diagnostics of an index file.
+    """
+    index = json.loads(index_content)
+    keys = ['severity', 'file', 'line', 'column', 'offset', 'message']
+    return index['log'], [dict(zip(keys, entry)) for entry in index['diagnostics']]
+
+
+def format_diagnostic(diagnostic):
+    location = diagnostic['file']
+    if diagnostic['line'] is not None:
+        location += ':{0}'.format(diagnostic['line'])
+        if diagnostic['column'] is not None:
+            location += ':{0}'.format(diagnostic['column'])
+    return '{0}: {1}: {2} [log offset {3}]'.format(location, diagnostic['severity'], diagnostic['message'], diagnostic['offset'])
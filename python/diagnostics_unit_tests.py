@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the DiagnosticsIndexer and WarningDeduplicator classes and the functions of the diagnostics module.
+"""
+
+import io
+import unittest
+
+from . import diagnostics
+
+
+class TestDiagnostics(unittest.TestCase):
+    """
+    The test fixture for the diagnostics tests.
+    """
+    def test_find_diagnostics_of_compilers_and_linkers(self):
+        output = (
+            '[1/3] Building CXX object a.cpp.o\n'
+            '/usr/bin/c++ -Werror -c /src/error_handling.cpp\n'
+            '/src/a.cpp:3:5: error: unknown type name \'Foo\'\n'
+            'C:\\src\\b.cpp:10:2: warning: unused variable \'x\' [-Wunused-variable]\n'
+            'C:\\src\\m.cpp(12,7): error C2065: \'x\': undeclared identifier\n'
+            'C:\\src\\m.cpp(3): warning C4996: \'strcpy\': deprecated\n'
+            'a.cpp:(.text+0x5): undefined reference to `foo()\'\n'
+            'collect2: error: ld returned 1 exit status\n'
+            'ld.lld: error: undefined symbol: foo\n'
+            'main.obj : error LNK2019: unresolved external symbol foo\n'
+            'LINK : fatal error LNK1104: cannot open file \'x.lib\'\n'
+            )
+
+        found = [(d['file'], d['line'], d['column'], d['severity'], d['message']) for d in diagnostics.find_diagnostics(output)]
+
+        self.assertEqual(found, [
+            ('/src/a.cpp', 3, 5, 'error', 'unknown type name \'Foo\''),
+            ('C:\\src\\b.cpp', 10, 2, 'warning', 'unused variable \'x\' [-Wunused-variable]'),
+            ('C:\\src\\m.cpp', 12, 7, 'error', 'C2065: \'x\': undeclared identifier'),
+            ('C:\\src\\m.cpp', 3, None, 'warning', 'C4996: \'strcpy\': deprecated'),
+            ('a.cpp', None, None, 'error', 'undefined reference to `foo()\''),
+            ('collect2', None, None, 'error', 'ld returned 1 exit status'),
+            ('ld.lld', None, None, 'error', 'undefined symbol: foo'),
+            ('main.obj', None, None, 'error', 'LNK2019: unresolved external symbol foo'),
+            ('LINK', None, None, 'error', 'LNK1104: cannot open file \'x.lib\''),
+            ])
+
+    def test_indexer_stores_the_byte_offsets_of_diagnostics_that_are_split_between_chunks(self):
+        log_file = io.StringIO()
+        log_file.close = lambda: None # Keep the content readable.
+        sut = diagnostics.DiagnosticsIndexer(log_file)
+
+        sut.write('Größe\n/src/a.cpp:3:5: err')
+        sut.write('or: first\nb.cpp:1:1: warning: second')
+        sut.close()
+
+        log = log_file.getvalue().encode('utf-8')
+        self.assertEqual([d['message'] for d in sut.diagnostics], ['first', 'second'])
+        self.assertTrue(log[sut.diagnostics[0]['offset']:].startswith(b'/src/a.cpp:3:5: error: first'))
+        self.assertTrue(log[sut.diagnostics[1]['offset']:].startswith(b'b.cpp:1:1: warning: second'))
+
+    def test_index_content_can_be_read_back(self):
+        found = [{'file': '/src/a.cpp', 'line': 3, 'column': 5, 'severity': 'error', 'message': 'first', 'offset': 42}]
+
+        log_file, read_diagnostics = diagnostics.parse_index(diagnostics.get_index('/build/CPFBuildLog.txt.gz', found))
+
+        self.assertEqual(log_file, '/build/CPFBuildLog.txt.gz')
+        self.assertEqual(read_diagnostics, found)
+        self.assertEqual(diagnostics.format_diagnostic(found[0]), '/src/a.cpp:3:5: error: first [log offset 42]')
+
+    def test_deduplicator_drops_repeated_warnings_with_their_context(self):
+        output = io.StringIO()
+        sut = diagnostics.WarningDeduplicator(output)
+        warning = (
+            'In file included from /src/{0}.cpp:1:\n'
+            '/src/h.h:3:5: warning: unused variable \'x\' [-Wunused-variable]\n'
+            '    3 |   int x;\n'
+            '      |       ^\n')
+
+        sut.write('[1/3] Building CXX object a.cpp.o\n' + warning.format('a'))
+        sut.write('[2/3] Building CXX object b.cpp.o\n' + warning.format('b') + '/src/b.cpp:9:1: warning: other\n')
+        sut.write('[3/3] Linking CXX shared library libA.so')
+        sut.close()
+
+        self.assertEqual(output.getvalue(),
+            '[1/3] Building CXX object a.cpp.o\n' + warning.format('a') +
+            '[2/3] Building CXX object b.cpp.o\n/src/b.cpp:9:1: warning: other\n'
+            '[3/3] Linking CXX shared library libA.so')
+        self.assertEqual(sut.get_summary(), [
+            'The build printed 3 warnings, 2 of them are unique. 4 lines of repeated warnings were dropped.',
+            'The most repeated warnings:',
+            '     2x /src/h.h:3:5: warning: unused variable \'x\' [-Wunused-variable]',
+            ])
+
+    def test_deduplicator_drops_the_function_context_of_repeated_warnings_from_other_chunks(self):
+        output = io.StringIO()
+        sut = diagnostics.WarningDeduplicator(output)
+        contexts = [
+            '/src/h.h: In function \'void f()\':\n',
+            '/src/h.h: In member function \'void A::f()\':\n',
+            '/src/h.h: In instantiation of \'void g(T) [with T = int]\':\n',
+            ]
+        warning = '/src/h.h:3:5: warning: unused variable \'x\' [-Wunused-variable]\n'
+
+        sut.write(contexts[0])
+        sut.write(warning)
+        for context in contexts:
+            sut.write(context)
+            sut.write(warning)
+        sut.close()
+
+        self.assertEqual(output.getvalue(), contexts[0] + warning)
+        self.assertEqual(sut.nr_dropped_lines, 6)
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+This module parses the command line of the scripts like docopt() of the vendored docopt
+module, but keeps the parsed usage patterns of each help text in a cache file. Most of the
+time of docopt() goes into parsing the long help texts of the scripts, so a run with a
+cached pattern only has to match its arguments.
+
+The patterns are stored with marshal, which loads fast and can only create plain data.
+"""
+
+import marshal
+import os
+import sys
+import zlib
+
+from . import docopt as _docopt
+
+
+# Changes when the format of the cache files changes.
+_CACHE_FORMAT = 1
+_DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+_PARENT_PATTERNS = {cls.__name__: cls for cls in [_docopt.Required, _docopt.Optional, _docopt.AnyOptions, _docopt.OneOrMore, _docopt.Either]}
+_CHILD_PATTERNS = {cls.__name__: cls for cls in [_docopt.Argument, _docopt.Command]}
+
+
+def docopt(doc, argv=None, version=None, cache_dir=_DEFAULT_CACHE_DIR):
+    """
+    Returns the same dictionary as docopt.docopt() and exits in the same way for --help,
+    --version and invalid arguments. The parsed patterns are read from and written to the
+    cache directory. The arguments are parsed without the cache if it can not be used.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    _docopt.DocoptExit.usage = _docopt.printable_usage(doc)
+
+    cache_file = os.path.join(cache_dir, 'docopt-{0:08x}.marshal'.format(zlib.crc32(doc.encode('utf-8'))))
+    options, pattern = _read_cache_file(cache_file, doc)
+    if pattern is None:
+        options, pattern = parse_patterns(doc)
+        _write_cache_file(cache_file, doc, options, pattern)
+
+    argv = _docopt.parse_argv(_docopt.TokenStream(argv, _docopt.DocoptExit), list(options), False)
+    _docopt.extras(True, version, argv, doc)
+    matched, left, collected = pattern.match(argv)
+    if matched and left == []:
+        return _docopt.Dict((a.name, a.value) for a in (pattern.flat() + collected))
+    raise _docopt.DocoptExit()
+
+
+def parse_patterns(doc):
+    """
+    Returns the options and the usage pattern of the help text, which docopt() parses on each call.
+    """
+    options = _docopt.parse_defaults(doc)
+    pattern = _docopt.parse_pattern(_docopt.formal_usage(_docopt.printable_usage(doc)), options)
+    pattern_options = set(pattern.flat(_docopt.Option))
+    for any_options in pattern.flat(_docopt.AnyOptions):
+        any_options.children = list(set(_docopt.parse_defaults(doc)) - pattern_options)
+    return options, pattern.fix()
+
+
+def to_data(pattern):
+    """
+    Returns nested tuples that describe the pattern and can be stored with marshal.
+    """
+    if isinstance(pattern, _docopt.Option):
+        return ('Option', pattern.short, pattern.long, pattern.argcount, pattern.value)
+    if isinstance(pattern, _docopt.ChildPattern):
+        return (type(pattern).__name__, pattern.name, pattern.value)
+    return (type(pattern).__name__, tuple(to_data(child) for child in pattern.children))
+
+
+def from_data(data):
+    """
+    Returns the pattern that is described by the tuples of to_data().
+    """
+    name = data[0]
+    if name == 'Option':
+        return _docopt.Option(*data[1:])
+    if name in _CHILD_PATTERNS:
+        return _CHILD_PATTERNS[name](*data[1:])
+    return _PARENT_PATTERNS[name](*[from_data(child) for child in data[1]])
+
+
+def _read_cache_file(cache_file, doc):
+    try:
+        with open(cache_file, 'rb') as file:
+            cache_format, cached_doc, options, pattern = marshal.load(file)
+        if cache_format != _CACHE_FORMAT or cached_doc != doc:
+            return None, None
+        return [from_data(option) for option in options], from_data(pattern)
+    except (OSError, EOFError, ValueError, TypeError, KeyError, IndexError):
+        return None, None
+
+
+def _write_cache_file(cache_file, doc, options, pattern):
+    # The file is replaced atomically, because scripts that run at the same time may read it.
+    temp_file = '{0}.{1}.tmp'.format(cache_file, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(temp_file, 'wb') as file:
+            marshal.dump((_CACHE_FORMAT, doc, tuple(to_data(option) for option in options), to_data(pattern)), file)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        # The next run parses the help text again.
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
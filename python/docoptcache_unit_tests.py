@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the functions of the docoptcache module.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from . import docopt
+from . import docoptcache
+from . import startup_benchmark
+
+
+_ARGVS = [
+    [],
+    ['MyConfig'],
+    ['MyConfig', 'MyOtherConfig', '--target', 'myTarget', '--cpus', '4', '--clean'],
+    ['--config', 'Debug', '--run-tests', '--gtest-filter', 'A.*'],
+    ['MyConfig', '-DVAR=1', '-DOTHER=2', '--inherits', 'Parent'],
+    ['pipeline.json', '--cpus', '8', '--summary', 'summary.json'],
+    ['MyConfig', '--help'],
+    ]
+
+
+class TestDocoptCache(unittest.TestCase):
+    """
+    The test fixture for the docoptcache tests.
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _parse(self, parse_function, doc, argv):
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                return parse_function(doc, argv)
+        except SystemExit as exit:
+            return 'exit: {0} output: {1}'.format(exit.code, output.getvalue())
+
+    def test_cached_patterns_give_the_results_of_docopt(self):
+        for script_name in ['1_Configure.py', '2_Generate.py', '3_Make.py', '4_Pipeline.py']:
+            doc = startup_benchmark.get_script_code(script_name).split('"""')[1]
+            for argv in _ARGVS:
+                expected = self._parse(lambda doc, argv: docopt.docopt(doc, argv), doc, argv)
+
+                # The first call writes the cache file and the second one reads it.
+                for _ in range(2):
+                    result = self._parse(lambda doc, argv: docoptcache.docopt(doc, argv, cache_dir=self.temp_dir.name), doc, argv)
+                    self.assertEqual(result, expected, '{0} {1}'.format(script_name, argv))
+
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 4)
+
+    def test_invalid_cache_files_are_replaced(self):
+        doc = startup_benchmark.get_script_code('2_Generate.py').split('"""')[1]
+        docoptcache.docopt(doc, ['MyConfig'], cache_dir=self.temp_dir.name)
+        cache_file = os.path.join(self.temp_dir.name, os.listdir(self.temp_dir.name)[0])
+        with open(cache_file, 'wb') as file:
+            file.write(b'no marshal data')
+
+        result = docoptcache.docopt(doc, ['MyConfig', '--clean'], cache_dir=self.temp_dir.name)
+
+        self.assertTrue(result['--clean'])
+        self.assertEqual(os.listdir(self.temp_dir.name), [os.path.basename(cache_file)])
+        with open(cache_file, 'rb') as file:
+            self.assertNotEqual(file.read(), b'no marshal data')
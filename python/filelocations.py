@@ -22,6 +22,18 @@ class FileLocations:
         self.GENERATE_CONFIG_FILE_SCRIPT = self.cpf_cmake_dir / "Scripts/createConfigFile.cmake"
         self.GET_PACKAGE_VERSION_SCRIPT = self.cpf_cmake_dir / "Scripts/getPackageVersion.cmake"
         self.CONAN_FILE = "conanfile.py"
+        self.TEST_DURATIONS_FILE_NAME = "CPFTestDurations.json"
+        self.TEST_RESULTS_FILE_NAME = "CPFTestResults.xml"
+        self.TEST_RESULT_CACHE_DIR = "CPFTestResultCache"
+        self.BUILD_STAMPS_FILE_NAME = "CPFBuildStamps.json"
+        self.COMPILER_CACHE_DIR = "CPFCompilerCache"
+        self.BUILD_MEMORY_FILE_NAME = "CPFBuildMemory.json"
+        self.JOB_POOLS_FILE_NAME = "CPFJobPools.json"
+        self.PINNING_HISTORY_FILE_NAME = "CPFPinningThroughput.json"
+        self.RESOURCE_TIMELINE_FILE_NAME = "CPFResourceTimeline.json"
+        self.BUILD_LOG_FILE_NAME = "CPFBuildLog.txt.gz"
+        self.BUILD_PROGRESS_FILE_NAME = "CPFBuildProgress.json"
+        self.DIAGNOSTICS_INDEX_FILE_NAME = "CPFDiagnostics.json"
 
     def get_full_path_cpf_root(self):
         return self.cpf_root_dir
@@ -43,7 +55,10 @@ class FileLocations:
         return makefile_directory
 
     def get_full_path_binary_output_folder(self, configName, compilerConfig):
-        return self.get_full_path_config_makefile_folder(configName) / "BuildStage" / compilerConfig 
+        return self.get_full_path_binary_output_base_folder(configName) / compilerConfig
+
+    def get_full_path_binary_output_base_folder(self, configName):
+        return self.get_full_path_config_makefile_folder(configName) / "BuildStage"
 
     def get_config_file_ending(self):
         return ".config.cmake"
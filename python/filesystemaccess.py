@@ -1,9 +1,13 @@
 #!/usr/bin/python3
 
 import os
-import shutil
 import stat
-import platform
+import io
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None # The package is only needed for writing .zst files.
 
 
 class FileSystemAccess:
@@ -54,6 +58,8 @@ class FileSystemAccess:
         shutil.rmtree() fails when files are write
         protected on windows.
         """
+        import platform
+        import shutil
         system = platform.system()
         if system == 'Windows':
             for root, dirs, files in os.walk(str(path), topdown=False):
@@ -72,11 +78,39 @@ class FileSystemAccess:
 
     def copyfile(self, path_from, path_to):
         """Copies a file."""
+        import shutil
         shutil.copyfile(str(path_from), str(path_to))
 
 
+    def copyfile_with_metadata(self, path_from, path_to):
+        """Copies a file with its permissions and time stamps."""
+        import shutil
+        shutil.copy2(str(path_from), str(path_to))
+
+
+    def hardlink(self, path_from, path_to):
+        """
+        Creates a hard link to a file. The file is copied if the file-system
+        does not support hard links between the two paths.
+        """
+        import shutil
+        try:
+            os.link(str(path_from), str(path_to))
+        except OSError:
+            shutil.copy2(str(path_from), str(path_to))
+
+
+    def rename(self, path_from, path_to):
+        """
+        Renames a file or directory. This fails if the destination already exists
+        as a non-empty directory, which makes it usable for publishing directories atomically.
+        """
+        os.rename(str(path_from), str(path_to))
+
+
     def move(self, path_from, path_to):
         """Moves a file"""
+        import shutil
         shutil.move(str(path_from), str(path_to))
 
 
@@ -89,6 +123,7 @@ class FileSystemAccess:
         Copies the content for directory src into directory dst.
         The function overwrites existing files.
         """
+        import shutil
         dst = str(dst)
         src = str(src)
 
@@ -128,6 +163,72 @@ class FileSystemAccess:
         with open(path, 'w') as f:
             f.write(content)
 
+    def stat(self, path):
+        """Returns the os.stat() result of the path."""
+        return os.stat(str(path))
+
+    def get_file_hash(self, path):
+        """Returns the sha256 hex-digest of the content of a file."""
+        import hashlib
+        digest = hashlib.sha256()
+        with open(str(path), 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def readfile(self, path):
+        """Returns the content of a text file."""
+        with open(str(path), 'r') as f:
+            return f.read()
+
+    def writefile(self, path, content):
+        """Creates or overwrites a text file."""
+        with open(str(path), 'w') as f:
+            f.write(content)
+
+    def writefile_atomically(self, path, content):
+        """
+        Creates or overwrites a text file, so that readers either see the old or the new content.
+        The content is written to a temporary file in the same directory, which replaces the file.
+        """
+        temporary_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temporary_path, str(path))
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+    def lock_file(self, path):
+        """
+        Returns a context manager that holds an exclusive lock on the file while it is entered.
+        The file is created if it does not exist. Other processes that lock the same file wait
+        until the lock is released.
+        """
+        return _FileLock(str(path))
+
+    def open_compressed_text_file(self, path):
+        """
+        Opens a text file for writing. Files that end with .gz are compressed with gzip and
+        files that end with .zst with zstd, which needs the zstandard package.
+        """
+        path = str(path)
+        if path.endswith('.gz'):
+            import gzip
+            # The default level 9 is much slower and hardly compresses build output any better.
+            return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise Exception('Error: Writing the zstd compressed file "{0}" requires the python package zstandard. Use a .gz file instead or install the package.'.format(path))
+            return zstandard.open(path, 'wt', encoding='utf-8')
+        return open(path, 'w', encoding='utf-8')
+
+    def open_text_file_for_appending(self, path):
+        """Opens a text file for writing at its end. The file is created if it does not exist."""
+        return open(str(path), 'a', encoding='utf-8')
+
 
 class FakeFileSystemAccess():
     """
@@ -139,6 +240,7 @@ class FakeFileSystemAccess():
 
     def __init__(self):
         self.root = FakeFileSystemNode("root")
+        self.locked_files = []
 
     def exists(self, path):
         return self._get_deep_subnode_with_path(path) is not None
@@ -196,6 +298,80 @@ class FakeFileSystemAccess():
             dir_to_node.add_child(FakeFileSystemFileNode(filename_to, file_node_from.content))
         return
 
+    def copyfile_with_metadata(self, path_from, path_to):
+        self.copyfile(path_from, path_to)
+
+    def hardlink(self, path_from, path_to):
+        self.copyfile(path_from, path_to)
+
+    def rename(self, path_from, path_to):
+        node = self._get_deep_subnode_with_path(path_from)
+        if node is None:
+            raise OSError('The path "' + str(path_from) + '" given to rename() does not exist.')
+        if self.exists(path_to):
+            raise OSError('The destination "' + str(path_to) + '" given to rename() already exists.')
+        dirs_from, _ = _get_path_as_head_and_tail_list(path_from)
+        dirs_to, name_to = _get_path_as_head_and_tail_list(path_to)
+        parent_from = self._get_deep_subnode(dirs_from)
+        parent_from.children = [x for x in parent_from.children if x is not node]
+        node.name = name_to
+        self._create_directory_nodes(dirs_to).add_child(node)
+
+    def readfile(self, path):
+        file_node = self._get_deep_subnode_with_path(path)
+        if file_node is None or file_node.is_dir:
+            raise Exception('Path "' + str(path) + '" does not exist or is not a file.')
+        return file_node.content
+
+    def stat(self, path):
+        node = self._get_deep_subnode_with_path(path)
+        if node is None:
+            raise Exception('Path "' + str(path) + '" does not exist.')
+        size = 0 if node.is_dir else len(node.content)
+        return os.stat_result((0, 0, 0, 0, 0, 0, size, node.mtime, node.mtime, node.mtime))
+
+    def get_file_hash(self, path):
+        import hashlib
+        return hashlib.sha256(self.readfile(path).encode('utf-8')).hexdigest()
+
+    def touch_file(self, file_path):
+        node = self._get_deep_subnode_with_path(file_path)
+        if node is None:
+            self.addfile(file_path, '')
+            node = self._get_deep_subnode_with_path(file_path)
+        FakeFileSystemNode.clock += 1
+        node.mtime = FakeFileSystemNode.clock
+
+    def remove(self, path):
+        if not self.isfile(path):
+            raise Exception("The path \"" + str(path) + "\" given to remove() does not lead to a file.")
+        dirs, filename = _get_path_as_head_and_tail_list(path)
+        parent_node = self._get_deep_subnode(dirs)
+        parent_node.children = [x for x in parent_node.children if x.name != filename]
+
+    def writefile(self, path, content):
+        file_node = self._get_deep_subnode_with_path(path)
+        if file_node is not None and not file_node.is_dir:
+            file_node.content = content
+            FakeFileSystemNode.clock += 1
+            file_node.mtime = FakeFileSystemNode.clock
+        else:
+            self.addfile(path, content)
+
+    def writefile_atomically(self, path, content):
+        self.writefile(path, content)
+
+    def lock_file(self, path):
+        self.locked_files.append(str(path))
+        return _FakeFileLock()
+
+    def open_compressed_text_file(self, path):
+        """The content is stored uncompressed when the returned file is closed."""
+        return _FakeTextFile(self, path)
+
+    def open_text_file_for_appending(self, path):
+        return _FakeTextFile(self, path, append=True)
+
     #------------------------------------------------------------
 
     def hasfile(self, path, content):
@@ -256,14 +432,78 @@ class FakeFileSystemAccess():
 
 
 
+class _FileLock:
+    """
+    The exclusive lock of FileSystemAccess.lock_file(). It uses flock() on Linux and
+    macOS and locks the first byte of the file on Windows.
+    """
+    def __init__(self, path):
+        self.m_path = path
+        self.m_fd = None
+
+    def __enter__(self):
+        self.m_fd = os.open(self.m_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(self.m_fd, msvcrt.LK_LOCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.m_fd, fcntl.LOCK_EX)
+        except OSError:
+            os.close(self.m_fd)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Closing the file releases the lock.
+        os.close(self.m_fd)
+        self.m_fd = None
+        return False
+
+
+class _FakeFileLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class _FakeTextFile(io.StringIO):
+    """
+    An in-memory text file that is written to the FakeFileSystemAccess when it is closed.
+    With append the text is added to the end of an existing file.
+    """
+    def __init__(self, fake_fs_access, path, append=False):
+        io.StringIO.__init__(self)
+        self.m_fake_fs_access = fake_fs_access
+        self.m_path = path
+        self.m_append = append
+
+    def close(self):
+        if not self.closed:
+            content = self.getvalue()
+            if self.m_append and self.m_fake_fs_access.isfile(self.m_path):
+                content = self.m_fake_fs_access.readfile(self.m_path) + content
+            self.m_fake_fs_access.writefile(self.m_path, content)
+        io.StringIO.close(self)
+
+
 class FakeFileSystemNode:
     """
     Represents a directory in the file-system tree.
+    The mtime of the nodes is taken from a counter that is incremented
+    whenever a node is created or changed.
     """
+    clock = 0
+
     def __init__(self, name):
         self.name = name
         self.is_dir = True
         self.children = []
+        FakeFileSystemNode.clock += 1
+        self.mtime = FakeFileSystemNode.clock
 
     def add_child(self, node):
         if not self.has_child(node.name):
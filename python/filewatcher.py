@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+This module provides the FileWatcher class which uses the Linux inotify
+interface to get notified about changed files without polling.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class FileWatcher:
+    """
+    Watches the given directories and all of their sub-directories.
+    Hidden directories like .git are not watched.
+    """
+    def __init__(self, directories):
+        if platform.system() != 'Linux':
+            raise Exception('Error: Watching files is only supported on Linux.')
+
+        self.m_libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.m_fd = self.m_libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.m_fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1() failed.')
+        self.m_watched_dirs = {}
+
+        for directory in directories:
+            if os.path.isdir(str(directory)):
+                self._add_watches_recursively(str(directory))
+
+    def close(self):
+        os.close(self.m_fd)
+
+    def wait_for_changes(self, timeout=None):
+        """
+        Blocks until files changed or the timeout in seconds expired.
+        Returns the set of changed paths, which is empty if the timeout expired.
+        """
+        readable, _, _ = select.select([self.m_fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed_paths = set()
+        while True:
+            try:
+                buffer = os.read(self.m_fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            changed_paths |= self._parse_events(buffer)
+        return changed_paths
+
+    def _parse_events(self, buffer):
+        changed_paths = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            watch_descriptor, mask, _, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + name_length].rstrip(b'\0').decode('utf-8', errors='ignore')
+            offset += name_length
+
+            directory = self.m_watched_dirs.get(watch_descriptor)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name) if name else directory
+            if name.startswith('.'):
+                continue
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                self._add_watches_recursively(path)
+            changed_paths.add(path.replace('\\', '/'))
+        return changed_paths
+
+    def _add_watches_recursively(self, directory):
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            watch_descriptor = self.m_libc.inotify_add_watch(self.m_fd, root.encode('utf-8'), _WATCH_MASK)
+            if watch_descriptor >= 0:
+                self.m_watched_dirs[watch_descriptor] = root
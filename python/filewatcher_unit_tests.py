@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the FileWatcher class.
+"""
+
+import unittest
+import os
+import platform
+import tempfile
+
+from . import filewatcher
+
+
+@unittest.skipUnless(platform.system() == 'Linux', 'inotify is only available on Linux')
+class TestFileWatcher(unittest.TestCase):
+    """
+    The test fixture for the FileWatcher tests. The tests use a temporary directory
+    because the watcher gets its events from the kernel.
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name.replace('\\', '/')
+        os.makedirs(self.root + '/MyPackage/.git')
+        self.sut = filewatcher.FileWatcher([self.root])
+
+    def tearDown(self):
+        self.sut.close()
+        self.temp_dir.cleanup()
+
+    def test_wait_for_changes_returns_the_changed_files(self):
+        # setup
+        with open(self.root + '/MyPackage/file.cpp', 'w') as file:
+            file.write('content')
+
+        # execute
+        changed_paths = self.sut.wait_for_changes(1.0)
+
+        # verify
+        self.assertEqual(changed_paths, {self.root + '/MyPackage/file.cpp'})
+
+    def test_wait_for_changes_watches_new_directories_and_ignores_hidden_ones(self):
+        # setup
+        os.makedirs(self.root + '/MyPackage/NewDir')
+        self.assertEqual(self.sut.wait_for_changes(1.0), {self.root + '/MyPackage/NewDir'})
+
+        # execute
+        with open(self.root + '/MyPackage/.git/index', 'w') as file:
+            file.write('content')
+        with open(self.root + '/MyPackage/NewDir/file.cpp', 'w') as file:
+            file.write('content')
+
+        # verify
+        self.assertEqual(self.sut.wait_for_changes(1.0), {self.root + '/MyPackage/NewDir/file.cpp'})
+
+    def test_wait_for_changes_returns_an_empty_set_after_the_timeout(self):
+        self.assertEqual(self.sut.wait_for_changes(0.01), set())
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+"""
+This module contains functions for setting up separate Ninja job pools for compiling
+and linking and for reporting how well the pools were used by a build.
+"""
+
+import json
+import re
+
+from . import buildresources
+
+
+COMPILE_POOL = 'compile'
+LINK_POOL = 'link'
+# The assumed peak memory of one link job. Linking big binaries with debug information
+# needs much more memory than compiling.
+DEFAULT_LINK_JOB_MEMORY_BYTES = 4 * 1024 * 1024 * 1024
+_JOB_POOLS_CACHE_ENTRY_REGEX = re.compile(r'^CMAKE_JOB_POOLS:\w+=(.*)$', re.MULTILINE)
+_GENERATOR_CACHE_ENTRY_REGEX = re.compile(r'^CMAKE_GENERATOR:\w+=(.*)$', re.MULTILINE)
+_GENERATOR_CONFIG_REGEX = re.compile(r'CMAKE_GENERATOR\s+"([^"]+)"')
+# The build statements of a .ninja file, like: build lib$ a.so: CXX_SHARED_LIBRARY_LINKER__a_Debug a.cpp.o
+_BUILD_STATEMENT_REGEX = re.compile(r'^build ((?:[^$:\n]|\$.)*): (\S+)', re.MULTILINE)
+_OUTPUT_PATH_REGEX = re.compile(r'(?:[^$ |]|\$.)+')
+_INCLUDE_REGEX = re.compile(r'^(?:include|subninja) (\S+)$', re.MULTILINE)
+# The rules of CMake for compiling and linking, like CXX_COMPILER__a_Debug or C_EXECUTABLE_LINKER__b_.
+_RULE_POOL_REGEX = re.compile(r'_(COMPILER|LINKER)(?:__|$)')
+
+
+def get_pool_sizes(nr_cpus, total_memory, compile_job_memory, link_job_memory):
+    """
+    Returns the sizes of the compile and the link pool for the given resources. The jobs of
+    both pools run at the same time, so the link pool gets at most half of the memory and the
+    compile pool the memory that the link jobs leave. The sizes are based on the total memory,
+    so generating again on the same machine does not change them.
+    """
+    if total_memory is None:
+        return {COMPILE_POOL: nr_cpus, LINK_POOL: nr_cpus}
+    link_jobs = buildresources.get_job_count(nr_cpus, total_memory // 2, link_job_memory)
+    compile_jobs = buildresources.get_job_count(nr_cpus, max(0, total_memory - link_jobs * link_job_memory), compile_job_memory)
+    return {COMPILE_POOL: compile_jobs, LINK_POOL: link_jobs}
+
+
+def parse_pool_overrides(content):
+    """
+    Returns the pool sizes that were set with the --compile-jobs and --link-jobs options
+    from the content of the job pools file or an empty dictionary.
+    """
+    if not content:
+        return {}
+    try:
+        overrides = json.loads(content)['overrides']
+        return {pool: int(size) for pool, size in overrides.items() if pool in (COMPILE_POOL, LINK_POOL) and int(size) > 0}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def format_pool_overrides(overrides):
+    return json.dumps({'overrides': overrides}, indent=4, sort_keys=True)
+
+
+def get_definitions(pool_sizes):
+    """
+    Returns the cmake -D options that create the pools and assign the compile and link steps to them.
+    """
+    return [
+        '-DCMAKE_JOB_POOLS="{0}"'.format(format_pools(pool_sizes)),
+        '-DCMAKE_JOB_POOL_COMPILE={0}'.format(COMPILE_POOL),
+        '-DCMAKE_JOB_POOL_LINK={0}'.format(LINK_POOL),
+        ]
+
+
+def format_pools(pool_sizes):
+    return ';'.join('{0}={1}'.format(pool, pool_sizes[pool]) for pool in sorted(pool_sizes))
+
+
+def get_pools_from_cmake_cache(cmake_cache_content):
+    """
+    Returns the pool sizes from the CMAKE_JOB_POOLS entry of a CMakeCache.txt file or an empty dictionary.
+    """
+    match = _JOB_POOLS_CACHE_ENTRY_REGEX.search(cmake_cache_content)
+    if not match:
+        return {}
+    pool_sizes = {}
+    for pool in match.group(1).split(';'):
+        name, _, size = pool.partition('=')
+        if size.strip().isdigit():
+            pool_sizes[name.strip()] = int(size)
+    return pool_sizes
+
+
+def is_ninja_generator(cmake_cache_content, config_content):
+    """
+    Returns true if the cache file or, if there is none, the config file selects a Ninja generator.
+    """
+    match = None
+    if cmake_cache_content:
+        match = _GENERATOR_CACHE_ENTRY_REGEX.search(cmake_cache_content)
+    if not match and config_content:
+        match = _GENERATOR_CONFIG_REGEX.search(config_content)
+    return bool(match) and 'Ninja' in match.group(1)
+
+
+def parse_ninja_log(lines):
+    """
+    Returns the (start, end, output) tuples of a .ninja_log file. The times are milliseconds
+    since the start of the build that ran the job.
+    """
+    entries = []
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        fields = line.rstrip('\n').split('\t')
+        if len(fields) >= 4 and fields[0].isdigit() and fields[1].isdigit():
+            entries.append((int(fields[0]), int(fields[1]), fields[3]))
+    return entries
+
+
+def parse_build_rules(content):
+    """
+    Returns a dictionary that maps the outputs of the build statements of a .ninja file to
+    their rules. The outputs are unescaped, so they match the outputs in the .ninja_log file.
+    """
+    if '$\n' in content:
+        content = re.sub(r'\$\n\s*', '', content)
+    output_rules = {}
+    for match in _BUILD_STATEMENT_REGEX.finditer(content):
+        for output in _OUTPUT_PATH_REGEX.findall(match.group(1)):
+            output_rules[re.sub(r'\$(.)', r'\1', output)] = match.group(2)
+    return output_rules
+
+
+def get_included_files(content):
+    """
+    Returns the files that a .ninja file includes, like the build-<config>.ninja files of the
+    Ninja Multi-Config generator.
+    """
+    return _INCLUDE_REGEX.findall(content)
+
+
+def get_pool(rule):
+    """
+    Returns the pool of the jobs of a CMake rule or None for custom commands and other rules.
+    """
+    match = _RULE_POOL_REGEX.search(rule or '')
+    if not match:
+        return None
+    return COMPILE_POOL if match.group(1) == 'COMPILER' else LINK_POOL
+
+
+def get_utilization_report(entries, pool_sizes, output_rules):
+    """
+    Returns one line per pool with the number of jobs, the highest number of parallel jobs
+    and the utilization, which is the busy time of all jobs divided by the time that all
+    slots of the pool were available during the build. The jobs are assigned to the pools
+    by the rules of their outputs.
+    """
+    if not entries:
+        return []
+    build_duration = max(end for _, end, _ in entries) - min(start for start, _, _ in entries)
+
+    report = []
+    for pool in sorted(pool_sizes):
+        jobs = [(start, end) for start, end, output in entries if get_pool(output_rules.get(output)) == pool]
+        busy_time = sum(end - start for start, end in jobs)
+        utilization = 100.0 * busy_time / (pool_sizes[pool] * build_duration) if build_duration else 0.0
+        report.append('Job pool {0}: {1} slots, {2} jobs, at most {3} in parallel, {4:.0f}% utilization.'.format(
+            pool, pool_sizes[pool], len(jobs), _get_max_parallel_jobs(jobs), utilization))
+    return report
+
+
+def _get_max_parallel_jobs(jobs):
+    events = sorted([(start, 1) for start, _ in jobs] + [(end, -1) for _, end in jobs])
+    running = 0
+    max_running = 0
+    for _, change in events:
+        running += change
+        max_running = max(max_running, running)
+    return max_running
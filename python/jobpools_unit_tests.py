@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the functions of the jobpools module.
+"""
+
+import unittest
+
+from . import jobpools
+
+
+_GIB = 1024 * 1024 * 1024
+
+
+class TestJobPools(unittest.TestCase):
+    """
+    The test fixture for the jobpools tests.
+    """
+    def test_link_pool_is_smaller_than_the_compile_pool_when_memory_is_low(self):
+        pool_sizes = jobpools.get_pool_sizes(32, 16 * _GIB, 1 * _GIB, 4 * _GIB)
+        self.assertEqual(pool_sizes, {'compile': 8, 'link': 2})
+        self.assertEqual(
+            jobpools.get_definitions(pool_sizes),
+            ['-DCMAKE_JOB_POOLS="compile=8;link=2"', '-DCMAKE_JOB_POOL_COMPILE=compile', '-DCMAKE_JOB_POOL_LINK=link'])
+
+    def test_the_jobs_of_both_pools_fit_into_the_memory_together(self):
+        self.assertEqual(jobpools.get_pool_sizes(8, 64 * _GIB, 1 * _GIB, 4 * _GIB), {'compile': 8, 'link': 8})
+        self.assertEqual(jobpools.get_pool_sizes(8, 6 * _GIB, 1 * _GIB, 4 * _GIB), {'compile': 2, 'link': 1})
+        self.assertEqual(jobpools.get_pool_sizes(8, None, 1 * _GIB, 4 * _GIB), {'compile': 8, 'link': 8})
+
+    def test_get_pools_from_cmake_cache(self):
+        self.assertEqual(
+            jobpools.get_pools_from_cmake_cache('CMAKE_BUILD_TYPE:STRING=Debug\nCMAKE_JOB_POOLS:UNINITIALIZED=compile=16;link=4\n'),
+            {'compile': 16, 'link': 4})
+        self.assertEqual(jobpools.get_pools_from_cmake_cache('CMAKE_BUILD_TYPE:STRING=Debug\n'), {})
+
+    def test_pool_overrides_are_read_back(self):
+        content = jobpools.format_pool_overrides({'link': 1})
+
+        self.assertEqual(jobpools.parse_pool_overrides(content), {'link': 1})
+        self.assertEqual(jobpools.parse_pool_overrides(''), {})
+        self.assertEqual(jobpools.parse_pool_overrides('{"overrides": {"link": 0, "other": 3}}'), {})
+        self.assertEqual(jobpools.parse_pool_overrides('no json'), {})
+
+    def test_is_ninja_generator(self):
+        self.assertTrue(jobpools.is_ninja_generator('CMAKE_GENERATOR:INTERNAL=Ninja\n', ''))
+        self.assertFalse(jobpools.is_ninja_generator('CMAKE_GENERATOR:INTERNAL=Unix Makefiles\n', 'set( CMAKE_GENERATOR "Ninja" )'))
+        self.assertTrue(jobpools.is_ninja_generator('', 'set( CMAKE_GENERATOR "Ninja Multi-Config" CACHE STRING "" FORCE)'))
+        self.assertFalse(jobpools.is_ninja_generator('', ''))
+
+    def test_get_pool(self):
+        self.assertEqual(jobpools.get_pool('CXX_COMPILER__PackageA_unscanned_Debug'), 'compile')
+        self.assertEqual(jobpools.get_pool('CXX_SHARED_LIBRARY_LINKER__PackageA_Debug'), 'link')
+        self.assertEqual(jobpools.get_pool('C_EXECUTABLE_LINKER__PackageA_tests_'), 'link')
+        self.assertIsNone(jobpools.get_pool('CUSTOM_COMMAND'))
+        self.assertIsNone(jobpools.get_pool(None))
+
+    def test_parse_build_rules(self):
+        content = (
+            'include CMakeFiles/rules.ninja\n'
+            'build PackageA/CMakeFiles/PackageA.dir/a$ b.cpp.o: CXX_COMPILER__PackageA_Debug /src/a$ b.cpp || cmake_object_order_depends_target_PackageA\n'
+            'build BuildStage/Debug/libPackageA.so.1.0.0 BuildStage/Debug/libPackageA.so | BuildStage/Debug/libPackageA.so.1: $\n'
+            '    CXX_SHARED_LIBRARY_LINKER__PackageA_Debug PackageA/CMakeFiles/PackageA.dir/a$ b.cpp.o\n'
+            'build PackageA/doc$:index.html: CUSTOM_COMMAND /src/doc.txt\n'
+            'build all: phony BuildStage/Debug/libPackageA.so\n')
+
+        self.assertEqual(jobpools.parse_build_rules(content), {
+            'PackageA/CMakeFiles/PackageA.dir/a b.cpp.o': 'CXX_COMPILER__PackageA_Debug',
+            'BuildStage/Debug/libPackageA.so.1.0.0': 'CXX_SHARED_LIBRARY_LINKER__PackageA_Debug',
+            'BuildStage/Debug/libPackageA.so': 'CXX_SHARED_LIBRARY_LINKER__PackageA_Debug',
+            'BuildStage/Debug/libPackageA.so.1': 'CXX_SHARED_LIBRARY_LINKER__PackageA_Debug',
+            'PackageA/doc:index.html': 'CUSTOM_COMMAND',
+            'all': 'phony',
+            })
+        self.assertEqual(jobpools.get_included_files(content), ['CMakeFiles/rules.ninja'])
+
+    def test_get_utilization_report(self):
+        # setup
+        log_lines = [
+            '# ninja log v5',
+            '0\t1000\t0\tPackageA/a.cpp.o\t1234',
+            '0\t1000\t0\tPackageA/b.cpp.o\t1235',
+            '1000\t2000\t0\tlibPackageA.so\t1236',
+            ]
+        output_rules = {
+            'PackageA/a.cpp.o': 'CXX_COMPILER__PackageA_Debug',
+            'PackageA/b.cpp.o': 'CXX_COMPILER__PackageA_Debug',
+            'libPackageA.so': 'CXX_SHARED_LIBRARY_LINKER__PackageA_Debug',
+            }
+
+        # execute
+        report = jobpools.get_utilization_report(jobpools.parse_ninja_log(log_lines), {'compile': 2, 'link': 2}, output_rules)
+
+        # verify
+        self.assertEqual(report, [
+            'Job pool compile: 2 slots, 2 jobs, at most 2 in parallel, 50% utilization.',
+            'Job pool link: 2 slots, 1 jobs, at most 1 in parallel, 25% utilization.',
+            ])
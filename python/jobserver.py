@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+"""
+This module provides the JobServer class which hands out build job slots to
+GNU make and Ninja through a named pipe, and the MemoryThrottle which reduces
+the number of slots while the machine runs out of memory.
+"""
+
+import os
+import re
+import select
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # Not available on Windows.
+
+from . import buildresources
+
+
+_TOKEN = b'+'
+_VERSION_REGEX = re.compile(r'(\d+)\.(\d+)')
+_MAKEFLAGS_FIFO_REGEX = re.compile(r'--jobserver-auth=fifo:(\S+)')
+_MAKEFLAGS_JOBS_REGEX = re.compile(r'(?:^|\s)-j(\d+)')
+# The first versions that can use a jobserver that is given as fifo:<path>.
+_MIN_NINJA_VERSION = (1, 13)
+_MIN_MAKE_VERSION = (4, 4)
+
+
+class JobServer:
+    """
+    A jobserver in the fifo style of GNU make 4.4. Each client has one implicit slot
+    and must read a token from the pipe before starting an additional job. The tokens
+    are written back when the jobs are finished.
+
+    Without a directory the jobserver is private to one build. With a directory the pipe
+    in it is shared by all processes that use the same directory. The first process creates
+    the pipe with one token per job, and each process holds one token for the implicit slot
+    of its build tool, so all builds together never run more than nr_jobs jobs. The processes
+    hold a shared lock on a file in the directory and the last one removes the pipe.
+    """
+    def __init__(self, nr_jobs, directory=None):
+        self.nr_jobs = nr_jobs
+        self.m_withheld_tokens = []
+        self.m_slot_token = None
+        self.m_lock_fd = None
+        if directory is None:
+            import tempfile
+            self.m_directory = tempfile.mkdtemp(prefix='CPFJobServer')
+            self.m_fifo = os.path.join(self.m_directory, 'fifo')
+            os.mkfifo(self.m_fifo, 0o600)
+            # Opening for reading and writing does not block and keeps the pipe alive without clients.
+            self.m_fd = os.open(self.m_fifo, os.O_RDWR | os.O_NONBLOCK)
+            os.write(self.m_fd, _TOKEN * (nr_jobs - 1))
+        else:
+            self.m_directory = directory
+            self.m_fifo = os.path.join(directory, 'fifo')
+            self._join_shared_fifo()
+
+    def _join_shared_fifo(self):
+        """
+        Creates the shared pipe or opens the one of the other builds. The setup lock serializes
+        joining and leaving. The users lock is held shared while the pipe is in use, so getting
+        it exclusively means that there are no other users.
+        """
+        os.makedirs(self.m_directory, mode=0o700, exist_ok=True)
+        setup_lock_fd = os.open(os.path.join(self.m_directory, 'setup.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+        self.m_lock_fd = os.open(os.path.join(self.m_directory, 'users.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+        size_file = os.path.join(self.m_directory, 'size')
+        try:
+            fcntl.flock(setup_lock_fd, fcntl.LOCK_EX)
+            if _try_exclusive_lock(self.m_lock_fd):
+                # A pipe of crashed builds may have lost tokens, so it is always created anew.
+                if os.path.exists(self.m_fifo):
+                    os.remove(self.m_fifo)
+                os.mkfifo(self.m_fifo, 0o600)
+                self.m_fd = os.open(self.m_fifo, os.O_RDWR | os.O_NONBLOCK)
+                os.write(self.m_fd, _TOKEN * self.nr_jobs)
+                with open(size_file, 'w') as file:
+                    file.write(str(self.nr_jobs))
+            else:
+                self.m_fd = os.open(self.m_fifo, os.O_RDWR | os.O_NONBLOCK)
+                with open(size_file, 'r') as file:
+                    self.nr_jobs = int(file.read())
+            fcntl.flock(self.m_lock_fd, fcntl.LOCK_SH)
+        finally:
+            os.close(setup_lock_fd)
+
+    def acquire_slot(self, timeout=None):
+        """
+        Takes the token for the implicit slot of the build tool from a shared jobserver.
+        Returns false if no token became free within the timeout.
+        """
+        while self.m_lock_fd is not None and self.m_slot_token is None:
+            try:
+                self.m_slot_token = os.read(self.m_fd, 1) or None
+            except BlockingIOError:
+                readable, _, _ = select.select([self.m_fd], [], [], timeout)
+                if not readable:
+                    return False
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.m_slot_token:
+            os.write(self.m_fd, self.m_slot_token)
+        if self.m_lock_fd is None:
+            os.close(self.m_fd)
+            shutil.rmtree(self.m_directory, ignore_errors=True)
+            return
+
+        setup_lock_fd = os.open(os.path.join(self.m_directory, 'setup.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(setup_lock_fd, fcntl.LOCK_EX)
+            if _try_exclusive_lock(self.m_lock_fd):
+                os.remove(self.m_fifo) # This was the last build that used the pipe.
+        finally:
+            os.close(self.m_fd)
+            os.close(self.m_lock_fd)
+            os.close(setup_lock_fd)
+
+    def get_environment(self, environment):
+        """
+        Returns the environment with the MAKEFLAGS that make the clients use this jobserver.
+        """
+        environment = dict(environment)
+        environment['MAKEFLAGS'] = '-j{0} --jobserver-auth=fifo:{1}'.format(self.nr_jobs, self.m_fifo)
+        return environment
+
+    def withhold_token(self):
+        """
+        Takes a token that was returned by a finished job out of the pipe.
+        Returns false if no token is available at the moment.
+        """
+        try:
+            token = os.read(self.m_fd, 1)
+        except BlockingIOError:
+            return False
+        if not token:
+            return False
+        self.m_withheld_tokens.append(token)
+        return True
+
+    def release_token(self):
+        """
+        Returns a withheld token to the pipe.
+        """
+        if self.m_withheld_tokens:
+            os.write(self.m_fd, self.m_withheld_tokens.pop())
+
+    def nr_withheld_tokens(self):
+        return len(self.m_withheld_tokens)
+
+
+class MemoryThrottle(threading.Thread):
+    """
+    Withholds one jobserver token whenever a job finishes while the available memory is less
+    than the memory of one job, and gives them back when the memory of two jobs is available.
+    """
+    def __init__(self, job_server, job_memory, get_available_memory=buildresources.get_available_memory, interval=0.5):
+        threading.Thread.__init__(self, daemon=True)
+        self.m_job_server = job_server
+        self.m_job_memory = job_memory
+        self.m_get_available_memory = get_available_memory
+        self.m_interval = interval
+        self.m_stop_event = threading.Event()
+        self.min_nr_jobs = job_server.nr_jobs
+
+    def stop(self):
+        self.m_stop_event.set()
+        self.join()
+        while self.m_job_server.nr_withheld_tokens():
+            self.m_job_server.release_token()
+
+    def run(self):
+        while not self.m_stop_event.wait(self.m_interval):
+            self.check_memory()
+
+    def check_memory(self):
+        available_memory = self.m_get_available_memory()
+        if available_memory is None:
+            return
+        if available_memory < self.m_job_memory:
+            # One implicit slot always remains, so the build can not stall.
+            if self.m_job_server.nr_withheld_tokens() < self.m_job_server.nr_jobs - 1:
+                self.m_job_server.withhold_token()
+        elif available_memory > 2 * self.m_job_memory:
+            self.m_job_server.release_token()
+        self.min_nr_jobs = min(self.min_nr_jobs, self.m_job_server.nr_jobs - self.m_job_server.nr_withheld_tokens())
+
+
+########### free functions #########################################################################
+def _try_exclusive_lock(fd):
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def get_shared_directory():
+    """
+    Returns the directory of the jobserver that is shared by all builds of the current user.
+    """
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), 'CPFJobServer-{0}'.format(os.getuid()))
+
+
+def get_inherited_jobserver(makeflags):
+    """
+    Returns the number of jobs of the fifo jobserver in the MAKEFLAGS of a parent build
+    or None if there is none.
+    """
+    if not _MAKEFLAGS_FIFO_REGEX.search(makeflags):
+        return None
+    jobs_match = _MAKEFLAGS_JOBS_REGEX.search(makeflags)
+    return int(jobs_match.group(1)) if jobs_match else 0
+
+
+def is_supported_client(make_program, version_output):
+    """
+    Returns true if the build tool with the given --version output can use a fifo jobserver.
+    """
+    name = os.path.basename(make_program.replace('\\', '/')).lower()
+    text = '\n'.join(version_output)
+    match = _VERSION_REGEX.search(text)
+    if not match:
+        return False
+    version = (int(match.group(1)), int(match.group(2)))
+    if name.startswith('ninja'):
+        return version >= _MIN_NINJA_VERSION
+    if name in ('make', 'gmake') and 'GNU Make' in text:
+        return version >= _MIN_MAKE_VERSION
+    return False
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the JobServer and MemoryThrottle classes.
+"""
+
+import unittest
+import os
+import platform
+import tempfile
+
+from . import jobserver
+
+
+@unittest.skipUnless(platform.system() == 'Linux', 'The fifo jobserver is only used on Linux')
+class TestJobServer(unittest.TestCase):
+    """
+    The test fixture for the jobserver tests. The tests read the tokens like
+    a client that got the MAKEFLAGS from the environment.
+    """
+    def setUp(self):
+        self.sut = jobserver.JobServer(4)
+        makeflags = self.sut.get_environment({})['MAKEFLAGS']
+        self.assertTrue(makeflags.startswith('-j4 --jobserver-auth=fifo:'))
+        self.client_fd = os.open(makeflags.split('fifo:')[1], os.O_RDONLY | os.O_NONBLOCK)
+
+    def tearDown(self):
+        os.close(self.client_fd)
+        self.sut.close()
+
+    def _read_tokens(self):
+        try:
+            return os.read(self.client_fd, 100)
+        except BlockingIOError:
+            return b''
+
+    def test_jobserver_provides_one_token_less_than_jobs(self):
+        self.assertEqual(self._read_tokens(), b'+++', 'The client has one implicit job slot')
+
+    def test_throttle_withholds_tokens_while_memory_is_low(self):
+        # setup
+        available_memory = [100]
+        throttle = jobserver.MemoryThrottle(self.sut, 200, lambda: available_memory[0])
+
+        # execute
+        for _ in range(5):
+            throttle.check_memory()
+
+        # verify
+        self.assertEqual(self._read_tokens(), b'', 'All tokens are withheld, only the implicit slot is left')
+        self.assertEqual(throttle.min_nr_jobs, 1)
+
+        available_memory[0] = 1000
+        throttle.check_memory()
+        self.assertEqual(self._read_tokens(), b'+')
+
+        throttle.start()
+        throttle.stop()
+        self.assertEqual(self._read_tokens(), b'++', 'Stopping the throttle returns all tokens')
+
+
+@unittest.skipUnless(platform.system() == 'Linux', 'The fifo jobserver is only used on Linux')
+class TestSharedJobServer(unittest.TestCase):
+    """
+    The test fixture for a jobserver that is shared by multiple builds.
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_dir.name, 'CPFJobServer')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_builds_share_the_job_slots(self):
+        # execute
+        first = jobserver.JobServer(3, self.directory)
+        second = jobserver.JobServer(8, self.directory)
+
+        # verify
+        self.assertEqual(second.nr_jobs, 3, 'The size of the existing jobserver is used')
+        self.assertTrue(first.acquire_slot(timeout=0))
+        self.assertTrue(second.acquire_slot(timeout=0))
+        self.assertTrue(second.withhold_token())
+        self.assertFalse(first.withhold_token(), 'Both slots and one job of the second build use all three tokens')
+        third = jobserver.JobServer(3, self.directory)
+        self.assertFalse(third.acquire_slot(timeout=0), 'A third build has to wait for a free slot')
+        third.close()
+
+        second.release_token()
+        second.close()
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'fifo')))
+        first.close()
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'fifo')), 'The last build removes the pipe')
+
+
+class TestJobServerFunctions(unittest.TestCase):
+    """
+    Tests for the free functions of the jobserver module.
+    """
+    def test_is_supported_client(self):
+        self.assertTrue(jobserver.is_supported_client('/usr/bin/ninja', ['1.13.0']))
+        self.assertFalse(jobserver.is_supported_client('/usr/bin/ninja', ['1.11.1']))
+        self.assertTrue(jobserver.is_supported_client('/usr/bin/make', ['GNU Make 4.4.1', 'Built for x86_64-pc-linux-gnu']))
+        self.assertFalse(jobserver.is_supported_client('/usr/bin/make', ['GNU Make 4.3']))
+        self.assertFalse(jobserver.is_supported_client('C:/Program Files/MSBuild.exe', ['MSBuild version 17.8.3']))
+
+    def test_get_inherited_jobserver(self):
+        self.assertEqual(jobserver.get_inherited_jobserver(' -j8 --jobserver-auth=fifo:/tmp/GMfifo1234'), 8)
+        self.assertIsNone(jobserver.get_inherited_jobserver(' -j8 --jobserver-auth=3,4'), 'Only fifo jobservers are supported')
+        self.assertIsNone(jobserver.get_inherited_jobserver(''))
@@ -1,12 +1,12 @@
 ﻿#!/usr/bin/python3
 
 import subprocess
-import platform
 import os
-import multiprocessing
-import locale
+import sys
+import threading
+import time
+import io
 
-from . import filesystemaccess
 from enum import Enum
 
 ############################################################################
@@ -40,19 +40,35 @@ class MiscOsAccess:
     Wraps some miscellaneous functions that access the functionality of the operating system.
     This allows replacing the calls to these functions in tests.
     """
-
-    def execute_command(self, command, cwd=None, print_command=True):
+    def __init__(self):
+        from . import buildevents
+        # The processes that are currently started by execute_command_output()
+        self.m_running_processes = set()
+        self.m_running_processes_lock = threading.Lock()
+        # Receives the start and exit events of the executed commands.
+        self.m_event_sink = buildevents.EventSink()
+        # Holds the peak memory of the last command that was executed by each thread.
+        self.m_thread_state = threading.local()
+
+    def set_event_sink(self, event_sink):
+        self.m_event_sink = event_sink
+
+    def execute_command(self, command, cwd=None, print_command=True, env=None, output=None, line_handlers=None):
         """
         Executes the command and prints the result. Returns true if the errorcode was 0.
         Use this version when you do not need the output string and only run one command
         in parallel.
+
+        The output of the command and the error message are written to the given text
+        stream instead of the console. The line handlers are called with each output line.
         """
         try:
-            self.execute_command_output(command, cwd=cwd, print_output=OutputMode.ALWAYS, print_command=print_command)
+            # The output is not stored or split into lines, because nobody needs them.
+            self._execute_command_reader(command, cwd, OutputMode.ALWAYS, print_command, env, output, line_handlers, keep_text=False)
             return True
 
         except CalledProcessError as err:
-            print(str(err))
+            print(str(err), file=output if output else sys.stdout)
             return False
 
 
@@ -68,6 +84,14 @@ class MiscOsAccess:
         The function currently only uses utf-8 encoded output strings. Other variants caused errors
         when calling python scripts that also call this function.
         """
+        return self._execute_command_reader(command, cwd, print_output, print_command, env).get_lines()
+
+
+    def _execute_command_reader(self, command, cwd, print_output, print_command, env, output=None, line_handlers=None, keep_text=True):
+        """
+        Executes the command and returns the OutputReader that holds its output.
+        """
+        from . import outputreader
         if cwd:
             working_dir = str(cwd)
         else:
@@ -77,33 +101,56 @@ class MiscOsAccess:
         if print_command:
             print(printed_command)
 
-        stdoutstrings = []
         # The shell=True argument makes sure we can call commands in one string on linux
         # The pipes are required to enable us polling output while it is produced.
         # We need to pipe raw bite-streams here instead of using the encoding argument
-        # because of the troubles that are described below.
+        # because the OutputReader does the decoding.
+        self.m_thread_state.peak_rss = None
+        start_time = time.perf_counter()
         with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1, cwd=working_dir, shell=True, env=env) as p:
-        #with subprocess.Popen(command, bufsize=1, cwd=working_dir, shell=True ) as p:
-            # poll output as it comes in
-            for line in p.stdout:
-                # Decoding with utf8 will throw exceptions if ignore is not set.
-                # Forcing this will remove characters like german umlaute from the output.
-                # This was the only codec I could find that worked when doing nested calls of the function
-                # by calling another python script that uses it.
-                lineString = line.decode('utf-8', errors="ignore").rstrip()
-                if print_output == OutputMode.ALWAYS:
-                    print(lineString)
-                stdoutstrings.append(lineString)
-
-        
+            self.m_event_sink.process_started(p.pid, command)
+            with self.m_running_processes_lock:
+                self.m_running_processes.add(p)
+            try:
+                reader = outputreader.OutputReader(
+                    p.stdout,
+                    output=(output if output else sys.stdout) if print_output == OutputMode.ALWAYS else None,
+                    keep_text=keep_text)
+                for handler in line_handlers or []:
+                    reader.add_line_handler(handler)
+                reader.read_all()
+                self.m_thread_state.peak_rss = self._wait_for_process(p)
+            finally:
+                with self.m_running_processes_lock:
+                    self.m_running_processes.discard(p)
+        self.m_event_sink.process_exited(p.pid, p.returncode, time.perf_counter() - start_time, reader.nr_lines)
+
         if p.returncode != 0:
+            stdout = '\n'.join(reader.get_lines())
             # print output in any case if an error occurred
             if print_output == OutputMode.ON_ERROR:
-                print('\n'.join(stdoutstrings))
+                print(stdout)
 
-            raise CalledProcessError(p.returncode, command, '\n'.join(stdoutstrings), working_dir)
+            raise CalledProcessError(p.returncode, command, stdout, working_dir)
 
-        return stdoutstrings
+        return reader
+
+    def _wait_for_process(self, process):
+        """
+        Waits for the process and returns the peak memory in bytes of the biggest process of its
+        process tree or None if the platform does not report it.
+        """
+        from . import buildresources
+        if not hasattr(os, 'wait4'):
+            process.wait()
+            return None
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            process.wait() # The process was already reaped when it was terminated.
+            return None
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        return buildresources.get_peak_rss(rusage)
 
 
     def execute_commands_in_parallel(self, commands, cwd=None, printOutput=True):
@@ -111,32 +158,58 @@ class MiscOsAccess:
         Executes multiple command-line commands in parallel.
         The commands should be given in one string, like it would be typed into the command line.
         The return code, standard output and error output can be retrieved from the returned list of dictionaries.
+        The start and exit of each process are reported to the event sink like those of execute_command().
         """
 
         # Start one process for each command
-        processes = [[subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd), cmd] for cmd in commands]
-
-        # Wait for the porcesses to finish and collect the results
-        results = []
-        for process in processes:
-
-            # wait for process to finish and get output
-            out, err = process[0].communicate()
-
-            output = self._get_printed_command(process[1], cwd=cwd)
-            output += out.decode("utf-8")
-            err_output = err.decode("utf-8")
-            ret_code = process[0].returncode
-
+        processes = []
+        start_times = []
+        for cmd in commands:
+            start_times.append(time.perf_counter())
+            processes.append(subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd))
+            self.m_event_sink.process_started(processes[-1].pid, cmd)
+
+        # The pipes of all processes are drained at the same time by one thread per process.
+        # Reading them one after another would block the later processes when their pipes are full.
+        results = [None] * len(processes)
+        print_lock = threading.Lock()
+
+        def wait_for_process(index):
+            out, err = processes[index].communicate()
+            output = self._get_printed_command(commands[index], cwd=cwd)
+            output += out.decode("utf-8", errors="ignore")
+            err_output = err.decode("utf-8", errors="ignore")
+            process = processes[index]
+            nr_output_lines = len(out.splitlines()) + len(err.splitlines())
+            self.m_event_sink.process_exited(process.pid, process.returncode, time.perf_counter() - start_times[index], nr_output_lines)
             if printOutput:
-                print(output)
-                print(err_output)
+                with print_lock:
+                    print(output)
+                    print(err_output)
+            results[index] = {'returncode':processes[index].returncode, 'stdout':output, 'stderr':err_output}
 
-            results.append({'returncode':ret_code, 'stdout':output, 'stderr':err_output})
+        threads = [threading.Thread(target=wait_for_process, args=(index,), daemon=True) for index in range(len(processes))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
         return results
 
 
+    def terminate_running_commands(self):
+        """
+        Kills the process trees of all commands that are currently executed by
+        execute_command_output() in other threads. The interrupted calls will
+        throw a CalledProcessError.
+        """
+        from . import processtree
+        with self.m_running_processes_lock:
+            processes = list(self.m_running_processes)
+        for process in processes:
+            processtree.terminate_process_tree(process.pid)
+
+
     def _remove_line_separators(self, stringlist):
         new_list = []
         for string in stringlist:
@@ -158,16 +231,72 @@ class MiscOsAccess:
     def print_console(self, string):
         print(string)
 
+    def console_stream(self):
+        """Returns the text stream of the console for output that is not printed line by line."""
+        return sys.stdout
+
     def chdir(self, path):
         """Change the current directory"""
         os.chdir(path)
 
     def system(self):
         """Return the name of the platform (Linux or Windows in our case)"""
+        import platform
         return platform.system()
 
-    def cpu_count(self):
-        return multiprocessing.cpu_count()
+    def cpu_count(self, physical_cores_only=False):
+        """
+        Returns the number of cpus that the process can use with respect to its cpu affinity
+        and cgroup cpu quota. Hyper-threading siblings count as one cpu if physical_cores_only is set.
+        """
+        from . import buildresources
+        return buildresources.get_cpu_count(physical_cores_only)
+
+    def running_process_ids(self):
+        """Returns the ids of the processes that are currently started by execute_command_output()."""
+        with self.m_running_processes_lock:
+            return [process.pid for process in self.m_running_processes]
+
+    def numa_nodes(self):
+        """Returns a dictionary with the cpus that the process may use on each NUMA node."""
+        from . import buildresources
+        return buildresources.get_numa_nodes()
+
+    def available_memory(self):
+        """Returns the bytes of memory that can be used without swapping or None if unknown."""
+        from . import buildresources
+        return buildresources.get_available_memory()
+
+    def total_memory(self):
+        """Returns the bytes of the physical memory or of the memory limit of the process or None if unknown."""
+        from . import buildresources
+        return buildresources.get_total_memory()
+
+    def peak_child_rss(self):
+        """
+        Returns the peak memory in bytes of the biggest process of the last command that was
+        executed by the current thread or None if unknown. Commands of other threads and
+        earlier commands are not included.
+        """
+        return getattr(self.m_thread_state, 'peak_rss', None)
+
+    def environment(self):
+        """Returns a copy of the environment variables of the current process."""
+        return dict(os.environ)
+
+    def which(self, executable):
+        """Returns the full path of an executable in the PATH or None."""
+        import shutil
+        return shutil.which(executable)
+
+    def open_socket_stream(self, host, port):
+        """Connects to a tcp server and returns a text stream for writing to it."""
+        import socket # Only needed for the --events option.
+        connection = socket.create_connection((host, port))
+        stream = connection.makefile('w', encoding='utf-8')
+        # The connection stays open until the stream is closed.
+        connection.close()
+        return stream
 
 
 
@@ -178,6 +307,7 @@ class FakeMiscOsAccess(MiscOsAccess):
         current_dir is the currentDirectory before any calls to chdir() are made.
         system (linux of windows)
         """
+        MiscOsAccess.__init__(self)
         self.fake_file_system = fakeFileSystemAccess  # Needed to check if chdir does anything.
         self.current_dir = current_dir
         self.env_vars = environmentVariables
@@ -185,28 +315,58 @@ class FakeMiscOsAccess(MiscOsAccess):
         self.console_output = "" # This will contain a concatenation of printed strings separated by \n
         self.m_system = system
         self.m_cpu_count = cpu_count
+        self.m_physical_cpu_count = cpu_count
         self.execute_commands_in_parallel_args = []
         self.execute_commands_in_parallel_results = []
-
-
-    def execute_command(self, command, cwd=None, print_command=True):
+        self.execute_command_output_args = []
+        # A function (command, cwd, env) that returns the output lines or throws a CalledProcessError.
+        self.execute_command_output_function = None
+        self.terminate_running_commands_calls = 0
+        self.executables = {} # The executables that are found by which()
+        self.execute_command_envs = []
+        self.m_available_memory = None
+        self.m_total_memory = None
+        self.m_numa_nodes = {}
+        self.m_peak_child_rss = None
+        self.m_running_process_ids = []
+        self.socket_streams = {} # The streams of open_socket_stream() by (host, port)
+
+
+    def execute_command(self, command, cwd=None, print_command=True, env=None, output=None, line_handlers=None):
         self.print_console(self._get_printed_command(command))
         if cwd:
             self.current_dir = cwd
         self.execute_command_arg.append( [self.current_dir, command])
+        self.execute_command_envs.append(env)
         return True
 
 
-    def execute_commands_in_parallel(self, commands, pwd=None, printOutput=True):
+    def execute_command_output(self, command, cwd=None, print_output=OutputMode.ALWAYS, print_command=False, env=None):
+        self.execute_command_output_args.append([cwd, command, env])
+        if self.execute_command_output_function:
+            return self.execute_command_output_function(command, cwd, env)
+        return []
+
+    def terminate_running_commands(self):
+        self.terminate_running_commands_calls += 1
+
+    def execute_commands_in_parallel(self, commands, cwd=None, printOutput=True):
         self.execute_commands_in_parallel_args.append([self.current_dir,commands])
-        for command in commands:
+        results = self.execute_commands_in_parallel_results[len(self.execute_commands_in_parallel_args)-1]
+        for index, command in enumerate(commands):
             if printOutput:
                 self.print_console(self._get_printed_command(command))
-        return self.execute_commands_in_parallel_results[len(self.execute_commands_in_parallel_args)-1]
+            # The fake processes get the pids 1, 2, ... of their position in the call.
+            self.m_event_sink.process_started(index + 1, command)
+            self.m_event_sink.process_exited(index + 1, results[index]['returncode'], 0.0, 0)
+        return results
 
     def print_console(self, string):
         self.console_output = self.console_output + string + "\n"
 
+    def console_stream(self):
+        return _FakeConsoleStream(self)
+
     def chdir(self, path):
         if self.fake_file_system.isdir(path):
             self.current_dir = path
@@ -221,12 +381,63 @@ class FakeMiscOsAccess(MiscOsAccess):
     def system(self):
         return self.m_system
 
-    def cpu_count(self):
+    def cpu_count(self, physical_cores_only=False):
+        if physical_cores_only:
+            return self.m_physical_cpu_count
         return self.m_cpu_count
 
+    def running_process_ids(self):
+        return self.m_running_process_ids
+
+    def numa_nodes(self):
+        return self.m_numa_nodes
+
+    def available_memory(self):
+        return self.m_available_memory
+
+    def total_memory(self):
+        return self.m_total_memory
+
+    def peak_child_rss(self):
+        return self.m_peak_child_rss
+
+    def environment(self):
+        return dict(self.env_vars)
+
+    def which(self, executable):
+        return self.executables.get(executable)
+
+    def open_socket_stream(self, host, port):
+        stream = _FakeSocketStream()
+        self.socket_streams[(host, port)] = stream
+        return stream
+
     def _is_relative_path(self, path):
         if self.m_system == "Windows":
             return ":" in path
         elif self.m_system == "Linux":
             return path[0] != "/"
         assert False
+
+
+class _FakeConsoleStream:
+    """A console stream that appends the written text to the console_output of the FakeMiscOsAccess."""
+    def __init__(self, fake_os_access):
+        self.m_fake_os_access = fake_os_access
+
+    def write(self, text):
+        self.m_fake_os_access.console_output += text
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class _FakeSocketStream(io.StringIO):
+    """A socket stream whose written text can still be read after it was closed."""
+    def close(self):
+        if not self.closed:
+            self.text = self.getvalue()
+        io.StringIO.close(self)
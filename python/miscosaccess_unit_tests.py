@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the MiscOsAccess class that run real processes.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+from . import buildresult
+from . import miscosaccess
+
+
+# Prints more than fits into a pipe, creates or waits for a signal file and exits with 0
+# if the signal file exists.
+_SCRIPT = """
+import os
+import sys
+import time
+
+sys.stdout.write('x' * 200000)
+sys.stdout.flush()
+signal_file = sys.argv[2]
+if sys.argv[1] == 'signal':
+    open(signal_file, 'w').close()
+start_time = time.time()
+while not os.path.exists(signal_file) and time.time() - start_time < 10:
+    time.sleep(0.01)
+sys.exit(0 if os.path.exists(signal_file) else 1)
+"""
+
+
+class TestMiscOsAccess(unittest.TestCase):
+    """
+    The test fixture for the MiscOsAccess tests.
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script = os.path.join(self.temp_dir.name, 'script.py')
+        with open(self.script, 'w') as file:
+            file.write(_SCRIPT)
+        self.sut = miscosaccess.MiscOsAccess()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_commands_in_parallel_run_at_the_same_time(self):
+        # The first command can only finish after the second one created the signal file.
+        # This fails when the output of the second command is not read before the first one ended.
+        signal_file = os.path.join(self.temp_dir.name, 'signal')
+        commands = ['"{0}" "{1}" {2} "{3}"'.format(sys.executable, self.script, mode, signal_file) for mode in ['wait', 'signal']]
+
+        results = self.sut.execute_commands_in_parallel(commands, printOutput=False)
+
+        self.assertEqual([result['returncode'] for result in results], [0, 0])
+        self.assertTrue(all(result['stdout'].endswith('x' * 200000) for result in results))
+
+    def test_commands_in_parallel_are_recorded_in_the_result(self):
+        recorder = buildresult.ResultRecorder()
+        self.sut.set_event_sink(recorder)
+        commands = ['"{0}" -c "print(1)"'.format(sys.executable), '"{0}" -c "import sys; print(2); sys.exit(3)"'.format(sys.executable)]
+
+        self.sut.execute_commands_in_parallel(commands, printOutput=False)
+
+        recorded = sorted(recorder.result.commands, key=lambda command: command['return_code'])
+        self.assertEqual([(command['command'], command['return_code'], command['output_lines']) for command in recorded], [
+            (commands[0], 0, 1),
+            (commands[1], 3, 1),
+            ])
+        self.assertTrue(all(command['seconds'] >= 0 for command in recorded))
+
+    @unittest.skipUnless(hasattr(os, 'wait4'), 'The platform does not report the memory of child processes.')
+    def test_peak_child_rss_is_the_peak_memory_of_the_last_command(self):
+        mib = 1024 * 1024
+        # The shell runs python as a grandchild, so the memory of the descendants must be included.
+        big_command = '"{0}" -c "data = b\'x\' * (200 * 1024 * 1024)"'.format(sys.executable)
+        small_command = '"{0}" -c "pass"'.format(sys.executable)
+
+        self.assertTrue(self.sut.execute_command(big_command, print_command=False, output=io.StringIO()))
+        big_peak = self.sut.peak_child_rss()
+        self.assertTrue(self.sut.execute_command(small_command, print_command=False, output=io.StringIO()))
+        small_peak = self.sut.peak_child_rss()
+
+        self.assertGreater(big_peak, 200 * mib)
+        self.assertLess(small_peak, 100 * mib)
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+This module provides the OutputReader class which passes the output of a subprocess
+on to the console without making the subprocess wait for a full pipe.
+"""
+
+import codecs
+import io
+
+
+# The maximum number of bytes that are read, decoded and written at once.
+_CHUNK_SIZE = 64 * 1024
+
+
+class OutputReader:
+    """
+    Reads the output of a process in chunks of the bytes that are available in the pipe,
+    decodes them with an incremental utf-8 decoder and writes each chunk with one call.
+    Verbose builds produce many lines per chunk, so this is much faster than handling
+    the output line by line, while a slowly written output still appears immediately.
+
+    Windows line endings are translated to \\n. The output is only split into lines when
+    line handlers are added or when get_lines() is called. Without keep_text the output
+    is not stored, which saves the memory for the millions of lines of verbose builds.
+    """
+    def __init__(self, stream, output=None, chunk_size=_CHUNK_SIZE, keep_text=True):
+        self.m_stream = stream
+        self.m_output = output
+        self.m_chunk_size = chunk_size
+        self.m_keep_text = keep_text
+        # Characters that are not valid utf-8 are dropped. Other codecs caused errors
+        # in nested calls of python scripts that use this class.
+        self.m_decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(errors='ignore'), translate=True)
+        self.m_chunks = []
+        self.m_line_handlers = []
+        self.m_incomplete_line = ''
+        self.m_ends_with_newline = True
+        self.nr_lines = 0
+
+    def add_line_handler(self, handler):
+        """
+        Adds a function that is called with each complete line of the output
+        without the trailing whitespace.
+        """
+        self.m_line_handlers.append(handler)
+
+    def read_all(self):
+        """
+        Reads the stream until it is closed by the process.
+        """
+        while True:
+            data = self.m_stream.read1(self.m_chunk_size)
+            text = self.m_decoder.decode(data, final=not data)
+            if text:
+                self._handle_text(text)
+            if not data:
+                break
+        if not self.m_ends_with_newline:
+            self.nr_lines += 1
+        if self.m_incomplete_line:
+            self._call_line_handlers([self.m_incomplete_line])
+            self.m_incomplete_line = ''
+
+    def _handle_text(self, text):
+        # Counting the line ends of a chunk is cheap compared to splitting it.
+        self.nr_lines += text.count('\n')
+        self.m_ends_with_newline = text.endswith('\n')
+        if self.m_keep_text:
+            self.m_chunks.append(text)
+        if self.m_output:
+            self.m_output.write(text)
+            self.m_output.flush()
+        if self.m_line_handlers:
+            lines = (self.m_incomplete_line + text).split('\n')
+            self.m_incomplete_line = lines.pop()
+            self._call_line_handlers(lines)
+
+    def _call_line_handlers(self, lines):
+        for line in lines:
+            line = line.rstrip()
+            for handler in self.m_line_handlers:
+                handler(line)
+
+    def get_text(self):
+        return ''.join(self.m_chunks)
+
+    def get_lines(self):
+        """
+        Returns the lines of the output that was read so far without the trailing whitespace.
+        """
+        text = self.get_text()
+        if not text:
+            return []
+        lines = text.split('\n')
+        if not lines[-1]:
+            lines.pop()
+        return [line.rstrip() for line in lines]
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Measures how many lines per second the console output of a subprocess can be passed
+on by the old line by line loop of MiscOsAccess.execute_command_output() and by the
+OutputReader. The output is written to the null device, so the speed of the terminal
+does not distort the result.
+
+Run it from the CPFBuildscripts directory with:
+
+    python3 -m python.outputreader_benchmark [<nr_lines>]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from . import outputreader
+
+
+_DEFAULT_NR_LINES = 1000000
+# A line like the ones that are printed by verbose builds.
+_LINE = '[ 42%] Building CXX object Sources/MyLib/CMakeFiles/MyLib.dir/src/MyLibFile.cpp.o -- Größe'
+
+
+def _start_writer(nr_lines):
+    # The lines are written in blocks, so the writer is not the bottleneck.
+    script = 'import sys\nblock = ({0!r} + "\\n") * 1000\nfor i in range({1}):\n    sys.stdout.write(block)\n'.format(_LINE, nr_lines // 1000)
+    environment = dict(os.environ, PYTHONIOENCODING='utf-8')
+    return subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=-1, env=environment)
+
+
+def _read_line_by_line(process, output):
+    lines = []
+    for line in process.stdout:
+        line_string = line.decode('utf-8', errors="ignore").rstrip()
+        print(line_string, file=output)
+        lines.append(line_string)
+    return lines
+
+
+def _read_chunks(process, output):
+    reader = outputreader.OutputReader(process.stdout, output=output)
+    reader.read_all()
+    return reader.get_lines()
+
+
+def _measure(read_function, nr_lines):
+    with open(os.devnull, 'w', encoding='utf-8') as output:
+        start_time = time.perf_counter()
+        with _start_writer(nr_lines) as process:
+            lines = read_function(process, output)
+        duration = time.perf_counter() - start_time
+    if len(lines) != nr_lines:
+        raise Exception('Error: Expected {0} lines but got {1}.'.format(nr_lines, len(lines)))
+    return nr_lines / duration
+
+
+def main():
+    nr_lines = int(sys.argv[1]) if len(sys.argv) > 1 else _DEFAULT_NR_LINES
+    nr_lines -= nr_lines % 1000
+    before = _measure(_read_line_by_line, nr_lines)
+    after = _measure(_read_chunks, nr_lines)
+    print('Line by line: {0:,.0f} lines/s'.format(before))
+    print('OutputReader: {0:,.0f} lines/s ({1:.1f}x)'.format(after, after / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the OutputReader class.
+"""
+
+import io
+import unittest
+
+from . import outputreader
+
+
+class _CountingOutput(io.StringIO):
+    """
+    A text stream that counts the calls of write().
+    """
+    def __init__(self):
+        io.StringIO.__init__(self)
+        self.nr_writes = 0
+
+    def write(self, text):
+        self.nr_writes += 1
+        return io.StringIO.write(self, text)
+
+
+class TestOutputReader(unittest.TestCase):
+    """
+    The test fixture for the OutputReader tests.
+    """
+    def test_characters_and_line_endings_that_are_split_between_chunks_are_decoded(self):
+        # 'ä' has two bytes in utf-8 and the chunk size splits it and the \r\n.
+        stream = io.BytesIO('Gräße  \r\nline2\r\n\xff'.encode('utf-8') + b'\xff')
+        sut = outputreader.OutputReader(stream, chunk_size=3)
+
+        sut.read_all()
+
+        self.assertEqual(sut.get_text(), 'Gräße  \nline2\nÿ')
+        self.assertEqual(sut.get_lines(), ['Gräße', 'line2', 'ÿ'])
+
+    def test_output_is_written_once_per_chunk(self):
+        stream = io.BytesIO(b''.join(b'line %d\n' % i for i in range(100)))
+        output = _CountingOutput()
+        sut = outputreader.OutputReader(stream, output=output, chunk_size=256)
+
+        sut.read_all()
+
+        self.assertEqual(output.getvalue(), stream.getvalue().decode('utf-8'))
+        self.assertLess(output.nr_writes, 10)
+        self.assertEqual(sut.nr_lines, 100)
+
+    def test_line_handlers_get_complete_lines(self):
+        stream = io.BytesIO(b'first line\nsecond line  \nlast line')
+        lines = []
+        sut = outputreader.OutputReader(stream, chunk_size=4)
+        sut.add_line_handler(lines.append)
+
+        sut.read_all()
+
+        self.assertEqual(lines, ['first line', 'second line', 'last line'])
+        self.assertEqual(sut.get_lines(), lines)
+        self.assertEqual(sut.nr_lines, 3)
+
+    def test_get_lines_returns_an_empty_list_for_no_output(self):
+        sut = outputreader.OutputReader(io.BytesIO(b''))
+        sut.read_all()
+        self.assertEqual(sut.get_lines(), [])
+        self.assertEqual(sut.nr_lines, 0)
@@ -0,0 +1,294 @@
+#!/usr/bin/python3
+"""
+This module provides the Pipeline class which runs a set of BuildAutomat steps
+with dependencies between them in parallel.
+"""
+
+import json
+import queue
+import threading
+import time
+import datetime
+
+try:
+    import tomllib
+except ImportError: # tomllib is only available since python 3.11
+    tomllib = None
+
+
+_CONFIGURE_ACTION = 'configure'
+_GENERATE_ACTION = 'generate'
+_MAKE_ACTION = 'make'
+_ACTIONS = [_CONFIGURE_ACTION, _GENERATE_ACTION, _MAKE_ACTION]
+
+SUCCEEDED = 'SUCCEEDED'
+FAILED = 'FAILED'
+SKIPPED = 'SKIPPED'
+
+
+class PipelineStep:
+    """
+    One configure, generate or make call of the pipeline.
+    A cpus value of None means that the step takes as many of the free
+    cpu slots as it can get when it is started. This is the default for make steps.
+    """
+    def __init__(self, name, action, automat_args, depends, cpus):
+        self.name = name
+        self.action = action
+        self.automat_args = automat_args
+        self.depends = depends
+        self.cpus = cpus
+        # Results
+        self.status = None
+        self.start_offset = None
+        self.duration = None
+        self.used_cpus = None
+
+
+class Pipeline:
+    """
+    Runs the steps of a pipeline on a budget of cpu slots.
+    Steps are started as soon as their dependencies succeeded and enough
+    slots are free, so independent steps overlap. Steps that depend on a
+    failed step are skipped.
+
+    The create_automat function returns a new BuildAutomat for each step, because the
+    steps that run at the same time cannot share the state of one automat.
+    """
+    def __init__(self, create_automat, steps, nr_cpus, os_access):
+        self.m_create_automat = create_automat
+        self.m_steps = _sort_steps(steps)
+        self.m_nr_cpus = max(1, nr_cpus)
+        self.m_os_access = os_access
+        self.m_total_time = None
+
+    def run(self):
+        """
+        Runs all steps and returns true if all of them succeeded.
+        """
+        start_time = time.perf_counter()
+        finished_queue = queue.Queue()
+        pending = list(self.m_steps)
+        running = {}
+        free_cpus = self.m_nr_cpus
+
+        while pending or running:
+            # Skip the steps that can no longer be executed.
+            for step in list(pending):
+                if any(self._get_step(dependency).status in (FAILED, SKIPPED) for dependency in step.depends):
+                    step.status = SKIPPED
+                    pending.remove(step)
+
+            ready = [step for step in pending if all(self._get_step(dependency).status == SUCCEEDED for dependency in step.depends)]
+
+            # Steps with a fixed demand are started first.
+            for step in [step for step in ready if step.cpus is not None]:
+                # A step that demands more than the budget can only run alone.
+                demand = min(step.cpus, self.m_nr_cpus)
+                if demand <= free_cpus:
+                    free_cpus -= demand
+                    self._start_step(step, demand, start_time, finished_queue, running, pending)
+
+            # The remaining slots are shared between the elastic steps.
+            for step in [step for step in ready if step.cpus is None]:
+                if free_cpus <= 0:
+                    break
+                demand = min(self._get_elastic_share(step), free_cpus)
+                free_cpus -= demand
+                self._start_step(step, demand, start_time, finished_queue, running, pending)
+
+            if not running:
+                break
+
+            step, succeeded = finished_queue.get()
+            step.duration = time.perf_counter() - start_time - step.start_offset
+            step.status = SUCCEEDED if succeeded else FAILED
+            free_cpus += running.pop(step.name)
+
+        self.m_total_time = time.perf_counter() - start_time
+        self._print_timing_summary()
+        return all(step.status == SUCCEEDED for step in self.m_steps)
+
+    def get_timing_summary(self):
+        """
+        Returns a dictionary with the timings of all steps.
+        """
+        return {
+            'total_seconds': self.m_total_time,
+            'cpus': self.m_nr_cpus,
+            'steps': [
+                {
+                    'name': step.name,
+                    'action': step.action,
+                    'status': step.status,
+                    'cpus': step.used_cpus,
+                    'start_seconds': step.start_offset,
+                    'duration_seconds': step.duration,
+                }
+                for step in self.m_steps
+            ]
+        }
+
+    def _get_step(self, name):
+        return next(step for step in self.m_steps if step.name == name)
+
+    def _get_elastic_share(self, step):
+        """
+        Returns the cpus of an elastic step. The budget is divided between the unfinished elastic
+        steps that can run at the same time as the step. The running steps keep their cpus until
+        they finish, so the first elastic step must not take the cpus of the steps that become
+        ready later. Of a chain of dependent elastic steps only the first one is counted.
+        """
+        related = self._get_dependencies(step) | self._get_dependents(step)
+        concurrent_steps = [other for other in self.m_steps
+                            if other.cpus is None and other.status is None and other is not step and other.name not in related]
+        concurrent_names = set(other.name for other in concurrent_steps)
+        nr_chains = len([other for other in concurrent_steps if not self._get_dependencies(other) & concurrent_names])
+        return max(1, self.m_nr_cpus // (nr_chains + 1))
+
+    def _get_dependencies(self, step):
+        dependencies = set()
+        for dependency in step.depends:
+            dependencies.add(dependency)
+            dependencies |= self._get_dependencies(self._get_step(dependency))
+        return dependencies
+
+    def _get_dependents(self, step):
+        dependents = set()
+        for other in self.m_steps:
+            if step.name in other.depends:
+                dependents.add(other.name)
+                dependents |= self._get_dependents(other)
+        return dependents
+
+    def _start_step(self, step, nr_cpus, start_time, finished_queue, running, pending):
+        step.used_cpus = nr_cpus
+        step.start_offset = time.perf_counter() - start_time
+        running[step.name] = nr_cpus
+        pending.remove(step)
+        thread = threading.Thread(target=self._run_step, args=(step, nr_cpus, finished_queue), daemon=True)
+        thread.start()
+
+    def _run_step(self, step, nr_cpus, finished_queue):
+        succeeded = False
+        try:
+            self.m_os_access.print_console('-- Start pipeline step "{0}" with {1} cpus.'.format(step.name, nr_cpus))
+            automat = self.m_create_automat()
+            if step.action == _CONFIGURE_ACTION:
+                succeeded = automat.configure(step.automat_args)
+            elif step.action == _GENERATE_ACTION:
+                succeeded = automat.generate_make_files(step.automat_args)
+            elif step.action == _MAKE_ACTION:
+                make_args = dict(step.automat_args)
+                make_args['--cpus'] = str(nr_cpus)
+                succeeded = automat.make(make_args)
+        except BaseException as exception:
+            self.m_os_access.print_console(str(exception))
+        finally:
+            finished_queue.put((step, bool(succeeded)))
+
+    def _print_timing_summary(self):
+        lines = ['', 'Pipeline timing summary ({0} cpus):'.format(self.m_nr_cpus)]
+        name_width = max([len(step.name) for step in self.m_steps] + [4])
+        lines.append('{0}  {1:<9}  {2:>4}  {3:>9}  {4:>9}'.format('Step'.ljust(name_width), 'Status', 'Cpus', 'Start', 'Duration'))
+        for step in self.m_steps:
+            lines.append('{0}  {1:<9}  {2:>4}  {3:>9}  {4:>9}'.format(
+                step.name.ljust(name_width),
+                step.status,
+                step.used_cpus if step.used_cpus is not None else '-',
+                _format_seconds(step.start_offset),
+                _format_seconds(step.duration)))
+        summed_time = sum(step.duration for step in self.m_steps if step.duration is not None)
+        lines.append('The pipeline took {0} h:m:s. The sum of all step durations is {1} h:m:s.'.format(
+            _format_seconds(self.m_total_time), _format_seconds(summed_time)))
+        self.m_os_access.print_console('\n'.join(lines))
+
+
+########### free functions #########################################################################
+def load_pipeline_steps(fs_access, pipeline_file):
+    """
+    Reads the steps from a .json or .toml pipeline file. The file contains a list "steps"
+    with entries like
+
+    { "name": "build-A", "action": "make", "config_name": "A", "target": "all", "depends": ["generate-A"] }
+    """
+    content = fs_access.readfile(pipeline_file)
+    if str(pipeline_file).endswith('.toml'):
+        if tomllib is None:
+            raise Exception('Error: Reading .toml pipeline files requires python 3.11 or higher.')
+        pipeline = tomllib.loads(content)
+    else:
+        pipeline = json.loads(content)
+
+    steps = []
+    for entry in pipeline.get('steps', []):
+        steps.append(_get_step_from_entry(entry))
+    return steps
+
+
+def _get_step_from_entry(entry):
+    name = entry.get('name')
+    action = entry.get('action')
+    if not name:
+        raise Exception('Error: A pipeline step is missing the "name" key.')
+    if action not in _ACTIONS:
+        raise Exception('Error: Pipeline step "{0}" has the invalid action "{1}". Valid actions are {2}.'.format(name, action, ', '.join(_ACTIONS)))
+
+    config_name = entry.get('config_name')
+    if action == _CONFIGURE_ACTION:
+        automat_args = {
+            '<config_name>': config_name,
+            '--inherits': entry.get('inherits'),
+            '--list': False,
+            '-D': list(entry.get('definitions', [])),
+        }
+    elif action == _GENERATE_ACTION:
+        automat_args = {
+            '<config_name>': config_name,
+            '--clean': entry.get('clean', False),
+        }
+    else:
+        automat_args = {
+            '<config_name>': config_name,
+            '--target': entry.get('target'),
+            '--config': entry.get('config'),
+            '--clean': entry.get('clean', False),
+            '--cpus': None,
+        }
+
+    cpus = entry.get('cpus')
+    if cpus is None and action != _MAKE_ACTION:
+        cpus = 1
+
+    return PipelineStep(name, action, automat_args, list(entry.get('depends', [])), cpus)
+
+
+def _sort_steps(steps):
+    """
+    Returns the steps in an order where each step comes after its dependencies.
+    The order of the pipeline file is kept where possible.
+    """
+    names = [step.name for step in steps]
+    for step in steps:
+        if names.count(step.name) > 1:
+            raise Exception('Error: The pipeline contains multiple steps with the name "{0}".'.format(step.name))
+        for dependency in step.depends:
+            if dependency not in names:
+                raise Exception('Error: Pipeline step "{0}" depends on the unknown step "{1}".'.format(step.name, dependency))
+
+    sorted_steps = []
+    remaining = list(steps)
+    while remaining:
+        sorted_names = [step.name for step in sorted_steps]
+        next_step = next((step for step in remaining if all(dependency in sorted_names for dependency in step.depends)), None)
+        if next_step is None:
+            raise Exception('Error: The pipeline steps {0} have cyclic dependencies.'.format(', '.join(step.name for step in remaining)))
+        sorted_steps.append(next_step)
+        remaining.remove(next_step)
+    return sorted_steps
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '-'
+    return str(datetime.timedelta(seconds=round(seconds)))
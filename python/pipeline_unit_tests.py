@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the Pipeline class.
+"""
+
+import unittest
+import threading
+
+from . import pipeline
+from . import miscosaccess
+from . import filesystemaccess
+
+
+class FakeAutomat:
+    """
+    Records the calls that the pipeline makes to the BuildAutomat.
+    """
+    def __init__(self, failing_config=None):
+        self.calls = []
+        self.failing_config = failing_config
+        self.lock = threading.Lock()
+
+    def configure(self, args):
+        return self._record('configure', args)
+
+    def generate_make_files(self, args):
+        return self._record('generate', args)
+
+    def make(self, args):
+        return self._record('make', args)
+
+    def _record(self, action, args):
+        with self.lock:
+            self.calls.append((action, args))
+        return args['<config_name>'] != self.failing_config
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    The test fixture for the Pipeline tests.
+    """
+    def setUp(self):
+        self.fs_access = filesystemaccess.FakeFileSystemAccess()
+        self.os_access = miscosaccess.FakeMiscOsAccess(self.fs_access, '/MyCPFProject', {}, 'Linux', 4)
+
+    def _get_steps(self):
+        self.fs_access.addfile('/MyCPFProject/pipeline.json', """
+        {
+            "steps": [
+                { "name": "build-A", "action": "make", "config_name": "A", "target": "all", "depends": ["generate-A"] },
+                { "name": "generate-A", "action": "generate", "config_name": "A", "depends": ["configure-A"] },
+                { "name": "configure-A", "action": "configure", "config_name": "A", "inherits": "Linux" },
+                { "name": "configure-B", "action": "configure", "config_name": "B" },
+                { "name": "generate-B", "action": "generate", "config_name": "B", "depends": ["configure-B"] },
+                { "name": "test-B", "action": "make", "config_name": "B", "target": "runAllTests", "cpus": 2, "depends": ["generate-B"] }
+            ]
+        }
+        """)
+        return pipeline.load_pipeline_steps(self.fs_access, '/MyCPFProject/pipeline.json')
+
+    def test_run_executes_steps_after_their_dependencies(self):
+        # setup
+        automat = FakeAutomat()
+        sut = pipeline.Pipeline(lambda: automat, self._get_steps(), 4, self.os_access)
+
+        # execute
+        self.assertTrue(sut.run())
+
+        # verify
+        calls = [(action, args['<config_name>']) for action, args in automat.calls]
+        self.assertEqual(len(calls), 6)
+        self.assertLess(calls.index(('configure', 'A')), calls.index(('generate', 'A')))
+        self.assertLess(calls.index(('generate', 'A')), calls.index(('make', 'A')))
+        self.assertLess(calls.index(('generate', 'B')), calls.index(('make', 'B')))
+
+        make_b_args = next(args for action, args in automat.calls if action == 'make' and args['<config_name>'] == 'B')
+        self.assertEqual(make_b_args['--cpus'], '2')
+        self.assertEqual(make_b_args['--target'], 'runAllTests')
+
+        summary = sut.get_timing_summary()
+        self.assertEqual([step['status'] for step in summary['steps']], [pipeline.SUCCEEDED] * 6)
+        self.assertIn('Pipeline timing summary', self.os_access.console_output)
+
+    def test_run_skips_steps_that_depend_on_failed_steps(self):
+        # setup
+        automat = FakeAutomat(failing_config='A')
+        sut = pipeline.Pipeline(lambda: automat, self._get_steps(), 4, self.os_access)
+
+        # execute
+        self.assertFalse(sut.run())
+
+        # verify
+        statuses = {step['name']: step['status'] for step in sut.get_timing_summary()['steps']}
+        self.assertEqual(statuses['configure-A'], pipeline.FAILED)
+        self.assertEqual(statuses['generate-A'], pipeline.SKIPPED)
+        self.assertEqual(statuses['build-A'], pipeline.SKIPPED)
+        self.assertEqual(statuses['test-B'], pipeline.SUCCEEDED)
+
+    def test_elastic_make_steps_never_exceed_the_cpu_budget(self):
+        # setup
+        steps = [
+            pipeline.PipelineStep('build-A', 'make', {'<config_name>': 'A'}, [], None),
+            pipeline.PipelineStep('build-B', 'make', {'<config_name>': 'B'}, [], None),
+            pipeline.PipelineStep('build-C', 'make', {'<config_name>': 'C'}, [], None),
+        ]
+        sut = pipeline.Pipeline(FakeAutomat, steps, 4, self.os_access)
+
+        # execute
+        self.assertTrue(sut.run())
+
+        # verify
+        used_cpus = [step['cpus'] for step in sut.get_timing_summary()['steps']]
+        self.assertTrue(all(cpus >= 1 for cpus in used_cpus))
+        self.assertLessEqual(used_cpus[0] + used_cpus[1], 4)
+
+    def test_elastic_make_steps_leave_cpus_for_elastic_steps_that_become_ready_later(self):
+        # setup
+        steps = [
+            pipeline.PipelineStep('build-A', 'make', {'<config_name>': 'A'}, [], None),
+            pipeline.PipelineStep('generate-B', 'generate', {'<config_name>': 'B'}, [], 1),
+            pipeline.PipelineStep('test-B', 'make', {'<config_name>': 'B'}, ['generate-B'], None),
+            pipeline.PipelineStep('install-A', 'make', {'<config_name>': 'A'}, ['build-A'], None),
+        ]
+        sut = pipeline.Pipeline(FakeAutomat, steps, 4, self.os_access)
+
+        # execute
+        self.assertTrue(sut.run())
+
+        # verify
+        used_cpus = {step['name']: step['cpus'] for step in sut.get_timing_summary()['steps']}
+        # build-A shares the cpus with test-B, but not with its own dependent install-A.
+        self.assertEqual(used_cpus['build-A'], 2)
+        self.assertGreaterEqual(used_cpus['test-B'], 2)
+
+    def test_load_pipeline_steps_rejects_cyclic_dependencies(self):
+        # setup
+        steps = [
+            pipeline.PipelineStep('a', 'generate', {}, ['b'], 1),
+            pipeline.PipelineStep('b', 'generate', {}, ['a'], 1),
+        ]
+
+        # execute and verify
+        with self.assertRaises(Exception):
+            pipeline.Pipeline(FakeAutomat, steps, 4, self.os_access)
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+This module contains functions that operate on a process and all of its
+descendant processes. On Linux the information is read from /proc.
+"""
+
+import os
+import platform
+import signal
+import subprocess
+
+
+def get_descendant_pids(pid, process_stats=None):
+    """
+    Returns the ids of all direct and indirect child processes of the given process.
+    The process_stats of read_process_stats() can be given to avoid reading /proc again.
+    """
+    if process_stats is None:
+        process_stats = read_process_stats()
+    children = {}
+    for child_pid, stat in process_stats.items():
+        children.setdefault(stat['ppid'], []).append(child_pid)
+
+    descendants = []
+    stack = list(children.get(pid, []))
+    while stack:
+        child_pid = stack.pop()
+        descendants.append(child_pid)
+        stack.extend(children.get(child_pid, []))
+    return descendants
+
+
+def terminate_process_tree(pid):
+    """
+    Kills the given process and all of its descendants.
+    The descendants are stopped first, so they can not spawn new processes
+    while the tree is taken down.
+    """
+    if platform.system() == 'Windows':
+        subprocess.call('taskkill /F /T /PID {0}'.format(pid), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+
+    pids = [pid] + get_descendant_pids(pid)
+    for process_id in pids:
+        _send_signal(process_id, signal.SIGSTOP)
+    for process_id in reversed(pids):
+        _send_signal(process_id, signal.SIGKILL)
+
+
+def _send_signal(pid, signal_number):
+    try:
+        os.kill(pid, signal_number)
+    except (ProcessLookupError, PermissionError):
+        pass # The process is already gone or belongs to someone else.
+
+
+def read_process_stats():
+    """
+    Returns a dictionary that maps the ids of all processes to a dictionary with the
+    parent id, the name, the used cpu time in clock ticks and the resident memory in pages.
+    The cpu time includes the time of terminated child processes that were waited for.
+    """
+    process_stats = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{0}/stat'.format(entry), 'r') as file:
+                process_stats[int(entry)] = parse_process_stat(file.read())
+        except (OSError, IndexError, ValueError):
+            continue # The process ended while we were looking.
+    return process_stats
+
+
+def parse_process_stat(stat):
+    """
+    Returns the values of read_process_stats() from the content of a /proc/<pid>/stat file.
+    """
+    # The command name in the second field can contain spaces and braces.
+    name = stat[stat.find('(') + 1:stat.rfind(')')]
+    fields = stat[stat.rfind(')') + 2:].split()
+    return {
+        'ppid': int(fields[1]),
+        'name': name,
+        'cpu_ticks': sum(int(field) for field in fields[11:15]), # utime, stime, cutime and cstime
+        'rss_pages': int(fields[21]),
+        }
+
+
+def read_command_line(pid):
+    """
+    Returns the command line of the process from /proc or None if the process ended.
+    The command line is empty for processes that have ended but were not waited for yet.
+    """
+    try:
+        with open('/proc/{0}/cmdline'.format(pid), 'rb') as file:
+            arguments = file.read().split(b'\0')
+    except OSError:
+        return None
+    return ' '.join(argument.decode('utf-8', errors='replace') for argument in arguments if argument)
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+"""
+This module provides the ResourceSampler class which records the cpu, memory and disk usage
+of the process tree of a build and functions for summarizing the samples and for writing them
+as a timeline.
+"""
+
+import json
+import os
+import threading
+import time
+
+from . import buildresources
+from . import processtree
+
+
+DEFAULT_INTERVAL = 0.5
+_BUILD_TOOL_NAMES = ['ninja', 'make', 'gmake', 'MSBuild', 'xcodebuild']
+_MEBIBYTE = 1024 * 1024
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Reads the /proc entries of the processes that are returned by get_root_pids and of all their
+    descendants at a fixed interval. Each sample holds the values of the time since the last sample.
+
+    The cpu time and the disk I/O of a process in /proc include the values of its terminated
+    children, so short compiler runs that start and end between two samples are not lost.
+    """
+    def __init__(self, get_root_pids, interval=DEFAULT_INTERVAL, read_snapshot=None):
+        threading.Thread.__init__(self, daemon=True)
+        self.m_get_root_pids = get_root_pids
+        self.m_interval = interval
+        self.m_read_snapshot = read_snapshot if read_snapshot else read_snapshot_from_proc
+        self.m_stop_event = threading.Event()
+        self.m_start_time = None
+        self.samples = []
+
+    def stop(self):
+        self.m_stop_event.set()
+        self.join()
+
+    def run(self):
+        self.m_start_time = time.monotonic()
+        previous = self._take_snapshot()
+        while not self.m_stop_event.wait(self.m_interval):
+            current = self._take_snapshot()
+            self.samples.append(get_sample(previous, current))
+            previous = current
+
+    def _take_snapshot(self):
+        snapshot = self.m_read_snapshot(self.m_get_root_pids())
+        snapshot['time'] = time.monotonic() - self.m_start_time
+        return snapshot
+
+
+########### free functions #########################################################################
+def read_snapshot_from_proc(root_pids):
+    """
+    Returns the accumulated cpu ticks, the resident memory, the disk I/O and the number
+    of running jobs of the process trees and the cpu and swap counters of the machine.
+    """
+    process_stats = processtree.read_process_stats()
+    pids = []
+    for root_pid in root_pids:
+        if root_pid in process_stats:
+            pids.append(root_pid)
+            pids.extend(processtree.get_descendant_pids(root_pid, process_stats))
+
+    snapshot = {
+        'cpu_ticks': 0,
+        'rss_bytes': 0,
+        'read_bytes': 0,
+        'write_bytes': 0,
+        'jobs': get_job_count({pid: process_stats[pid] for pid in pids if pid in process_stats}),
+        }
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for pid in pids:
+        stat = process_stats.get(pid)
+        if stat:
+            snapshot['cpu_ticks'] += stat['cpu_ticks']
+            snapshot['rss_bytes'] += stat['rss_pages'] * page_size
+        io = parse_counters(_read_file('/proc/{0}/io'.format(pid)) or '')
+        snapshot['read_bytes'] += io.get('read_bytes', 0)
+        snapshot['write_bytes'] += io.get('write_bytes', 0)
+
+    snapshot['clock_ticks_per_second'] = os.sysconf('SC_CLK_TCK')
+    snapshot['machine_cpu_ticks'], snapshot['iowait_ticks'] = parse_proc_stat(_read_file('/proc/stat') or '')
+    vmstat = parse_counters(_read_file('/proc/vmstat') or '')
+    snapshot['swapped_pages'] = vmstat.get('pswpin', 0) + vmstat.get('pswpout', 0)
+    snapshot['available_memory'] = buildresources.get_available_memory()
+    return snapshot
+
+
+def get_job_count(process_stats):
+    """
+    Returns the number of processes in the tree that were started by a build tool and that do not
+    run a build tool themselves. These are the compiler, linker and custom command jobs.
+    """
+    children = {}
+    for pid, stat in process_stats.items():
+        children.setdefault(stat['ppid'], []).append(pid)
+
+    jobs = 0
+    for pid, stat in process_stats.items():
+        parent = process_stats.get(stat['ppid'])
+        if parent and _is_build_tool(parent['name']) and not _runs_build_tool(pid, process_stats, children):
+            jobs += 1
+    return jobs
+
+
+def _runs_build_tool(pid, process_stats, children):
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        if _is_build_tool(process_stats[current]['name']):
+            return True
+        stack.extend(children.get(current, []))
+    return False
+
+
+def _is_build_tool(process_name):
+    return any(process_name == name or process_name.startswith(name + '.') for name in _BUILD_TOOL_NAMES)
+
+
+def parse_counters(content):
+    """
+    Returns the "name: value" or "name value" lines of /proc/<pid>/io or /proc/vmstat as dictionary.
+    """
+    values = {}
+    for line in content.splitlines():
+        fields = line.replace(':', ' ').split()
+        if len(fields) == 2 and fields[1].isdigit():
+            values[fields[0]] = int(fields[1])
+    return values
+
+
+def parse_proc_stat(content):
+    """
+    Returns the total cpu ticks and the ticks that were spent waiting for I/O from the
+    first line of /proc/stat.
+    """
+    for line in content.splitlines():
+        fields = line.split()
+        if fields and fields[0] == 'cpu':
+            ticks = [int(field) for field in fields[1:]]
+            # Guest time is already included in the user time.
+            return sum(ticks[:8]), (ticks[4] if len(ticks) > 4 else 0)
+    return 0, 0
+
+
+def get_sample(previous, current):
+    """
+    Returns the usage between two snapshots. The cpu and disk values are
+    rates, because the snapshots contain accumulated counters.
+    """
+    duration = current['time'] - previous['time']
+    machine_ticks = current['machine_cpu_ticks'] - previous['machine_cpu_ticks']
+    # The counters of the tree go down when processes are reaped by a parent outside of the tree.
+    return {
+        'time': current['time'],
+        'cpus': max(0, current['cpu_ticks'] - previous['cpu_ticks']) / current['clock_ticks_per_second'] / duration if duration > 0 else 0.0,
+        'rss_bytes': current['rss_bytes'],
+        'jobs': current['jobs'],
+        'read_bytes_per_second': max(0, current['read_bytes'] - previous['read_bytes']) / duration if duration > 0 else 0.0,
+        'write_bytes_per_second': max(0, current['write_bytes'] - previous['write_bytes']) / duration if duration > 0 else 0.0,
+        'iowait_percent': 100.0 * (current['iowait_ticks'] - previous['iowait_ticks']) / machine_ticks if machine_ticks > 0 else 0.0,
+        'swapped_pages': max(0, current['swapped_pages'] - previous['swapped_pages']),
+        'available_memory': current['available_memory'],
+        }
+
+
+def get_summary(samples, nr_jobs):
+    """
+    Returns lines that describe how well the build used the cpus, the memory and the disk.
+    """
+    if not samples:
+        return ['The build was too short for sampling the resource usage.']
+
+    available_memory = [sample['available_memory'] for sample in samples if sample['available_memory'] is not None]
+    average_cpus = sum(sample['cpus'] for sample in samples) / len(samples)
+    summary = [
+        'CPU: {0:.1f} cpus busy on average and {1:.1f} at peak, which is {2:.0f}% of the {3} jobs.'.format(
+            average_cpus, max(sample['cpus'] for sample in samples), 100.0 * average_cpus / nr_jobs if nr_jobs else 0.0, nr_jobs),
+        'Jobs: {0:.1f} running on average and {1} at most.'.format(
+            sum(sample['jobs'] for sample in samples) / len(samples), max(sample['jobs'] for sample in samples)),
+        'Memory: {0} peak resident memory of the build processes{1}.'.format(
+            buildresources.format_bytes(max(sample['rss_bytes'] for sample in samples)),
+            ', {0} available at least'.format(buildresources.format_bytes(min(available_memory))) if available_memory else ''),
+        'Disk: {0:.1f} MiB/s read and {1:.1f} MiB/s written on average, {2:.0f}% of the cpu time was spent waiting for I/O.'.format(
+            sum(sample['read_bytes_per_second'] for sample in samples) / len(samples) / _MEBIBYTE,
+            sum(sample['write_bytes_per_second'] for sample in samples) / len(samples) / _MEBIBYTE,
+            sum(sample['iowait_percent'] for sample in samples) / len(samples)),
+        ]
+
+    swapped_pages = sum(sample['swapped_pages'] for sample in samples)
+    if swapped_pages:
+        summary.append('Warning: The machine swapped {0} pages during the build. Use fewer jobs or the --adaptive-jobs option.'.format(swapped_pages))
+    return summary
+
+
+def get_timeline(samples):
+    """
+    Returns the samples as counter events in the Chrome trace event format, so the
+    timeline can be viewed in chrome://tracing or Perfetto and be merged with other traces.
+    """
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': 0, 'args': {'name': 'Build resources'}}]
+    for sample in samples:
+        timestamp = int(sample['time'] * 1000000)
+        counters = {
+            'CPUs': {'busy': sample['cpus']},
+            'Jobs': {'running': sample['jobs']},
+            'Memory MiB': {'resident': sample['rss_bytes'] / _MEBIBYTE},
+            'Disk MiB/s': {'read': sample['read_bytes_per_second'] / _MEBIBYTE, 'write': sample['write_bytes_per_second'] / _MEBIBYTE},
+            'I/O wait %': {'iowait': sample['iowait_percent']},
+            }
+        if sample['available_memory'] is not None:
+            counters['Memory MiB']['available'] = sample['available_memory'] / _MEBIBYTE
+        for name in sorted(counters):
+            events.append({'name': name, 'ph': 'C', 'ts': timestamp, 'pid': 0, 'args': counters[name]})
+    return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, indent=1)
+
+
+def _read_file(path):
+    try:
+        with open(path, 'r') as file:
+            return file.read()
+    except OSError:
+        return None
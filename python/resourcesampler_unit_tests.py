@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the ResourceSampler class and the functions of the resourcesampler module.
+"""
+
+import json
+import unittest
+
+from . import processtree
+from . import resourcesampler
+
+
+_GIB = 1024 * 1024 * 1024
+
+
+def _get_snapshot(time, cpu_ticks, jobs=0, write_bytes=0, machine_cpu_ticks=0, iowait_ticks=0, swapped_pages=0):
+    return {
+        'time': time,
+        'cpu_ticks': cpu_ticks,
+        'rss_bytes': 2 * _GIB,
+        'read_bytes': 0,
+        'write_bytes': write_bytes,
+        'jobs': jobs,
+        'clock_ticks_per_second': 100,
+        'machine_cpu_ticks': machine_cpu_ticks,
+        'iowait_ticks': iowait_ticks,
+        'swapped_pages': swapped_pages,
+        'available_memory': 6 * _GIB,
+        }
+
+
+class TestResourceSampler(unittest.TestCase):
+    """
+    The test fixture for the resourcesampler tests.
+    """
+    def test_sampler_takes_samples_until_it_is_stopped(self):
+        root_pids = []
+        snapshots = []
+
+        def read_snapshot(pids):
+            root_pids.append(pids)
+            snapshot = _get_snapshot(0, 100 * len(snapshots))
+            snapshots.append(snapshot)
+            return snapshot
+
+        sut = resourcesampler.ResourceSampler(lambda: [1234], interval=0.01, read_snapshot=read_snapshot)
+        sut.start()
+        while len(snapshots) < 3:
+            pass
+        sut.stop()
+
+        self.assertEqual(len(sut.samples), len(snapshots) - 1)
+        self.assertEqual(root_pids[0], [1234])
+        self.assertGreater(sut.samples[0]['cpus'], 0)
+
+    def test_get_sample_returns_rates(self):
+        sample = resourcesampler.get_sample(
+            _get_snapshot(1.0, 1000, write_bytes=0, machine_cpu_ticks=1000, iowait_ticks=10),
+            _get_snapshot(1.5, 1200, jobs=4, write_bytes=1024 * 1024, machine_cpu_ticks=1400, iowait_ticks=50))
+
+        self.assertEqual(sample['cpus'], 4.0)
+        self.assertEqual(sample['jobs'], 4)
+        self.assertEqual(sample['write_bytes_per_second'], 2 * 1024 * 1024)
+        self.assertEqual(sample['iowait_percent'], 10.0)
+
+        sample = resourcesampler.get_sample(_get_snapshot(1.0, 1000), _get_snapshot(1.5, 0))
+        self.assertEqual(sample['cpus'], 0.0, 'The counters of a finished process tree are gone')
+
+    def test_get_summary_reports_utilization_and_swapping(self):
+        samples = [
+            resourcesampler.get_sample(_get_snapshot(0.0, 0), _get_snapshot(1.0, 200, jobs=2)),
+            resourcesampler.get_sample(_get_snapshot(1.0, 200), _get_snapshot(2.0, 800, jobs=6, swapped_pages=10)),
+            ]
+
+        summary = resourcesampler.get_summary(samples, 8)
+
+        self.assertEqual(summary[0], 'CPU: 4.0 cpus busy on average and 6.0 at peak, which is 50% of the 8 jobs.')
+        self.assertEqual(summary[1], 'Jobs: 4.0 running on average and 6 at most.')
+        self.assertEqual(summary[2], 'Memory: 2.0 GiB peak resident memory of the build processes, 6.0 GiB available at least.')
+        self.assertTrue(summary[4].startswith('Warning: The machine swapped 10 pages during the build.'))
+
+    def test_get_timeline_returns_chrome_trace_counter_events(self):
+        samples = [resourcesampler.get_sample(_get_snapshot(0.0, 0), _get_snapshot(1.5, 150, jobs=3))]
+
+        events = json.loads(resourcesampler.get_timeline(samples))['traceEvents']
+
+        jobs_events = [event for event in events if event['name'] == 'Jobs']
+        self.assertEqual(jobs_events, [{'name': 'Jobs', 'ph': 'C', 'ts': 1500000, 'pid': 0, 'args': {'running': 3}}])
+
+    def test_get_job_count_counts_the_children_of_build_tools(self):
+        process_stats = {
+            10: {'ppid': 1, 'name': 'cmake'},
+            11: {'ppid': 10, 'name': 'ninja'},
+            12: {'ppid': 11, 'name': 'sh'},
+            13: {'ppid': 12, 'name': 'c++'},
+            14: {'ppid': 11, 'name': 'ld'},
+            15: {'ppid': 11, 'name': 'sh'},
+            16: {'ppid': 15, 'name': 'make'}, # a nested build is no job
+            17: {'ppid': 16, 'name': 'cc1plus'},
+            }
+
+        self.assertEqual(resourcesampler.get_job_count(process_stats), 3)
+
+    def test_parse_proc_files(self):
+        stat = processtree.parse_process_stat(
+            '4242 (c++ (wrapper)) R 4241 4242 4000 0 -1 4194304 100 0 0 0 30 5 7 3 20 0 1 0 500 1000000 2560 18446744073709551615')
+        self.assertEqual(stat, {'ppid': 4241, 'name': 'c++ (wrapper)', 'cpu_ticks': 45, 'rss_pages': 2560})
+
+        self.assertEqual(
+            resourcesampler.parse_counters('rchar: 3980\nread_bytes: 4096\nwrite_bytes: 8192\n'),
+            {'rchar': 3980, 'read_bytes': 4096, 'write_bytes': 8192})
+        self.assertEqual(
+            resourcesampler.parse_proc_stat('cpu  100 0 50 800 40 0 10 0 0 0\ncpu0 50 0 25 400 20 0 5 0 0 0\n'),
+            (1000, 40))
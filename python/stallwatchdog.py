@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""
+This module provides the StallWatchdog class which detects builds that stopped making
+progress, because a command hangs, and reports the processes of the stalled build.
+"""
+
+import os
+import threading
+import time
+
+from . import processtree
+
+
+# The longest time between two checks. Short stall timeouts are checked more often.
+_MAX_CHECK_INTERVAL = 10.0
+_MAX_COMMAND_LINE_LENGTH = 300
+
+
+class StallWatchdog(threading.Thread):
+    """
+    A text stream that passes the output of the build tool on to the next stream and remembers
+    when the last output arrived. The thread checks at a regular interval if the process tree of
+    the build used cpu time since the last check. When the build neither wrote output nor used
+    cpu time for the given number of seconds, the report function is called with the lines that
+    describe the running processes. With a terminate function the process tree is killed as well.
+
+    Without a read_process_stats function only the output is watched.
+    """
+    def __init__(self, output, get_root_pids, stall_seconds, report, terminate=None, read_process_stats=None,
+                 read_command_line=processtree.read_command_line, clock=time.monotonic):
+        threading.Thread.__init__(self, daemon=True)
+        self.m_output = output
+        self.m_get_root_pids = get_root_pids
+        self.m_stall_seconds = stall_seconds
+        self.m_report = report
+        self.m_terminate = terminate
+        self.m_read_process_stats = read_process_stats
+        self.m_read_command_line = read_command_line
+        self.m_clock = clock
+        self.m_interval = min(_MAX_CHECK_INTERVAL, stall_seconds / 4)
+        self.m_stop_event = threading.Event()
+        self.m_last_activity_time = clock()
+        self.m_cpu_ticks = None
+        self.m_is_reported = False
+        self.killed = False
+
+    def write(self, text):
+        self.m_last_activity_time = self.m_clock()
+        self.m_output.write(text)
+
+    def flush(self):
+        self.m_output.flush()
+
+    def stop(self):
+        self.m_stop_event.set()
+        self.join()
+
+    def run(self):
+        while not self.m_stop_event.wait(self.m_interval):
+            self.check()
+
+    def check(self):
+        """
+        Reports the stall once when the build made no progress for the stall period.
+        The next stall is reported again after the build made progress in between.
+        """
+        now = self.m_clock()
+        process_stats = self.m_read_process_stats() if self.m_read_process_stats else {}
+        process_tree = get_process_tree(self.m_get_root_pids(), process_stats)
+        cpu_ticks = sum(process_stats[pid]['cpu_ticks'] for _, pid in process_tree)
+        if self.m_cpu_ticks is not None and cpu_ticks != self.m_cpu_ticks:
+            self.m_last_activity_time = now
+        self.m_cpu_ticks = cpu_ticks
+
+        if now - self.m_last_activity_time < self.m_stall_seconds:
+            self.m_is_reported = False
+            return
+        if self.m_is_reported:
+            return
+        self.m_is_reported = True
+
+        watched = 'produced no output and used no cpu time' if self.m_read_process_stats else 'produced no output'
+        lines = ['Warning: The build {0} for {1:g} minutes.'.format(watched, self.m_stall_seconds / 60)]
+        if process_tree:
+            lines.append('The processes of the build are:')
+            lines.extend(get_process_lines(process_tree, process_stats, self.m_read_command_line, os.sysconf('SC_CLK_TCK')))
+        self.m_report(lines)
+        if self.m_terminate:
+            self.killed = True
+            self.m_terminate()
+
+
+########### free functions #########################################################################
+def get_process_tree(root_pids, process_stats):
+    """
+    Returns a list with the depth and id of the root processes and their descendants,
+    where each process comes before its children.
+    """
+    children = {}
+    for pid, stat in sorted(process_stats.items()):
+        children.setdefault(stat['ppid'], []).append(pid)
+
+    process_tree = []
+    stack = [(0, pid) for pid in reversed(sorted(root_pids)) if pid in process_stats]
+    while stack:
+        depth, pid = stack.pop()
+        process_tree.append((depth, pid))
+        stack.extend((depth + 1, child_pid) for child_pid in reversed(children.get(pid, [])))
+    return process_tree
+
+
+def get_process_lines(process_tree, process_stats, read_command_line, ticks_per_second):
+    """
+    Returns one line with the id, the used cpu seconds and the command line of each process.
+    Child processes are indented below their parents.
+    """
+    lines = []
+    for depth, pid in process_tree:
+        command_line = read_command_line(pid) or '[{0}]'.format(process_stats[pid]['name'])
+        if len(command_line) > _MAX_COMMAND_LINE_LENGTH:
+            command_line = command_line[:_MAX_COMMAND_LINE_LENGTH] + ' ...'
+        lines.append('{0}{1:>7} {2:9.1f}s cpu  {3}'.format(
+            '  ' * depth, pid, process_stats[pid]['cpu_ticks'] / ticks_per_second, command_line))
+    return lines
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the StallWatchdog class and the functions of the stallwatchdog module.
+"""
+
+import io
+import unittest
+
+from . import stallwatchdog
+
+
+class _Clock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestStallWatchdog(unittest.TestCase):
+    """
+    The test fixture for the stallwatchdog tests.
+    """
+    def setUp(self):
+        self.clock = _Clock()
+        self.output = io.StringIO()
+        self.reports = []
+        self.terminate_calls = 0
+        self.process_stats = {
+            100: {'ppid': 1, 'name': 'ninja', 'cpu_ticks': 50},
+            101: {'ppid': 100, 'name': 'sh', 'cpu_ticks': 0},
+            102: {'ppid': 101, 'name': 'python3', 'cpu_ticks': 250},
+            200: {'ppid': 1, 'name': 'bash', 'cpu_ticks': 7},
+            }
+        self.command_lines = {100: 'ninja -j 8', 101: '/bin/sh -c "python3 generate.py"', 102: ''}
+
+    def _get_sut(self, watch_processes=True, terminate=False):
+        return stallwatchdog.StallWatchdog(
+            self.output,
+            lambda: [100],
+            60.0,
+            self.reports.append,
+            terminate=self._terminate if terminate else None,
+            read_process_stats=(lambda: self.process_stats) if watch_processes else None,
+            read_command_line=self.command_lines.get,
+            clock=self.clock)
+
+    def _terminate(self):
+        self.terminate_calls += 1
+
+    def test_stall_is_reported_once_with_the_process_tree(self):
+        sut = self._get_sut()
+        sut.check()
+
+        self.clock.time = 59.0
+        sut.check()
+        self.assertEqual(self.reports, [])
+        self.clock.time = 61.0
+        sut.check()
+        self.clock.time = 90.0
+        sut.check()
+
+        self.assertEqual(len(self.reports), 1)
+        self.assertEqual(self.reports[0][:2], ['Warning: The build produced no output and used no cpu time for 1 minutes.', 'The processes of the build are:'])
+        self.assertEqual([line.split('cpu  ')[1] for line in self.reports[0][2:]], ['ninja -j 8', '/bin/sh -c "python3 generate.py"', '[python3]'])
+        self.assertTrue(self.reports[0][4].startswith('        102'), 'The grandchild is indented')
+        self.assertFalse(sut.killed)
+
+    def test_output_and_cpu_time_reset_the_stall_period(self):
+        sut = self._get_sut()
+        sut.check()
+
+        self.clock.time = 50.0
+        sut.write('[1/2] Building CXX object a.cpp.o\n')
+        self.clock.time = 100.0
+        self.process_stats[102]['cpu_ticks'] += 1
+        sut.check()
+        self.clock.time = 150.0
+        sut.check()
+
+        self.assertEqual(self.reports, [])
+        self.assertEqual(self.output.getvalue(), '[1/2] Building CXX object a.cpp.o\n')
+
+    def test_stalled_build_is_terminated(self):
+        sut = self._get_sut(watch_processes=False, terminate=True)
+
+        self.clock.time = 60.0
+        sut.check()
+
+        self.assertEqual(self.reports, [['Warning: The build produced no output for 1 minutes.']])
+        self.assertEqual(self.terminate_calls, 1)
+        self.assertTrue(sut.killed)
+
+    def test_process_tree_lists_children_after_their_parents(self):
+        self.assertEqual(stallwatchdog.get_process_tree([200, 100, 300], self.process_stats), [(0, 100), (1, 101), (2, 102), (0, 200)])
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+Measures how long the build scripts need to start. The times are the wall clock times of
+fresh interpreters minus the time of an interpreter that does nothing, so they show the
+overhead of the scripts themselves. Each measurement is the fastest of several runs after
+one run that writes the byte code caches.
+
+The unit tests check the budgets with a tolerance for the noise of the measurement and
+are skipped on a loaded machine. The benchmark itself exits with 1 if a time exceeds
+its budget. Run it from the CPFBuildscripts directory with:
+
+    python3 -m python.startup_benchmark [<nr_runs>]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+
+_DEFAULT_NR_RUNS = 5
+# The overheads above the start of the interpreter that the scripts should not exceed.
+HELP_BUDGET_SECONDS = 0.05
+IMPORT_BUDGET_SECONDS = 0.05
+_CPF_BUILDSCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+# The modules that are only imported by the methods that need them.
+OPTIONAL_MODULES = [
+    'python.artifactcache',
+    'python.buildevents',
+    'python.buildmetrics',
+    'python.buildprogress',
+    'python.buildresources',
+    'python.buildresult',
+    'python.buildstamp',
+    'python.compilercache',
+    'python.diagnostics',
+    'python.filewatcher',
+    'python.jobpools',
+    'python.jobserver',
+    'python.outputreader',
+    'python.processtree',
+    'python.resourcesampler',
+    'python.stallwatchdog',
+    'python.testcache',
+    'python.testimpact',
+    'python.testrunner',
+    'python.wrapperprofile',
+    'concurrent.futures',
+    'datetime',
+    'gzip',
+    'hashlib',
+    'json',
+    'platform',
+    'shutil',
+    'socket',
+    'statistics',
+    'tempfile',
+    ]
+
+
+def get_script_code(script_name):
+    """
+    Returns the code of a script template with the directory of the build scripts filled in.
+    """
+    with open(os.path.join(_CPF_BUILDSCRIPTS_DIR, script_name + '.in'), encoding='utf-8') as file:
+        return file.read().replace('@CPFBuildscripts_DIR@', _CPF_BUILDSCRIPTS_DIR.replace('\\', '/'))
+
+
+def get_imported_modules(code):
+    """
+    Returns the names of the modules that are loaded after a fresh interpreter ran the code.
+    """
+    code += '\nimport sys\nprint("\\n".join(sorted(sys.modules)))\n'
+    return _run([sys.executable, '-c', code]).splitlines()
+
+
+def measure_seconds(arguments, nr_runs=_DEFAULT_NR_RUNS):
+    """
+    Returns the shortest time in seconds of running the interpreter with the arguments.
+    """
+    _run([sys.executable] + arguments)
+    durations = []
+    for _ in range(nr_runs):
+        start_time = time.perf_counter()
+        _run([sys.executable] + arguments)
+        durations.append(time.perf_counter() - start_time)
+    return min(durations)
+
+
+def get_overheads(nr_runs=_DEFAULT_NR_RUNS):
+    """
+    Returns the seconds that printing the help of 3_Make.py and importing the BuildAutomat,
+    which each run of a script does, take longer than starting the interpreter.
+    """
+    interpreter_seconds = measure_seconds(['-c', 'pass'], nr_runs)
+    help_seconds = measure_seconds(['-c', get_script_code('3_Make.py'), '--help'], nr_runs)
+    import_seconds = measure_seconds(['-c', 'from python import buildautomat'], nr_runs)
+    return help_seconds - interpreter_seconds, import_seconds - interpreter_seconds
+
+
+def _run(command):
+    # The byte code caches are written, like they are for the copied scripts.
+    environment = dict(os.environ)
+    environment.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run(command, cwd=_CPF_BUILDSCRIPTS_DIR, env=environment, stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+
+
+def main():
+    nr_runs = int(sys.argv[1]) if len(sys.argv) > 1 else _DEFAULT_NR_RUNS
+    help_seconds, import_seconds = get_overheads(nr_runs)
+    print('3_Make.py --help:        {0:6.1f} ms (budget {1:.0f} ms)'.format(help_seconds * 1000, HELP_BUDGET_SECONDS * 1000))
+    print('Importing BuildAutomat:  {0:6.1f} ms (budget {1:.0f} ms)'.format(import_seconds * 1000, IMPORT_BUDGET_SECONDS * 1000))
+    if help_seconds > HELP_BUDGET_SECONDS or import_seconds > IMPORT_BUDGET_SECONDS:
+        print('Error: The startup of the scripts exceeds its budget.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
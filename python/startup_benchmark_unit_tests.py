@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""
+This module contains the tests that keep the startup of the build scripts fast. They check
+the modules that the scripts load and the startup times that the startup_benchmark module
+measures.
+"""
+
+import os
+import unittest
+
+from . import startup_benchmark
+
+
+# The measured times may exceed the budgets by this factor, because of the noise of the measurement.
+_BUDGET_TOLERANCE = 1.5
+
+
+class TestStartup(unittest.TestCase):
+    """
+    The test fixture for the startup tests.
+    """
+    def test_importing_the_build_automat_does_not_load_optional_modules(self):
+        modules = startup_benchmark.get_imported_modules('from python import buildautomat')
+
+        self.assertEqual([module for module in startup_benchmark.OPTIONAL_MODULES if module in modules], [])
+
+    def test_scripts_parse_their_options_before_loading_the_build_automat(self):
+        for script_name in ['1_Configure.py', '2_Generate.py', '3_Make.py', '4_Pipeline.py']:
+            # Only the module level code runs, which is what --help runs before it exits.
+            code = startup_benchmark.get_script_code(script_name).replace('if __name__ == "__main__":', 'if False:')
+
+            modules = startup_benchmark.get_imported_modules(code)
+
+            self.assertIn('python.docoptcache', modules)
+            self.assertNotIn('python.buildautomat', modules, script_name)
+
+    @unittest.skipIf(os.environ.get('CPF_SKIP_STARTUP_BUDGET'), 'The startup budget is disabled with CPF_SKIP_STARTUP_BUDGET.')
+    def test_startup_stays_within_the_budgets(self):
+        if hasattr(os, 'getloadavg') and os.getloadavg()[0] > (os.cpu_count() or 1):
+            self.skipTest('The machine is too busy for measuring the startup times.')
+
+        help_seconds, import_seconds = startup_benchmark.get_overheads()
+
+        self.assertLess(help_seconds, startup_benchmark.HELP_BUDGET_SECONDS * _BUDGET_TOLERANCE)
+        self.assertLess(import_seconds, startup_benchmark.IMPORT_BUDGET_SECONDS * _BUDGET_TOLERANCE)
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+"""
+This module provides the TestResultCache class which remembers passed test
+executables by a hash of everything that can change their results.
+"""
+
+import hashlib
+import json
+
+from . import testimpact
+from . import testrunner
+
+
+_ENTRY_ENDING = '.json'
+_SHARED_LIBRARY_ENDINGS = ['.so', '.dll', '.dylib']
+# Only these environment variables are part of the key. Others like build numbers
+# change with every CI job and would make the cache useless.
+_KEY_ENVIRONMENT_VARIABLES = ['PATH', 'LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH']
+_KEY_ENVIRONMENT_PREFIXES = ['GTEST_', 'CPF_']
+
+
+class TestResultCache:
+    """
+    A directory with one file per passed test executable. The name of the file is a hash of
+    the test executable, its shared-library dependencies, the files in the source directory
+    of its package, which contain the fixture inputs, the test environment and the arguments.
+    Entries that were not used recently are evicted when the cache exceeds its size limit.
+    """
+    def __init__(self, fs_access, cache_dir, max_size_bytes):
+        self.m_fs_access = fs_access
+        self.m_cache_dir = cache_dir
+        self.m_max_size_bytes = max_size_bytes
+        self.m_dependency_graph = None
+        self.m_sources_dir = None
+        self.hits = 0
+        self.misses = 0
+
+    def set_dependency_information(self, dependency_graph, sources_dir):
+        """
+        The target dependency graph is used to find the shared libraries that a test executable
+        depends on. Without it all shared libraries next to the executable are used.
+        """
+        self.m_dependency_graph = dependency_graph
+        self.m_sources_dir = sources_dir
+
+    def get_key(self, executable, environment, arguments):
+        """
+        Returns the hash of all inputs of a test run.
+        """
+        digest = hashlib.sha256()
+        digest.update(str(arguments).encode('utf-8'))
+
+        for variable in sorted(environment):
+            if variable in _KEY_ENVIRONMENT_VARIABLES or any(variable.startswith(prefix) for prefix in _KEY_ENVIRONMENT_PREFIXES):
+                digest.update('{0}={1}\n'.format(variable, environment[variable]).encode('utf-8'))
+
+        for path in [executable] + self._get_shared_libraries(executable) + self._get_package_source_files(executable):
+            digest.update(str(path).encode('utf-8'))
+            digest.update(self.m_fs_access.get_file_hash(path).encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        """
+        Returns the cached entry for the key or None. A hit marks the entry as recently used.
+        """
+        entry_file = self._get_entry_file(key)
+        if not self.m_fs_access.isfile(entry_file):
+            self.misses += 1
+            return None
+        try:
+            entry = json.loads(self.m_fs_access.readfile(entry_file))
+        except ValueError:
+            self.misses += 1
+            return None
+        self.m_fs_access.touch_file(entry_file)
+        self.hits += 1
+        return entry
+
+    def store(self, key, entry):
+        """
+        Adds a passed test executable to the cache and evicts the least recently used
+        entries if the cache became too big.
+        """
+        self.m_fs_access.mkdirs(self.m_cache_dir)
+        self.m_fs_access.writefile(self._get_entry_file(key), json.dumps(entry))
+        self._evict()
+
+    def _get_entry_file(self, key):
+        return self.m_cache_dir / (key + _ENTRY_ENDING)
+
+    def _evict(self):
+        entries = []
+        for entry in self.m_fs_access.listdir(self.m_cache_dir):
+            if entry.endswith(_ENTRY_ENDING):
+                entry_stat = self.m_fs_access.stat(self.m_cache_dir / entry)
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.m_max_size_bytes:
+                break
+            self.m_fs_access.remove(self.m_cache_dir / entry)
+            total_size -= size
+
+    def _get_shared_libraries(self, executable):
+        binary_dir = executable.parent
+        shared_libraries = [
+            entry for entry in sorted(self.m_fs_access.listdir(binary_dir))
+            if any(entry.endswith(ending) or (ending + '.') in entry for ending in _SHARED_LIBRARY_ENDINGS)]
+
+        if self.m_dependency_graph is not None:
+            tests_target = testrunner.get_package_name(executable) + '_tests'
+            dependencies = testimpact.get_dependencies(tests_target, self.m_dependency_graph)
+            # Libraries that can not be assigned to a target are kept to be on the safe side.
+            shared_libraries = [
+                entry for entry in shared_libraries
+                if _get_library_target_name(entry) in dependencies or _get_library_target_name(entry) not in self.m_dependency_graph]
+
+        return [binary_dir / entry for entry in shared_libraries]
+
+    def _get_package_source_files(self, executable):
+        if self.m_sources_dir is None:
+            return []
+        package_dir = self.m_sources_dir / testrunner.get_package_name(executable)
+        if not self.m_fs_access.isdir(package_dir):
+            return []
+        return self._get_files_recursively(package_dir)
+
+    def _get_files_recursively(self, directory):
+        files = []
+        for entry in sorted(self.m_fs_access.listdir(directory)):
+            if entry.startswith('.'):
+                continue # Skip .git and other hidden files.
+            path = directory / entry
+            if self.m_fs_access.isdir(path):
+                files.extend(self._get_files_recursively(path))
+            elif self.m_fs_access.isfile(path):
+                files.append(path)
+        return files
+
+
+########### free functions #########################################################################
+def _get_library_target_name(file_name):
+    """
+    Returns the target name for library file names like libMyLib.so.1.2.3 or MyLib.dll.
+    """
+    name = file_name
+    for ending in _SHARED_LIBRARY_ENDINGS:
+        if ending + '.' in name:
+            name = name[:name.index(ending + '.')]
+        elif name.endswith(ending):
+            name = name[:-len(ending)]
+    if name.startswith('lib'):
+        name = name[len('lib'):]
+    return name
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the TestResultCache class.
+"""
+
+import unittest
+from pathlib import PurePosixPath
+
+from . import testcache
+from . import testrunner
+from . import testimpact
+from . import miscosaccess
+from . import filesystemaccess
+
+
+_BINARY_DIR = PurePosixPath('/MyCPFProject/Generated/MyConfig/BuildStage/Debug')
+_SOURCES_DIR = PurePosixPath('/MyCPFProject/Sources')
+_CACHE_DIR = PurePosixPath('/MyCPFProject/Generated/CPFTestResultCache')
+_JUNIT_FILE = '/MyCPFProject/Generated/MyConfig/CPFTestResults.xml'
+
+
+class TestTestResultCache(unittest.TestCase):
+    """
+    The test fixture for the TestResultCache tests.
+    """
+    def setUp(self):
+        self.fs_access = filesystemaccess.FakeFileSystemAccess()
+        self.fs_access.addfile(_BINARY_DIR / 'PackageA_tests', 'tests binary')
+        self.fs_access.addfile(_BINARY_DIR / 'libPackageA.so', 'library A')
+        self.fs_access.addfile(_BINARY_DIR / 'libPackageB.so', 'library B')
+        self.fs_access.addfile(_SOURCES_DIR / 'PackageA/fixtures/input.txt', 'fixture')
+        self.graph = testimpact.parse_dependency_graph(
+            '"node0" [ label = "PackageA_tests" ];\n"node1" [ label = "PackageA" ];\n"node2" [ label = "PackageB" ];\n"node0" -> "node1"\n')
+        self.sut = testcache.TestResultCache(self.fs_access, _CACHE_DIR, 1000)
+        self.sut.set_dependency_information(self.graph, _SOURCES_DIR)
+
+    def _get_key(self, environment=None):
+        return self.sut.get_key(_BINARY_DIR / 'PackageA_tests', environment or {'PATH': '/bin', 'BUILD_NUMBER': '1'}, None)
+
+    def test_key_depends_on_the_executable_its_libraries_and_fixtures(self):
+        key = self._get_key()
+
+        self.fs_access.writefile(_BINARY_DIR / 'libPackageB.so', 'changed library B')
+        self.assertEqual(self._get_key(), key, 'PackageA_tests does not depend on PackageB')
+        self.assertEqual(self._get_key({'PATH': '/bin', 'BUILD_NUMBER': '2'}), key, 'Unrelated environment variables are ignored')
+
+        self.fs_access.writefile(_BINARY_DIR / 'libPackageA.so', 'changed library A')
+        key_changed_library = self._get_key()
+        self.assertNotEqual(key_changed_library, key)
+
+        self.fs_access.writefile(_SOURCES_DIR / 'PackageA/fixtures/input.txt', 'changed fixture')
+        self.assertNotEqual(self._get_key(), key_changed_library)
+
+        self.assertNotEqual(self._get_key({'PATH': '/usr/bin'}), self._get_key())
+
+    def test_store_evicts_the_least_recently_used_entries(self):
+        # setup
+        self.sut.store('key1', {'testsuites': 'a' * 300})
+        self.sut.store('key2', {'testsuites': 'b' * 300})
+        self.sut.store('key3', {'testsuites': 'c' * 300})
+        self.assertIsNotNone(self.sut.lookup('key1'))
+
+        # execute
+        self.sut.store('key4', {'testsuites': 'd' * 300})
+
+        # verify
+        self.assertIsNotNone(self.sut.lookup('key1'))
+        self.assertIsNone(self.sut.lookup('key2'))
+        self.assertIsNotNone(self.sut.lookup('key3'))
+        self.assertIsNotNone(self.sut.lookup('key4'))
+
+    def test_test_runner_skips_executables_with_a_cached_pass(self):
+        # setup
+        os_access = miscosaccess.FakeMiscOsAccess(self.fs_access, '/MyCPFProject', {}, 'Linux', 4)
+        runner = testrunner.TestRunner(os_access, self.fs_access, '/MyCPFProject/Generated/MyConfig/CPFTestDurations.json', 4)
+        self.assertTrue(runner.run([_BINARY_DIR / 'PackageA_tests'], _JUNIT_FILE, result_cache=self.sut))
+        self.assertEqual(len(os_access.execute_command_output_args), 1)
+
+        # execute
+        self.assertTrue(runner.run([_BINARY_DIR / 'PackageA_tests'], _JUNIT_FILE, result_cache=self.sut))
+
+        # verify
+        self.assertEqual(len(os_access.execute_command_output_args), 1)
+        self.assertIn('cached PASS PackageA_tests', os_access.console_output)
+        self.assertIn('name="PackageA_tests"', self.fs_access.readfile(_JUNIT_FILE))
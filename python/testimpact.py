@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+"""
+This module provides the TestImpactAnalysis class which decides which test
+packages need to run after a set of source files changed.
+"""
+
+import re
+
+from . import miscosaccess
+
+
+_NODE_REGEX = re.compile(r'^\s*"(\w+)"\s*\[\s*label\s*=\s*"([^"]*)"')
+_EDGE_REGEX = re.compile(r'^\s*"(\w+)"\s*->\s*"(\w+)"')
+_TESTS_TARGET_SUFFIX = '_tests'
+_FIXTURES_TARGET_SUFFIX = '_fixtures'
+
+
+class TestImpactAnalysis:
+    """
+    Uses the target dependency graph that is written by the generate step and the
+    changed files from git to find the test packages whose binaries or fixtures depend
+    on changed code. Changes that can not be assigned to a package that is part of the
+    target graph are considered to affect all test packages.
+    """
+    def __init__(self, os_access, fs_access, file_locations):
+        self.m_os_access = os_access
+        self.m_fs_access = fs_access
+        self.m_file_locations = file_locations
+        self.report = []
+
+    def get_affected_test_packages(self, config_name, base_ref):
+        """
+        Returns the sorted list of packages whose tests must run because of the changes
+        since the given git reference. The reasons for running or skipping each package
+        are stored in the report member.
+        """
+        graph = parse_dependency_graph(self.m_fs_access.readfile(self._get_dot_file(config_name)))
+        test_packages = sorted(label[:-len(_TESTS_TARGET_SUFFIX)] for label in graph if label.endswith(_TESTS_TARGET_SUFFIX))
+        changed_files = self.get_changed_files(base_ref)
+
+        self.report = ['Test impact analysis for the changes since {0} ({1} changed files):'.format(base_ref, len(changed_files))]
+
+        changed_packages, unassigned_files = self._get_changed_packages(changed_files, graph)
+        if unassigned_files:
+            self.report.append('  All test packages are affected because these changes can not be assigned to a package: {0}'.format(', '.join(unassigned_files[:5])))
+            for package in test_packages:
+                self.report.append('  run   {0}'.format(package))
+            return test_packages
+
+        affected_packages = []
+        for package in test_packages:
+            dependencies = set()
+            for target in _get_package_targets(package, graph):
+                dependencies |= get_dependencies(target, graph)
+            reasons = sorted(changed_package for changed_package in changed_packages if _get_package_targets(changed_package, graph) & dependencies)
+            if reasons:
+                affected_packages.append(package)
+                self.report.append('  run   {0} (depends on the changed packages {1})'.format(package, ', '.join(reasons)))
+            else:
+                self.report.append('  skip  {0} (does not depend on any of the changed packages)'.format(package))
+
+        return affected_packages
+
+    def get_changed_files(self, base_ref):
+        """
+        Returns the files that differ from the given git reference, including uncommitted
+        and untracked files. The paths are relative to the CPF root directory.
+        """
+        root_dir = self.m_file_locations.get_full_path_cpf_root()
+        changed_files = self.m_os_access.execute_command_output(
+            'git diff --name-only {0}'.format(base_ref),
+            cwd=root_dir,
+            print_output=miscosaccess.OutputMode.ON_ERROR)
+        untracked_files = self.m_os_access.execute_command_output(
+            'git ls-files --others --exclude-standard',
+            cwd=root_dir,
+            print_output=miscosaccess.OutputMode.ON_ERROR)
+        return sorted(set(path for path in changed_files + untracked_files if path))
+
+    def _get_dot_file(self, config_name):
+        dot_file = self.m_file_locations.get_full_path_config_makefile_folder(config_name) / self.m_file_locations.TARGET_DEPENDENCIES_DOT_FILE_NAME
+        if not self.m_fs_access.isfile(dot_file):
+            raise Exception('Error: The target dependency graph {0} does not exist. Run 2_Generate.py to create it.'.format(dot_file))
+        return dot_file
+
+    def _get_changed_packages(self, changed_files, graph):
+        """
+        Returns the packages that contain changed files and a list of changed files that
+        do not belong to a package of the target graph.
+        """
+        sources_dir = self.m_file_locations.CMAKELISTS_ROOT_DIR + '/'
+        changed_packages = set()
+        unassigned_files = []
+        for changed_file in changed_files:
+            path = changed_file.replace('\\', '/')
+            package = None
+            if path.startswith(sources_dir):
+                # A changed git submodule is listed with the path of its directory.
+                package = path[len(sources_dir):].split('/')[0]
+            if package and _get_package_targets(package, graph):
+                changed_packages.add(package)
+            else:
+                unassigned_files.append(changed_file)
+        return changed_packages, unassigned_files
+
+
+########### free functions #########################################################################
+def parse_dependency_graph(dot_content):
+    """
+    Returns a dictionary that maps the name of each target in the graphviz file that
+    is written by cmake --graphviz to the set of its direct dependencies.
+    """
+    labels = {}
+    edges = []
+    for line in dot_content.splitlines():
+        node_match = _NODE_REGEX.match(line)
+        if node_match:
+            labels[node_match.group(1)] = node_match.group(2)
+            continue
+        edge_match = _EDGE_REGEX.match(line)
+        if edge_match:
+            edges.append((edge_match.group(1), edge_match.group(2)))
+
+    graph = {label: set() for label in labels.values()}
+    for source, destination in edges:
+        if source in labels and destination in labels:
+            graph[labels[source]].add(labels[destination])
+    return graph
+
+
+def _get_package_targets(package, graph):
+    targets = [package, package + _TESTS_TARGET_SUFFIX, package + _FIXTURES_TARGET_SUFFIX]
+    return set(target for target in targets if target in graph)
+
+
+def get_dependencies(target, graph):
+    """
+    Returns the target and all of its direct and indirect dependencies.
+    """
+    dependencies = set()
+    stack = [target]
+    while stack:
+        current = stack.pop()
+        if current not in dependencies:
+            dependencies.add(current)
+            stack.extend(graph.get(current, []))
+    return dependencies
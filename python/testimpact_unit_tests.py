@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the TestImpactAnalysis class.
+"""
+
+import unittest
+
+from . import testimpact
+from . import miscosaccess
+from . import filesystemaccess
+from . import filelocations
+
+
+# The format of the file that is written by cmake --graphviz
+_DOT_FILE_CONTENT = """digraph "MyCPFProject" {
+node [
+  fontsize = "12"
+];
+    "node0" [ label = "PackageA", shape = octagon ];
+    "node1" [ label = "PackageA_tests", shape = egg ];
+    "node1" -> "node0" [ style = dotted ] // PackageA_tests -> PackageA
+    "node2" [ label = "PackageB", shape = octagon ];
+    "node0" -> "node2" [ style = dotted ] // PackageA -> PackageB
+    "node3" [ label = "PackageB_tests", shape = egg ];
+    "node3" -> "node2" [ style = dotted ] // PackageB_tests -> PackageB
+    "node4" [ label = "PackageC_fixtures", shape = octagon ];
+    "node5" [ label = "PackageC_tests", shape = egg ];
+    "node5" -> "node4" [ style = dotted ] // PackageC_tests -> PackageC_fixtures
+    "node6" [ label = "pthread", shape = septagon ];
+}
+"""
+
+
+class TestTestImpactAnalysis(unittest.TestCase):
+    """
+    The test fixture for the TestImpactAnalysis tests.
+    """
+    def setUp(self):
+        self.locations = filelocations.FileLocations('/MyCPFProject', '/MyCPFProject/Sources/CPFCMake', '/MyCPFProject/Sources/CIBuildConfigurations')
+        self.fs_access = filesystemaccess.FakeFileSystemAccess()
+        self.fs_access.addfile(self.locations.get_full_path_config_makefile_folder('MyConfig') / 'CPFDependencies.dot', _DOT_FILE_CONTENT)
+        self.os_access = miscosaccess.FakeMiscOsAccess(self.fs_access, '/MyCPFProject', {}, 'Linux', 4)
+        self.os_access.execute_command_output_function = self._fake_git
+        self.changed_files = []
+
+    def _fake_git(self, command, cwd, env):
+        if command.startswith('git diff'):
+            return self.changed_files
+        return []
+
+    def test_parse_dependency_graph_returns_the_direct_dependencies(self):
+        graph = testimpact.parse_dependency_graph(_DOT_FILE_CONTENT)
+
+        self.assertEqual(graph['PackageA'], {'PackageB'})
+        self.assertEqual(graph['PackageA_tests'], {'PackageA'})
+        self.assertEqual(graph['PackageB_tests'], {'PackageB'})
+        self.assertEqual(graph['pthread'], set())
+
+    def test_only_the_dependent_test_packages_are_affected(self):
+        # setup
+        self.changed_files = ['Sources/PackageB/b.cpp']
+        sut = testimpact.TestImpactAnalysis(self.os_access, self.fs_access, self.locations)
+
+        # execute
+        affected_packages = sut.get_affected_test_packages('MyConfig', 'origin/master')
+
+        # verify
+        self.assertEqual(affected_packages, ['PackageA', 'PackageB'])
+        self.assertIn('  skip  PackageC (does not depend on any of the changed packages)', sut.report)
+        self.assertEqual(self.os_access.execute_command_output_args[0][1], 'git diff --name-only origin/master')
+
+    def test_changed_fixtures_affect_their_test_package(self):
+        # setup
+        self.changed_files = ['Sources/PackageC/fixtures/data.txt']
+        sut = testimpact.TestImpactAnalysis(self.os_access, self.fs_access, self.locations)
+
+        # execute and verify
+        self.assertEqual(sut.get_affected_test_packages('MyConfig', 'HEAD'), ['PackageC'])
+
+    def test_changes_outside_of_packages_affect_all_test_packages(self):
+        # setup
+        self.changed_files = ['Sources/PackageB/b.cpp', 'Sources/CPFCMake/cpfInit.cmake']
+        sut = testimpact.TestImpactAnalysis(self.os_access, self.fs_access, self.locations)
+
+        # execute and verify
+        self.assertEqual(sut.get_affected_test_packages('MyConfig', 'HEAD'), ['PackageA', 'PackageB', 'PackageC'])
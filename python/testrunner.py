@@ -0,0 +1,282 @@
+#!/usr/bin/python3
+"""
+This module provides the TestRunner class which runs the test executables
+of a configuration in parallel.
+"""
+
+import concurrent.futures
+import json
+import math
+import time
+import xml.etree.ElementTree as ElementTree
+
+from . import miscosaccess
+
+
+_TEST_EXECUTABLE_ENDINGS = ['_tests', '_tests.exe']
+# Executables that are expected to run shorter than this are never split into shards.
+_MIN_SHARDED_SECONDS = 5.0
+
+
+class TestJob:
+    """
+    One call of a test executable. Sharded executables are split into multiple jobs.
+    """
+    def __init__(self, executable, shard_index, total_shards, expected_duration):
+        self.executable = executable
+        self.shard_index = shard_index
+        self.total_shards = total_shards
+        self.expected_duration = expected_duration
+        # Results
+        self.succeeded = None
+        self.duration = None
+        self.output = ''
+        self.xml_file = None
+        self.test_suites = []
+
+    def get_name(self):
+        name = _get_file_name(self.executable)
+        if self.total_shards > 1:
+            name += ' (shard {0}/{1})'.format(self.shard_index + 1, self.total_shards)
+        return name
+
+
+class TestRunner:
+    """
+    Runs the <package>_tests executables of a configuration with a pool of processes.
+    The executables with the longest recorded durations are started first and big gtest
+    executables are split into shards with the GTEST_TOTAL_SHARDS and GTEST_SHARD_INDEX
+    environment variables. The gtest xml outputs are merged into one JUnit xml file.
+    """
+    def __init__(self, os_access, fs_access, durations_file, nr_processes):
+        self.m_os_access = os_access
+        self.m_fs_access = fs_access
+        self.m_durations_file = durations_file
+        self.m_nr_processes = max(1, nr_processes)
+
+    def find_test_executables(self, binary_dirs):
+        """
+        Returns the paths of all test executables in the given directories.
+        """
+        executables = []
+        for binary_dir in binary_dirs:
+            if not self.m_fs_access.isdir(binary_dir):
+                continue
+            for entry in sorted(self.m_fs_access.listdir(binary_dir)):
+                if any(entry.endswith(ending) for ending in _TEST_EXECUTABLE_ENDINGS) and self.m_fs_access.isfile(binary_dir / entry):
+                    executables.append(binary_dir / entry)
+        return executables
+
+    def run(self, executables, junit_file, gtest_filter=None, result_cache=None):
+        """
+        Runs the given test executables and writes the merged results to junit_file.
+        Executables that passed before with the same inputs are skipped when a result_cache
+        is given. Returns true if all tests passed.
+        """
+        if not executables:
+            self.m_os_access.print_console('No test executables were found.')
+            return True
+
+        start_time = time.perf_counter()
+        cached_test_suites, cache_keys = self._get_cached_results(executables, gtest_filter, result_cache)
+        executables_to_run = [executable for executable in executables if executable in cache_keys]
+
+        durations = self._read_durations()
+        jobs = self._get_jobs(executables_to_run, durations)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.m_nr_processes) as executor:
+            # The executor starts the jobs in submission order, which gives us longest-first scheduling.
+            futures = [executor.submit(self._run_job, job, job_index, junit_file, gtest_filter) for job_index, job in enumerate(jobs)]
+            for future in concurrent.futures.as_completed(futures):
+                job = future.result()
+                self._print_job_result(job)
+
+        self._write_durations(durations, jobs)
+        for job in jobs:
+            job.test_suites = self._read_test_suites(job)
+
+        if result_cache:
+            self._store_passed_results(executables_to_run, jobs, cache_keys, result_cache)
+
+        self.m_fs_access.writefile(junit_file, _get_merged_junit_xml(cached_test_suites + [suite for job in jobs for suite in job.test_suites]))
+
+        failed_jobs = [job for job in jobs if not job.succeeded]
+        self.m_os_access.print_console('Ran {0} test jobs of {1} executables in {2:.1f} s. {3} executables were cached. {4} failed. Results: {5}'.format(
+            len(jobs), len(executables_to_run), time.perf_counter() - start_time, len(executables) - len(executables_to_run), len(failed_jobs), junit_file))
+        return not failed_jobs
+
+    def _get_cached_results(self, executables, gtest_filter, result_cache):
+        """
+        Returns the test suites of the executables that have a cached pass and a dictionary
+        with the cache keys of the executables that need to run.
+        """
+        cached_test_suites = []
+        cache_keys = {}
+        environment = self.m_os_access.environment()
+        for executable in executables:
+            if result_cache is None:
+                cache_keys[executable] = None
+                continue
+
+            key = result_cache.get_key(executable, environment, gtest_filter)
+            entry = result_cache.lookup(key)
+            if entry is None:
+                cache_keys[executable] = key
+            else:
+                self.m_os_access.print_console('cached PASS {0}'.format(_get_file_name(executable)))
+                cached_test_suites.extend(ElementTree.fromstring(entry['testsuites']).findall('testsuite'))
+        return cached_test_suites, cache_keys
+
+    def _store_passed_results(self, executables, jobs, cache_keys, result_cache):
+        for executable in executables:
+            executable_jobs = [job for job in jobs if job.executable == executable]
+            if all(job.succeeded for job in executable_jobs):
+                test_suites = ElementTree.Element('testsuites')
+                test_suites.extend([suite for job in executable_jobs for suite in job.test_suites])
+                result_cache.store(cache_keys[executable], {
+                    'executable': str(executable),
+                    'seconds': sum(job.duration for job in executable_jobs),
+                    'testsuites': ElementTree.tostring(test_suites, encoding='unicode'),
+                    })
+
+    def _get_jobs(self, executables, durations):
+        """
+        Returns the test jobs sorted by their expected duration. Executables without a
+        recorded duration are started first because they may be long running.
+        """
+        known_durations = [durations[str(executable)]['seconds'] for executable in executables if str(executable) in durations]
+        ideal_duration = sum(known_durations) / self.m_nr_processes
+
+        jobs = []
+        for executable in executables:
+            record = durations.get(str(executable))
+            if record is None:
+                jobs.append(TestJob(executable, 0, 1, math.inf))
+                continue
+
+            total_shards = 1
+            if record.get('gtest') and record['seconds'] > _MIN_SHARDED_SECONDS and ideal_duration > 0:
+                total_shards = min(self.m_nr_processes, math.ceil(record['seconds'] / ideal_duration))
+            for shard_index in range(total_shards):
+                jobs.append(TestJob(executable, shard_index, total_shards, record['seconds'] / total_shards))
+
+        jobs.sort(key=lambda job: job.expected_duration, reverse=True)
+        return jobs
+
+    def _run_job(self, job, job_index, junit_file, gtest_filter):
+        # The job index keeps the files of executables with the same name in different folders apart.
+        job.xml_file = str(junit_file) + '.{0}.{1}.{2}.xml'.format(job_index, _get_file_name(job.executable), job.shard_index)
+        command = '"{0}" --gtest_output=xml:"{1}"'.format(job.executable, job.xml_file)
+        if gtest_filter:
+            command += ' --gtest_filter="{0}"'.format(gtest_filter)
+
+        env = self.m_os_access.environment()
+        if job.total_shards > 1:
+            env['GTEST_TOTAL_SHARDS'] = str(job.total_shards)
+            env['GTEST_SHARD_INDEX'] = str(job.shard_index)
+
+        start_time = time.perf_counter()
+        try:
+            output = self.m_os_access.execute_command_output(
+                command,
+                cwd=job.executable.parent,
+                print_output=miscosaccess.OutputMode.NEVER,
+                env=env)
+            job.output = '\n'.join(output)
+            job.succeeded = True
+        except miscosaccess.CalledProcessError as error:
+            job.output = error.stdout
+            job.succeeded = False
+        job.duration = time.perf_counter() - start_time
+        return job
+
+    def _print_job_result(self, job):
+        status = 'PASS' if job.succeeded else 'FAIL'
+        self.m_os_access.print_console('{0} {1} ({2:.1f} s)'.format(status, job.get_name(), job.duration))
+        if not job.succeeded:
+            self.m_os_access.print_console(job.output)
+
+    def _read_durations(self):
+        if self.m_fs_access.isfile(self.m_durations_file):
+            try:
+                return json.loads(self.m_fs_access.readfile(self.m_durations_file))
+            except ValueError:
+                pass # A broken file only costs us the scheduling information.
+        return {}
+
+    def _write_durations(self, durations, jobs):
+        """
+        Stores the summed up duration of all shards of each executable.
+        """
+        new_durations = {}
+        for job in jobs:
+            record = new_durations.setdefault(str(job.executable), {'seconds': 0.0, 'gtest': True})
+            record['seconds'] += job.duration
+            record['gtest'] = record['gtest'] and self._has_xml_output(job)
+        durations.update(new_durations)
+        self.m_fs_access.writefile(self.m_durations_file, json.dumps(durations, indent=4))
+
+    def _has_xml_output(self, job):
+        return self.m_fs_access.isfile(job.xml_file)
+
+    def _read_test_suites(self, job):
+        """
+        Returns the testsuite elements of the gtest xml output of a job. Jobs that created no
+        xml output get a testsuite with one testcase that represents the whole call.
+        """
+        test_suites = None
+        if self._has_xml_output(job):
+            try:
+                test_suites = ElementTree.fromstring(self.m_fs_access.readfile(job.xml_file)).findall('testsuite')
+            except ElementTree.ParseError:
+                test_suites = None
+            self.m_fs_access.remove(job.xml_file)
+
+        if test_suites is None:
+            test_suites = [_get_job_test_suite(job)]
+        return test_suites
+
+
+########### free functions #########################################################################
+def get_package_name(executable):
+    """
+    Returns the name of the package that owns the given test executable.
+    """
+    file_name = _get_file_name(executable)
+    for ending in _TEST_EXECUTABLE_ENDINGS:
+        if file_name.endswith(ending):
+            return file_name[:-len(ending)]
+    return file_name
+
+
+def _get_file_name(path):
+    return str(path).replace('\\', '/').split('/')[-1]
+
+
+def _get_merged_junit_xml(test_suites):
+    """
+    Combines the given testsuite elements into one testsuites document.
+    """
+    merged_root = ElementTree.Element('testsuites', {'name': 'AllTests'})
+    merged_root.extend(test_suites)
+
+    for counter in ['tests', 'failures', 'errors', 'disabled', 'skipped']:
+        merged_root.set(counter, str(sum(int(suite.get(counter, '0')) for suite in merged_root)))
+    merged_root.set('time', '{0:.3f}'.format(sum(float(suite.get('time', '0')) for suite in merged_root)))
+
+    return ElementTree.tostring(merged_root, encoding='unicode')
+
+
+def _get_job_test_suite(job):
+    test_suite = ElementTree.Element('testsuite', {
+        'name': job.get_name(),
+        'tests': '1',
+        'failures': '0' if job.succeeded else '1',
+        'errors': '0',
+        'time': '{0:.3f}'.format(job.duration),
+        })
+    test_case = ElementTree.SubElement(test_suite, 'testcase', {'name': job.get_name(), 'time': '{0:.3f}'.format(job.duration)})
+    if not job.succeeded:
+        failure = ElementTree.SubElement(test_case, 'failure', {'message': 'The test executable failed.'})
+        failure.text = job.output
+    return test_suite
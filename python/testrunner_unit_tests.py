@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the TestRunner class.
+"""
+
+import unittest
+import json
+from pathlib import PurePosixPath
+
+from . import testrunner
+from . import miscosaccess
+from . import filesystemaccess
+
+
+_BINARY_DIR = PurePosixPath('/MyCPFProject/Generated/MyConfig/BuildStage/Debug')
+_DURATIONS_FILE = '/MyCPFProject/Generated/MyConfig/CPFTestDurations.json'
+_JUNIT_FILE = '/MyCPFProject/Generated/MyConfig/CPFTestResults.xml'
+
+_GTEST_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<testsuites tests="2" failures="0" errors="0" time="0.5" name="AllTests">
+  <testsuite name="{0}" tests="2" failures="0" errors="0" time="0.5">
+    <testcase name="test1" time="0.2" />
+    <testcase name="test2" time="0.3" />
+  </testsuite>
+</testsuites>
+"""
+
+
+class TestTestRunner(unittest.TestCase):
+    """
+    The test fixture for the TestRunner tests.
+    """
+    def setUp(self):
+        self.fs_access = filesystemaccess.FakeFileSystemAccess()
+        self.fs_access.addfile(_BINARY_DIR / 'PackageA_tests', 'binary')
+        self.fs_access.addfile(_BINARY_DIR / 'PackageB_tests', 'binary')
+        self.fs_access.addfile(_BINARY_DIR / 'PackageA', 'binary')
+        self.os_access = miscosaccess.FakeMiscOsAccess(self.fs_access, '/MyCPFProject', {'PATH': '/bin'}, 'Linux', 4)
+        self.os_access.execute_command_output_function = self._fake_run_test
+        self.failing_executable = None
+
+    def _fake_run_test(self, command, cwd, env):
+        xml_file = command.split('--gtest_output=xml:"')[1].split('"')[0]
+        executable = command.split('"')[1]
+        self.fs_access.addfile(xml_file, _GTEST_XML.format(executable.split('/')[-1] + env.get('GTEST_SHARD_INDEX', '')))
+        if executable.endswith(str(self.failing_executable)):
+            raise miscosaccess.CalledProcessError(1, command, 'Test failed!', cwd)
+        return ['Test output']
+
+    def test_find_test_executables_returns_only_test_executables(self):
+        # setup
+        sut = testrunner.TestRunner(self.os_access, self.fs_access, _DURATIONS_FILE, 4)
+
+        # execute
+        executables = sut.find_test_executables([_BINARY_DIR, _BINARY_DIR.parent / 'Release'])
+
+        # verify
+        self.assertEqual(executables, [_BINARY_DIR / 'PackageA_tests', _BINARY_DIR / 'PackageB_tests'])
+
+    def test_run_merges_the_xml_outputs_and_records_durations(self):
+        # setup
+        sut = testrunner.TestRunner(self.os_access, self.fs_access, _DURATIONS_FILE, 4)
+
+        # execute
+        self.assertTrue(sut.run(sut.find_test_executables([_BINARY_DIR]), _JUNIT_FILE))
+
+        # verify
+        junit = self.fs_access.readfile(_JUNIT_FILE)
+        self.assertIn('tests="4"', junit)
+        self.assertIn('name="PackageA_tests"', junit)
+        self.assertIn('name="PackageB_tests"', junit)
+        durations = json.loads(self.fs_access.readfile(_DURATIONS_FILE))
+        self.assertTrue(durations[str(_BINARY_DIR / 'PackageA_tests')]['gtest'])
+        self.assertFalse(self.fs_access.exists(_JUNIT_FILE + '.0.PackageA_tests.0.xml'))
+
+    def test_run_keeps_the_results_of_executables_with_the_same_name_in_different_folders(self):
+        # setup
+        release_dir = _BINARY_DIR.parent / 'Release'
+        self.fs_access.addfile(release_dir / 'PackageA_tests', 'binary')
+        xml_files = []
+        def run_test(command, cwd, env):
+            xml_files.append(command.split('--gtest_output=xml:"')[1].split('"')[0])
+            return self._fake_run_test(command, cwd, env)
+        self.os_access.execute_command_output_function = run_test
+        sut = testrunner.TestRunner(self.os_access, self.fs_access, _DURATIONS_FILE, 4)
+
+        # execute
+        self.assertTrue(sut.run([_BINARY_DIR / 'PackageA_tests', release_dir / 'PackageA_tests'], _JUNIT_FILE))
+
+        # verify
+        self.assertEqual(len(set(xml_files)), 2)
+        self.assertIn('tests="4"', self.fs_access.readfile(_JUNIT_FILE))
+
+    def test_run_shards_long_gtest_executables_and_starts_the_longest_first(self):
+        # setup
+        self.fs_access.addfile(_DURATIONS_FILE, json.dumps({
+            str(_BINARY_DIR / 'PackageA_tests'): {'seconds': 1.0, 'gtest': True},
+            str(_BINARY_DIR / 'PackageB_tests'): {'seconds': 100.0, 'gtest': True},
+        }))
+        sut = testrunner.TestRunner(self.os_access, self.fs_access, _DURATIONS_FILE, 4)
+
+        # execute
+        jobs = sut._get_jobs(sut.find_test_executables([_BINARY_DIR]), sut._read_durations())
+
+        # verify
+        self.assertEqual([testrunner._get_file_name(job.executable) for job in jobs], ['PackageB_tests'] * 4 + ['PackageA_tests'])
+        self.assertEqual([job.shard_index for job in jobs[:4]], [0, 1, 2, 3])
+
+    def test_run_sets_the_gtest_shard_environment_variables(self):
+        # setup
+        self.fs_access.addfile(_DURATIONS_FILE, json.dumps({
+            str(_BINARY_DIR / 'PackageA_tests'): {'seconds': 100.0, 'gtest': True},
+        }))
+        sut = testrunner.TestRunner(self.os_access, self.fs_access, _DURATIONS_FILE, 2)
+
+        # execute
+        self.assertTrue(sut.run([_BINARY_DIR / 'PackageA_tests'], _JUNIT_FILE))
+
+        # verify
+        envs = sorted([args[2] for args in self.os_access.execute_command_output_args], key=lambda env: env['GTEST_SHARD_INDEX'])
+        self.assertEqual([(env['GTEST_TOTAL_SHARDS'], env['GTEST_SHARD_INDEX'], env['PATH']) for env in envs], [('2', '0', '/bin'), ('2', '1', '/bin')])
+
+    def test_run_returns_false_if_a_test_fails(self):
+        # setup
+        self.failing_executable = 'PackageB_tests'
+        sut = testrunner.TestRunner(self.os_access, self.fs_access, _DURATIONS_FILE, 4)
+
+        # execute
+        self.assertFalse(sut.run(sut.find_test_executables([_BINARY_DIR]), _JUNIT_FILE))
+
+        # verify
+        self.assertIn('FAIL PackageB_tests', self.os_access.console_output)
+        self.assertIn('Test failed!', self.os_access.console_output)
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""
+This module provides the WrapperProfile class which measures the overhead of the build scripts.
+The file system and os access objects are wrapped with proxies that count and time their calls,
+and the python stack of the scripts is sampled to find the functions that use the most time.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+
+
+DEFAULT_INTERVAL = 0.005
+# The methods of MiscOsAccess that start processes and wait for them.
+SUBPROCESS_METHODS = ['execute_command', 'execute_command_output', 'execute_commands_in_parallel']
+# The methods of FileSystemAccess that only read the status of a path.
+STAT_METHODS = ['exists', 'isfile', 'isdir', 'stat']
+_NR_HOT_FUNCTIONS = 15
+
+
+class WrapperProfile:
+    """
+    Collects the call statistics of the wrapped objects and the stack samples of the thread that
+    calls start(). The time in subprocesses is the time in the SUBPROCESS_METHODS of the wrapped os
+    access object. The stack samples that are taken while these methods wait are not used for the
+    hottest functions, so these only show the time that the scripts spend in Python.
+    """
+    def __init__(self, interval=DEFAULT_INTERVAL, clock=time.perf_counter):
+        self.m_clock = clock
+        self.m_interval = interval
+        self.m_profiler = None
+        self.m_fs_statistics = CallStatistics()
+        self.m_os_statistics = CallStatistics()
+        self.m_start_time = None
+        self.m_duration = None
+
+    def wrap_fs_access(self, fs_access):
+        return CountingProxy(fs_access, self.m_fs_statistics, self.m_clock)
+
+    def wrap_os_access(self, os_access):
+        return CountingProxy(os_access, self.m_os_statistics, self.m_clock)
+
+    def start(self):
+        self.m_start_time = self.m_clock()
+        self.m_profiler = SamplingProfiler(threading.get_ident(), self.m_interval)
+        self.m_profiler.start()
+
+    def stop(self):
+        self.m_profiler.stop()
+        self.m_duration = self.m_clock() - self.m_start_time
+
+    def get_report(self):
+        return get_report(self.m_duration, self.m_fs_statistics, self.m_os_statistics, self.m_profiler)
+
+
+class CallStatistics:
+    """
+    The number of calls and the summed up seconds of the calls of each method.
+    """
+    def __init__(self):
+        self.m_lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.seconds = collections.Counter()
+
+    def add(self, method, seconds):
+        with self.m_lock:
+            self.counts[method] += 1
+            self.seconds[method] += seconds
+
+    def get_total_seconds(self, methods=None):
+        return sum(seconds for method, seconds in self.seconds.items() if methods is None or method in methods)
+
+    def get_count(self, methods=None):
+        return sum(count for method, count in self.counts.items() if methods is None or method in methods)
+
+
+class CountingProxy:
+    """
+    Passes all attribute accesses on to the wrapped object. The calls of its methods are counted
+    and timed in the statistics. Calls that the wrapped object makes to its own methods are not counted.
+    """
+    def __init__(self, wrapped, statistics, clock=time.perf_counter):
+        self.m_wrapped = wrapped
+        self.m_statistics = statistics
+        self.m_clock = clock
+
+    def __getattr__(self, name):
+        attribute = getattr(self.m_wrapped, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed_call(*args, **kwargs):
+            start_time = self.m_clock()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self.m_statistics.add(name, self.m_clock() - start_time)
+        return timed_call
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Takes the stack of the given thread from sys._current_frames() at a fixed interval. For each
+    function the samples in which it is on top of the stack and the samples in which it is anywhere
+    on the stack are counted. Samples that are taken while a subprocess runs are only counted.
+    """
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        threading.Thread.__init__(self, daemon=True)
+        self.m_thread_id = thread_id
+        self.m_interval = interval
+        self.m_stop_event = threading.Event()
+        self.self_samples = collections.Counter()
+        self.total_samples = collections.Counter()
+        self.nr_samples = 0
+        self.nr_subprocess_samples = 0
+
+    def stop(self):
+        self.m_stop_event.set()
+        self.join()
+
+    def run(self):
+        while not self.m_stop_event.wait(self.m_interval):
+            frame = sys._current_frames().get(self.m_thread_id)
+            if frame is not None:
+                self.add_sample(frame)
+
+    def add_sample(self, frame):
+        codes = []
+        while frame is not None:
+            # The proxies of this module are no functions of the scripts.
+            if frame.f_code.co_filename != __file__:
+                codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+
+        self.nr_samples += 1
+        if any(code.co_name in SUBPROCESS_METHODS and os.path.basename(code.co_filename) == 'miscosaccess.py' for code in codes):
+            self.nr_subprocess_samples += 1
+            return
+        self.self_samples[_get_function_name(codes[0])] += 1
+        for function in set(_get_function_name(code) for code in codes):
+            self.total_samples[function] += 1
+
+
+########### free functions #########################################################################
+def _get_function_name(code):
+    return '{0}:{1} {2}'.format(os.path.basename(code.co_filename), code.co_firstlineno, code.co_name)
+
+
+def get_report(duration, fs_statistics, os_statistics, profiler, nr_hot_functions=_NR_HOT_FUNCTIONS):
+    """
+    Returns the lines that compare the time in Python with the time in subprocesses, that count
+    the stat calls and spawned processes and that list the hottest Python functions.
+    """
+    subprocess_seconds = os_statistics.get_total_seconds(SUBPROCESS_METHODS)
+    nr_spawns = os_statistics.get_count(SUBPROCESS_METHODS)
+    # Subprocesses that run in parallel threads can take longer than the scripts together.
+    python_seconds = max(0.0, duration - subprocess_seconds)
+    lines = [
+        'The build scripts ran for {0:.3f} s: {1:.3f} s in Python and {2:.3f} s in {3} subprocess calls.'.format(
+            duration, python_seconds, subprocess_seconds, nr_spawns),
+        'File system access: {0} calls in {1:.3f} s, {2} of them stat calls{3}.'.format(
+            fs_statistics.get_count(), fs_statistics.get_total_seconds(), fs_statistics.get_count(STAT_METHODS),
+            _get_method_counts(fs_statistics, STAT_METHODS)),
+        'Os access: {0} calls in {1:.3f} s, {2} of them spawned processes{3}.'.format(
+            os_statistics.get_count(), os_statistics.get_total_seconds(), nr_spawns,
+            _get_method_counts(os_statistics, SUBPROCESS_METHODS)),
+        ]
+
+    nr_python_samples = profiler.nr_samples - profiler.nr_subprocess_samples
+    if not nr_python_samples:
+        lines.append('No Python stack samples were taken outside of subprocess calls.')
+        return lines
+    lines.append('The hottest Python functions in {0} of {1} stack samples that were taken outside of subprocess calls:'.format(
+        nr_python_samples, profiler.nr_samples))
+    lines.append('   self   total  function')
+    for function, count in profiler.self_samples.most_common(nr_hot_functions):
+        lines.append('{0:6.1f}% {1:6.1f}%  {2}'.format(
+            100.0 * count / nr_python_samples, 100.0 * profiler.total_samples[function] / nr_python_samples, function))
+    return lines
+
+
+def _get_method_counts(statistics, methods):
+    counts = ['{0} {1}'.format(method, statistics.counts[method]) for method in methods if statistics.counts[method]]
+    return ' ({0})'.format(', '.join(counts)) if counts else ''
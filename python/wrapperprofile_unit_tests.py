@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""
+This module contains unit tests for the classes and functions of the wrapperprofile module.
+"""
+
+import sys
+import threading
+import unittest
+
+from . import wrapperprofile
+
+
+class _Clock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+class _OsAccess:
+    def __init__(self, clock):
+        self.m_clock = clock
+        self.console_output = ''
+
+    def execute_command(self, command):
+        self.m_clock.time += 2.0
+        return True
+
+    def print_console(self, text):
+        self.console_output += text + '\n'
+
+
+class TestWrapperProfile(unittest.TestCase):
+    """
+    The test fixture for the wrapperprofile tests.
+    """
+    def test_proxy_counts_and_times_the_method_calls(self):
+        clock = _Clock()
+        statistics = wrapperprofile.CallStatistics()
+        os_access = _OsAccess(clock)
+        sut = wrapperprofile.CountingProxy(os_access, statistics, clock)
+
+        self.assertTrue(sut.execute_command('cmake --build .'))
+        self.assertTrue(sut.execute_command('ctest'))
+        sut.print_console('SUCCESS!')
+
+        self.assertEqual(sut.console_output, 'SUCCESS!\n')
+        self.assertEqual(statistics.counts, {'execute_command': 2, 'print_console': 1})
+        self.assertEqual(statistics.get_total_seconds(wrapperprofile.SUBPROCESS_METHODS), 4.0)
+
+    def test_profiler_counts_the_functions_on_the_stack(self):
+        sut = wrapperprofile.SamplingProfiler(threading.get_ident())
+
+        def execute_command():
+            # A function with the name of a subprocess method, but not of miscosaccess.py.
+            sut.add_sample(sys._getframe())
+        execute_command()
+        execute_command()
+
+        self.assertEqual(sut.nr_samples, 2)
+        self.assertEqual(sut.nr_subprocess_samples, 0)
+        function, count = sut.self_samples.most_common(1)[0]
+        self.assertTrue(function.startswith('wrapperprofile_unit_tests.py:') and function.endswith(' execute_command'))
+        self.assertEqual(count, 2)
+        self.assertTrue(any(name.endswith(' test_profiler_counts_the_functions_on_the_stack') for name in sut.total_samples))
+
+    def test_report_compares_python_and_subprocess_time(self):
+        fs_statistics = wrapperprofile.CallStatistics()
+        for method in ['isfile', 'isfile', 'exists', 'readfile']:
+            fs_statistics.add(method, 0.001)
+        os_statistics = wrapperprofile.CallStatistics()
+        os_statistics.add('execute_command', 0.8)
+        os_statistics.add('print_console', 0.0)
+        profiler = wrapperprofile.SamplingProfiler(0)
+        profiler.nr_samples = 10
+        profiler.nr_subprocess_samples = 6
+        profiler.self_samples['buildautomat.py:10 make'] = 4
+        profiler.total_samples['buildautomat.py:10 make'] = 4
+
+        lines = wrapperprofile.get_report(1.0, fs_statistics, os_statistics, profiler)
+
+        self.assertEqual(lines, [
+            'The build scripts ran for 1.000 s: 0.200 s in Python and 0.800 s in 1 subprocess calls.',
+            'File system access: 4 calls in 0.004 s, 3 of them stat calls (exists 1, isfile 2).',
+            'Os access: 2 calls in 0.800 s, 1 of them spawned processes (execute_command 1).',
+            'The hottest Python functions in 4 of 10 stack samples that were taken outside of subprocess calls:',
+            '   self   total  function',
+            ' 100.0%  100.0%  buildautomat.py:10 make',
+            ])
@@ -6,8 +6,29 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 
+from python.artifactcache_unit_tests import *
 from python.buildautomat_unit_tests import *
+from python.buildevents_unit_tests import *
+from python.buildmetrics_unit_tests import *
+from python.buildprogress_unit_tests import *
+from python.buildresources_unit_tests import *
+from python.buildresult_unit_tests import *
+from python.diagnostics_unit_tests import *
+from python.docoptcache_unit_tests import *
 from python.filesystemaccess_unit_tests import *
+from python.filewatcher_unit_tests import *
+from python.jobpools_unit_tests import *
+from python.jobserver_unit_tests import *
+from python.miscosaccess_unit_tests import *
+from python.outputreader_unit_tests import *
+from python.pipeline_unit_tests import *
+from python.resourcesampler_unit_tests import *
+from python.stallwatchdog_unit_tests import *
+from python.startup_benchmark_unit_tests import *
+from python.testrunner_unit_tests import *
+from python.testimpact_unit_tests import *
+from python.testcache_unit_tests import *
+from python.wrapperprofile_unit_tests import *
 
 if __name__ == '__main__':
     unittest.main()